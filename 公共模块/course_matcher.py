@@ -0,0 +1,327 @@
+# course_matcher.py
+"""
+本期课程（A，进行中）→ 下期课程（B，等待中）的批量匹配引擎，供「课程更新」脚本使用。
+
+- 两张表各按 導師 分组一次；每位导师的 A × B 候选对整块计算：
+  名称相似度矩阵（同名课程只算一次），逢星期 / 時間 / 收費 / 堂數 / 上限 加分用 NumPy 广播比较编码后的列。
+- 每个 A 取总分最高的 B（同分取 B 表中靠前的一条），总分达到及格线即视为匹配成功。
+  多个 A 可能取到同一个 B；mode="assign" 时改为每位导师一对一最优分配（匈牙利算法，需安装 scipy），
+  映射日志同时列出贪心结果以便对照。
+- 名称得分低于 name_gate 时不计附加分，日志记为「否（相似度過低）」。
+- 各项权重、及格线可配置；默认值与课程更新1.3 起的规则一致。
+
+匹配日志（MatchLog）：每个候选对只存 A 行位置、B 行位置、名称相似度和附加分命中位（17 字节），
+名称、各项得分、总分、是否匹配在输出时按块重新计算，可整表取出，也可分块写出 CSV / Parquet。
+log_level="all" 记录全部候选对；"passed" 只记名称得分达到 name_gate 的；"best" 每个 A 只记总分最高的一条；
+top_k=K 时每个 A 只保留总分最高的 K 条（按总分从高到低，同分按 B 表顺序）。
+
+名称相似度 scorer：
+- "difflib"（默认）：difflib.SequenceMatcher.ratio()，与旧版逐对计算的分数完全一致；
+- "rapidfuzz"：rapidfuzz.process.cdist + fuzz.ratio（需安装 rapidfuzz），按最长公共子序列计算，
+  比 SequenceMatcher 快得多，但个别名称的分数会略高于旧版。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from course_matcher import match_courses
+    unmatched_df, log_df, mapping_df = match_courses(progress_df, wait_df, weights={"名稱": 60}, threshold=85)
+    _, match_log, _ = match_courses(progress_df, wait_df, log_level="passed", top_k=3, stream_log=True)
+    match_log.write("匹配日志.parquet")       # 分块写出，不生成整张日志表
+"""
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+EXTRA_FIELDS = ["逢星期", "時間", "收費", "堂數", "上限"]
+DEFAULT_WEIGHTS = {"名稱": 60, "逢星期": 12, "時間": 10, "收費": 8, "堂數": 6, "上限": 4}
+DEFAULT_THRESHOLD = 85    # 总分及格线
+DEFAULT_NAME_GATE = 50    # 名称得分低于此值不计附加分
+SCORERS = ("difflib", "rapidfuzz")
+LOG_LEVELS = ("all", "passed", "best")
+LOG_CHUNK_ROWS = 200_000  # 日志分块写出的行数
+
+LOG_COLUMNS = ["A_课程名称", "B_课程名称", "导师", "名称相似度", "主体名称得分",
+               *[f"{f}得分" for f in EXTRA_FIELDS], "总分", "是否匹配"]
+MAPPING_COLUMNS = ["A_课程名称", "B_课程名称", "导师", "总分", "主体名称得分", "附加加分", "匹配备注"]
+
+
+# ========== 名称相似度矩阵 ==========
+def name_similarity(names_a, names_b, scorer: str = "difflib") -> np.ndarray:
+    """len(names_a) × len(names_b) 的相似度矩阵（0–1）；重复的名称只计算一次"""
+    codes_a, uniq_a = pd.factorize(np.asarray(names_a, dtype=object))
+    codes_b, uniq_b = pd.factorize(np.asarray(names_b, dtype=object))
+    if scorer == "rapidfuzz":
+        from rapidfuzz import fuzz, process
+        sim = process.cdist(list(uniq_a), list(uniq_b), scorer=fuzz.ratio, dtype=np.float64, workers=-1) / 100
+    elif scorer == "difflib":
+        sim = np.empty((len(uniq_a), len(uniq_b)))
+        matcher = SequenceMatcher(None)
+        for j, b in enumerate(uniq_b):
+            matcher.set_seq2(b)          # B 的字符索引只建一次
+            for i, a in enumerate(uniq_a):
+                matcher.set_seq1(a)
+                sim[i, j] = matcher.ratio()
+    else:
+        raise ValueError(f"未知的相似度算法：{scorer}（可选 {', '.join(SCORERS)}）")
+    return sim[np.ix_(codes_a, codes_b)]
+
+
+# ========== 逐导师分块打分 ==========
+def _column(df: pd.DataFrame, field: str):
+    # 缺少的列按 None 处理（与旧版 row.get(field) 的比较结果一致）
+    return df[field].to_numpy(dtype=object) if field in df.columns else np.full(len(df), None, dtype=object)
+
+
+def _field_codes(progress_df: pd.DataFrame, wait_df: pd.DataFrame):
+    """附加分各列在 A、B 两表中统一编码为整数，之后只做整数比较"""
+    codes = {}
+    for field in EXTRA_FIELDS:
+        joined, _ = pd.factorize(np.concatenate([_column(progress_df, field), _column(wait_df, field)]))
+        codes[field] = (joined[:len(progress_df)], joined[len(progress_df):])
+    return codes
+
+
+def score_blocks(progress_df: pd.DataFrame, wait_df: pd.DataFrame, weights: dict = None,
+                 name_gate: float = DEFAULT_NAME_GATE, scorer: str = "difflib"):
+    """
+    按导师依次产出 (导师, block)。block 为 dict：
+    a / b：该导师在 A、B 表中的行位置；sim / name / total：len(a) × len(b) 矩阵；
+    passed：名称得分达到 name_gate 的候选对；extras：{"逢星期得分": 矩阵, ...}。
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    names_a, names_b = _column(progress_df, "名稱"), _column(wait_df, "名稱")
+    codes = _field_codes(progress_df, wait_df)
+    wait_groups = wait_df.groupby("導師", sort=False).indices
+    for teacher, a in progress_df.groupby("導師", sort=False).indices.items():
+        b = wait_groups.get(teacher)
+        if b is None:
+            continue
+        sim = name_similarity(names_a[a], names_b[b], scorer)
+        name = sim * weights["名稱"]
+        passed = name >= name_gate
+        extras = {
+            f"{field}得分": np.where(passed & (codes[field][0][a, None] == codes[field][1][None, b]), weights[field], 0)
+            for field in EXTRA_FIELDS
+        }
+        total = name + sum(extras.values())
+        yield teacher, {"a": a, "b": b, "sim": sim, "name": name, "passed": passed, "extras": extras, "total": total}
+
+
+# ========== 每个 A 选定的 B ==========
+def greedy_choice(total: np.ndarray, threshold: float) -> np.ndarray:
+    """每个 A 取总分最高的 B（argmax 取第一个最大值，同分保留 B 表中靠前的一条）；未达及格线为 -1"""
+    best = total.argmax(axis=1)
+    return np.where(total[np.arange(len(total)), best] >= threshold, best, -1)
+
+
+def assign_choice(total: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    一对一最优分配（匈牙利算法，scipy.optimize.linear_sum_assignment）：
+    只在达到及格线的候选对中分配，使总分之和最大，每个 B 至多对应一个 A；未分配为 -1。
+    """
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        raise RuntimeError("❌ 最优分配模式需要 scipy：pip install scipy")
+    choice = np.full(len(total), -1)
+    eligible = total >= threshold
+    rows, cols = np.flatnonzero(eligible.any(axis=1)), np.flatnonzero(eligible.any(axis=0))
+    if len(rows):
+        sub = np.where(eligible[np.ix_(rows, cols)], total[np.ix_(rows, cols)], 0.0)
+        r, c = linear_sum_assignment(sub, maximize=True)
+        keep = sub[r, c] > 0      # 为凑满方阵而分到的不及格候选对不算匹配
+        choice[rows[r[keep]]] = cols[c[keep]]
+    return choice
+
+
+# ========== 匹配 ==========
+MODES = ("greedy", "assign")
+COMPARE_COLUMNS = ["A_课程名称", "导师", "B_课程名称", "总分", "主体名称得分", "附加加分",
+                   "贪心_B_课程名称", "贪心_总分", "两种方式一致", "匹配备注"]
+
+
+def match_courses(progress_df: pd.DataFrame, wait_df: pd.DataFrame, weights: dict = None,
+                  threshold: float = DEFAULT_THRESHOLD, name_gate: float = DEFAULT_NAME_GATE,
+                  scorer: str = "difflib", mode: str = "greedy", log_level: str = "all", top_k: int = None,
+                  stream_log: bool = False):
+    """
+    返回 (未匹配的 A 行, 匹配日志, 映射日志)。
+    匹配日志按 A 表顺序、每个 A 内按 B 表顺序列出同导师的候选对（top_k / "best" 时按总分排序），
+    记录范围见 log_level、top_k；stream_log=True 时返回 MatchLog 而不是 DataFrame，由调用方分块写出。
+    映射日志按 A 表顺序。
+    mode="greedy"：每个 A 各取最高分的 B（多个 A 可能对应同一个 B）；
+    mode="assign"：每位导师的候选对做一对一最优分配，映射日志同时列出贪心结果以便对照。
+    """
+    if mode not in MODES:
+        raise ValueError(f"未知的匹配方式：{mode}（可选 {', '.join(MODES)}）")
+    names_a = progress_df["名稱"].to_numpy(dtype=object)
+    names_b = wait_df["名稱"].to_numpy(dtype=object)
+    match_log = MatchLog(progress_df, wait_df, weights, threshold, name_gate, log_level, top_k)
+    map_parts = []
+    matched = np.zeros(len(progress_df), dtype=bool)
+    for teacher, blk in score_blocks(progress_df, wait_df, weights, name_gate, scorer):
+        a, total = blk["a"], blk["total"]
+
+        greedy = greedy_choice(total, threshold)
+        if mode == "greedy":
+            choice = greedy
+            rows = np.flatnonzero(greedy >= 0)
+        else:
+            choice = assign_choice(total, threshold)
+            rows = np.flatnonzero((choice >= 0) | (greedy >= 0))   # 贪心选中、最优分配未选中的 A 也列出
+        matched[a[choice >= 0]] = True
+
+        part = pd.concat([
+            pd.DataFrame({"pos": a[rows], "A_课程名称": names_a[a[rows]], "导师": teacher}),
+            _choice_columns(blk, names_b, rows, choice[rows]),
+        ], axis=1)
+        if mode == "greedy":
+            part["匹配备注"] = "匹配成功（最佳得分）"
+        else:
+            part = pd.concat([part, _choice_columns(blk, names_b, rows, greedy[rows], prefix="贪心_")], axis=1)
+            part["两种方式一致"] = np.where(choice[rows] == greedy[rows], "是", "否")
+            part["匹配备注"] = np.where(choice[rows] >= 0, "匹配成功（最优分配）", "未分配（候选课程已分给其他课程）")
+        map_parts.append(part)
+
+        match_log.add(blk)
+
+    unmatched_df = progress_df.iloc[np.flatnonzero(~matched)]
+    log_df = match_log if stream_log else match_log.frame()
+    mapping_df = _in_progress_order(map_parts, MAPPING_COLUMNS if mode == "greedy" else COMPARE_COLUMNS)
+    return unmatched_df, log_df, mapping_df
+
+
+def _choice_columns(blk, names_b, rows, col, prefix=""):
+    """rows 各行选中的 B 及其得分；col 为 -1 表示没有选中，对应各列留空"""
+    has = col >= 0
+    col = np.where(has, col, 0)
+    df = pd.DataFrame({
+        f"{prefix}B_课程名称": names_b[blk["b"][col]],
+        f"{prefix}总分": blk["total"][rows, col].round(2),
+        f"{prefix}主体名称得分": blk["name"][rows, col].round(2),
+        f"{prefix}附加加分": sum(v[rows, col] for v in blk["extras"].values()),
+    })
+    return df if has.all() else df.astype(object).where(np.broadcast_to(has[:, None], df.shape), "")
+
+
+def _in_progress_order(parts, columns):
+    """各导师分块拼接后按 A 表行位置恢复原顺序（稳定排序，块内顺序不变）"""
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(parts, ignore_index=True)
+    df = df.iloc[np.argsort(df["pos"].to_numpy(), kind="stable")]
+    return df[columns].reset_index(drop=True)
+
+
+# ========== 匹配日志 ==========
+class MatchLog:
+    """
+    列式存储的匹配日志。每个候选对只存 4 列：A 行位置、B 行位置、名称相似度、附加分命中位（每项一位），
+    名称、各项得分、总分、是否匹配都由这 4 列和权重重新算出，与逐对记录的数值完全一致。
+    """
+
+    STATUS = ["否", "是", "否（相似度過低）"]
+
+    def __init__(self, progress_df: pd.DataFrame, wait_df: pd.DataFrame, weights: dict = None,
+                 threshold: float = DEFAULT_THRESHOLD, name_gate: float = DEFAULT_NAME_GATE,
+                 level: str = "all", top_k: int = None):
+        if level not in LOG_LEVELS:
+            raise ValueError(f"未知的日志级别：{level}（可选 {', '.join(LOG_LEVELS)}）")
+        if top_k is not None and top_k < 1:
+            raise ValueError(f"top_k 须为正整数：{top_k}")
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.threshold, self.name_gate = threshold, name_gate
+        self.level = level
+        self.top_k = 1 if level == "best" else top_k
+        # 名称、导师只存编码，输出时还原为 Categorical
+        self._names_a = pd.factorize(_column(progress_df, "名稱"))
+        self._names_b = pd.factorize(_column(wait_df, "名稱"))
+        self._teachers = pd.factorize(_column(progress_df, "導師"))
+        self._parts = []
+        self._columns = None
+
+    def add(self, blk: dict):
+        """记录一位导师的候选对（blk 为 score_blocks 产出的块）"""
+        total = blk["total"]
+        keep = blk["passed"] if self.level == "passed" else np.ones(total.shape, dtype=bool)
+        if self.top_k:
+            k = min(self.top_k, total.shape[1])
+            order = np.argsort(-np.where(keep, total, -np.inf), axis=1, kind="stable")[:, :k]
+            i = np.repeat(np.arange(total.shape[0]), k)
+            j = order.ravel()
+            hit = keep[i, j]
+            i, j = i[hit], j[hit]
+        else:
+            i, j = np.nonzero(keep)      # 行优先：按 A、再按 B 的顺序
+        hits = np.zeros(len(i), dtype=np.uint8)
+        for bit, field in enumerate(EXTRA_FIELDS):
+            hits |= (blk["extras"][f"{field}得分"][i, j] != 0).astype(np.uint8) << bit
+        self._parts.append((blk["a"][i].astype(np.int32), blk["b"][j].astype(np.int32), blk["sim"][i, j], hits))
+        self._columns = None
+
+    def _merged(self):
+        """各导师分块拼接，按 A 表行位置稳定排序（块内顺序不变）"""
+        if self._columns is None:
+            if self._parts:
+                a, b, sim, hits = (np.concatenate(c) for c in zip(*self._parts))
+                order = np.argsort(a, kind="stable")
+                self._columns = (a[order], b[order], sim[order], hits[order])
+            else:
+                self._columns = (np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0), np.empty(0, np.uint8))
+            self._parts = [self._columns]
+        return self._columns
+
+    def __len__(self):
+        return sum(len(part[0]) for part in self._parts)
+
+    def _frame(self, a, b, sim, hits) -> pd.DataFrame:
+        w = self.weights
+        name = sim * w["名稱"]
+        passed = name >= self.name_gate
+        extras = {f"{field}得分": np.where((hits >> bit) & 1, w[field], 0) for bit, field in enumerate(EXTRA_FIELDS)}
+        total = name + sum(extras.values())
+        status = np.select([~passed, total >= self.threshold], [2, 1], 0)
+
+        def categorical(codes, factorized):
+            return pd.Categorical.from_codes(factorized[0][codes], factorized[1])
+
+        return pd.DataFrame({
+            "A_课程名称": categorical(a, self._names_a),
+            "B_课程名称": categorical(b, self._names_b),
+            "导师": categorical(a, self._teachers),
+            "名称相似度": sim.round(4),
+            "主体名称得分": name.round(2),
+            **extras,
+            "总分": total.round(2),
+            "是否匹配": pd.Categorical.from_codes(status, self.STATUS),
+        }, columns=LOG_COLUMNS)
+
+    def chunks(self, rows: int = LOG_CHUNK_ROWS):
+        """按 A 表顺序逐块产出日志 DataFrame（至少一块，空日志时为只有表头的空表）"""
+        columns = self._merged()
+        for start in range(0, max(len(columns[0]), 1), rows):
+            yield self._frame(*(c[start:start + rows] for c in columns))
+
+    def frame(self) -> pd.DataFrame:
+        """整张日志表"""
+        return self._frame(*self._merged())
+
+    def write(self, path: str, rows: int = LOG_CHUNK_ROWS) -> int:
+        """分块写出 .csv（utf-8-sig）或 .parquet（需安装 pyarrow），返回行数"""
+        if path.lower().endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            writer = None
+            try:
+                for chunk in self.chunks(rows):
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    writer = writer or pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            for n, chunk in enumerate(self.chunks(rows)):
+                chunk.to_csv(path, index=False, mode="w" if n == 0 else "a", header=n == 0,
+                             encoding="utf-8-sig" if n == 0 else "utf-8")
+        return len(self)
@@ -0,0 +1,142 @@
+# docx_cache.py
+"""
+docxtpl 模板缓存：同一进程内每个 .docx 模板只解析一次，之后反复渲染。
+
+DocxTemplate(path) 每渲染一份文档都要重新解压模板、用 python-docx 解析全部 XML、
+预处理标签并重新编译 Jinja 模板，再整包重新序列化保存。本模块在首次使用时：
+- 把模板压缩包的各个文件原样读入内存；
+- 对正文（word/document.xml）以及含标签的页眉 / 页脚 / 脚注做 docxtpl 的标签预处理，并编译成 Jinja 模板；
+之后每次渲染只执行编译好的模板、生成新的正文等 XML；其余文件事先压缩成一个「底包」，
+渲染时复制底包并只追加新生成的部分（不再逐份重新压缩 styles.xml、字体、图片等）。
+
+标签预处理、表格修正（fix_tables）、图片编号（fix_docpr_ids）沿用 docxtpl 自身的方法，渲染结果与 DocxTemplate 一致。
+上下文中含 InlineImage / Subdoc（需要 python-docx 文档对象），或模板属性（标题、作者等）中含标签时，
+自动退回 DocxTemplate 逐份渲染。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from docx_cache import render_docx
+    render_docx("领款单-模板.docx", context, "输出.docx")
+"""
+import copy
+import io
+import os
+import re
+import zipfile
+
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+from lxml import etree
+
+DOCUMENT_PART = "word/document.xml"
+_PART_TYPES = ("/word/header", "/word/footer", "/word/footnotes")
+_PROPERTIES = ["author", "comments", "identifier", "language", "subject", "title"]
+_BODY_MARKER = "docx-cache-body"
+# 需要 python-docx 文档对象的上下文值（Subdoc 依赖 docxcompose，按类名判断以免强制导入）
+_DOCX_BOUND = ("InlineImage", "Subdoc")
+
+
+def _has_tags(text) -> bool:
+    return bool(text) and ("{{" in text or "{%" in text or "{#" in text)
+
+
+def _compile(tpl: DocxTemplate, env: Environment, xml: str):
+    """docxtpl.render_xml_part() 的前半段：预处理标签并编译"""
+    xml = tpl.patch_xml(xml)
+    return env.from_string(re.sub(r"<w:p([ >])", r"\n<w:p\1", xml))
+
+
+def _finish(tpl: DocxTemplate, xml: str) -> str:
+    """docxtpl.render_xml_part() 的后半段：还原转义标签、处理换行"""
+    xml = re.sub(r"\n<w:p([ >])", r"<w:p\1", xml)
+    xml = xml.replace("{_{", "{{").replace("}_}", "}}").replace("{_%", "{%").replace("%_}", "%}")
+    return tpl.resolve_listing(xml)
+
+
+class CachedTemplate:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            data = f.read()
+        with zipfile.ZipFile(io.BytesIO(data)) as zin:
+            entries = [(info, zin.read(info.filename)) for info in zin.infolist()]
+
+        self._tpl = DocxTemplate(io.BytesIO(data))
+        self._tpl.init_docx()
+        docx = self._tpl.docx
+        env = Environment()
+
+        # 模板属性含标签时本模块不处理，退回 DocxTemplate
+        self._plain_only = any(_has_tags(getattr(docx.core_properties, p)) for p in _PROPERTIES)
+
+        # 正文：编译 <w:body>，并把 <w:document> 外壳切成前后两段（渲染时只拼接正文）
+        self._body = _compile(self._tpl, env, self._tpl.get_xml())
+        root = copy.deepcopy(docx._element)
+        root.replace(root.body, etree.Comment(_BODY_MARKER))
+        shell = etree.tostring(root, encoding="UTF-8", standalone=True)
+        self._head, self._tail = shell.split(f"<!--{_BODY_MARKER}-->".encode("utf-8"))
+
+        # 页眉 / 页脚 / 脚注：只编译含标签的部分，其余保持原字节
+        self._parts = {}
+        for part in docx.part.package.iter_parts():
+            name = str(part.partname)
+            if not name.startswith(_PART_TYPES):
+                continue
+            raw = part.blob.decode("utf-8") if isinstance(part.blob, bytes) else part.blob
+            if _has_tags(raw):
+                xml = self._tpl.get_part_xml(part)
+                encoding = self._tpl.get_headers_footers_encoding(xml)
+                self._parts[name.lstrip("/")] = (_compile(self._tpl, env, xml), encoding)
+
+        # 底包：不随上下文变化的文件只压缩这一次
+        self._infos = {}
+        base = io.BytesIO()
+        with zipfile.ZipFile(base, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info, blob in entries:
+                if info.filename == DOCUMENT_PART or info.filename in self._parts:
+                    self._infos[info.filename] = info
+                else:
+                    zout.writestr(info, blob)
+        self._base = base.getvalue()
+
+    def _needs_docx(self, context: dict) -> bool:
+        return self._plain_only or any(type(v).__name__ in _DOCX_BOUND for v in context.values())
+
+    def render(self, context: dict, out_path):
+        if self._needs_docx(context):
+            doc = DocxTemplate(self.path)
+            doc.render(context)
+            doc.save(out_path)
+            return
+
+        tpl = self._tpl
+        tpl.docx_ids_index = 1000
+        tree = tpl.fix_tables(_finish(tpl, self._body.render(context)))
+        tpl.fix_docpr_ids(tree)
+        rendered = {DOCUMENT_PART: self._head + etree.tostring(tree, encoding="UTF-8", xml_declaration=False) + self._tail}
+        for name, (template, encoding) in self._parts.items():
+            rendered[name] = _finish(tpl, template.render(context)).encode(encoding)
+
+        buf = io.BytesIO(self._base)
+        with zipfile.ZipFile(buf, "a", zipfile.ZIP_DEFLATED) as zout:
+            for name, blob in rendered.items():
+                zout.writestr(self._infos[name], blob)
+        with open(out_path, "wb") as f:
+            f.write(buf.getvalue())
+
+
+# ========== 进程内缓存（以路径 + 修改时间为键，模板被修改后自动重新解析）==========
+_CACHE = {}
+
+
+def get_template(path: str) -> CachedTemplate:
+    path = os.path.abspath(path)
+    key = (path, os.path.getmtime(path))
+    if key not in _CACHE:
+        _CACHE[key] = CachedTemplate(path)
+    return _CACHE[key]
+
+
+def render_docx(template_path: str, context: dict, out_path):
+    """用缓存的模板渲染一份文档并保存到 out_path"""
+    get_template(template_path).render(context, out_path)
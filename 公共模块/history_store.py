@@ -0,0 +1,144 @@
+# history_store.py
+"""
+行政清单历史记录：本地 SQLite，取代每次整表读写的「历史清单汇总.xlsx」。
+
+- history：每生成一份行政清单追加一行（教师、课程、分成、金额（分）、上课日期），按录入顺序编号。
+- 教师姓名、上课起止日期建有索引：生成领款单时按教师查询，写支出賬时按教师分组汇总，都不必整表解析。
+- Excel 版「历史清单汇总.xlsx」只在需要时导出（export_xlsx），格式与原文件相同。
+- 首次使用时若库为空而旧的 xlsx 存在，可用 import_xlsx() 一次性导入。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from history_store import HistoryStore
+    with HistoryStore("历史清单汇总.sqlite") as store:
+        store.append([[教师, 课程名称, 课程编号, 分成, 总收入_分, 导师费用_分, 中心收入_分, "2025-11-11 至 2025-12-30"]])
+        items = store.teacher_items(教师)
+"""
+import datetime
+import sqlite3
+
+from money import to_cents, format_cents
+
+HISTORY_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    teacher      TEXT,
+    course_name  TEXT,
+    course_code  TEXT,
+    split        TEXT,
+    income_cents INTEGER NOT NULL,
+    fee_cents    INTEGER NOT NULL,
+    centre_cents INTEGER NOT NULL,
+    date_text    TEXT,
+    start_day    TEXT,
+    end_day      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_teacher ON history (teacher);
+CREATE INDEX IF NOT EXISTS idx_history_days ON history (start_day, end_day);
+"""
+
+
+def _day_range(date_text):
+    """「2025-11-11 至 2025-12-30」→ ("2025-11-11", "2025-12-30")；无法解析时两者皆为 None"""
+    try:
+        parts = date_text.split("至")
+        start = datetime.datetime.strptime(parts[0].strip(), "%Y-%m-%d")
+        end = datetime.datetime.strptime(parts[1].strip(), "%Y-%m-%d")
+        return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    except Exception:
+        return None, None
+
+
+class HistoryStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, HISTORY_VERSION):
+            self.conn.close()
+            raise RuntimeError(f"历史记录库版本不符（{version} ≠ {HISTORY_VERSION}），请删除 {path} 后重建")
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {HISTORY_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM history)").fetchone()[0] == 1
+
+    # ========== 写入 ==========
+    def append(self, rows) -> int:
+        """
+        rows：[教师姓名, 课程名称, 课程编号, 分成, 总收入_分, 导师费用_分, 中心收入_分, 日期]，
+        与历史清单汇总的字段顺序相同，金额为「分」（int）。
+        """
+        records = [(*r[:4], int(r[4]), int(r[5]), int(r[6]), r[7], *_day_range(r[7])) for r in rows]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO history (teacher, course_name, course_code, split, income_cents, fee_cents, "
+                "centre_cents, date_text, start_day, end_day) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+        return len(records)
+
+    def import_xlsx(self, path: str, sheet_name: str) -> int:
+        """导入旧的历史清单汇总.xlsx（金额为 "1668.00" 文本或数值）"""
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
+        if sheet_name not in wb.sheetnames:
+            wb.close()
+            return 0
+        rows = [list(r) + [None] * (8 - len(r)) for r in wb[sheet_name].iter_rows(min_row=2, values_only=True)]
+        wb.close()
+        rows = [r for r in rows if any(v is not None for v in r)]
+        if not rows:
+            return 0
+        amounts = [to_cents([r[i] for r in rows]) for i in (4, 5, 6)]
+        return self.append([[*r[:4], amounts[0][k], amounts[1][k], amounts[2][k], r[7]] for k, r in enumerate(rows)])
+
+    # ========== 查询（走 teacher 索引）==========
+    def teacher_items(self, teacher: str):
+        """该教师的全部记录：[(课程名称, 课程编号, 导师费用_分), ...]，按录入顺序"""
+        return self.conn.execute(
+            "SELECT course_name, course_code, fee_cents FROM history WHERE teacher = ? ORDER BY id",
+            (teacher,),
+        ).fetchall()
+
+    def spending_groups(self):
+        """
+        按教师汇总（教师按首次出现的顺序）：
+        [(教师, "课程名称/…", "课程编号/…", 导师费用_分, 最早开课日, 最晚结课日), ...]
+        """
+        return self.conn.execute(
+            "SELECT teacher, group_concat(course_name, '/'), group_concat(course_code, '/'), "
+            "SUM(fee_cents), MIN(start_day), MAX(end_day) "
+            "FROM (SELECT * FROM history ORDER BY teacher, id) "
+            "GROUP BY teacher ORDER BY MIN(id)"
+        ).fetchall()
+
+    # ========== 按需导出 Excel ==========
+    def export_xlsx(self, path: str, sheet_name: str, fields) -> int:
+        """导出为历史清单汇总.xlsx（覆盖），金额写成两位小数文本，与原文件一致"""
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_name)
+        ws.append(list(fields))
+        n = 0
+        for r in self.conn.execute(
+            "SELECT teacher, course_name, course_code, split, income_cents, fee_cents, centre_cents, date_text "
+            "FROM history ORDER BY id"
+        ):
+            ws.append([*r[:4], *(format_cents(c, fixed=True) for c in r[4:7]), r[7]])
+            n += 1
+        wb.save(path)
+        return n
@@ -0,0 +1,293 @@
+# holiday_calendar.py
+"""
+按星期预先编好的上课日历：节假日顺延、下期排课全部用 NumPy datetime64[D] 数组计算。
+
+节假日来源（load_holidays）：
+- None / "builtin"：本模块内置的节假日表（BUILTIN_HOLIDAYS）；
+- .ics：日历文件（VEVENT 的 DTSTART / DTEND，全日事件可跨多日）；
+- .csv / .xlsx / .xls：「日期」列（没有该列时取第一列），如 节假日安排.xlsx。
+
+load_calendar(source)：编好的日历存为 <公共模块>/.cache/节假日/v<版本>-<来源 SHA-256>.npz，
+来源内容不变时直接载入，不再解析表格；同一进程内同一来源只载入一次，各脚本共用同一个实例。
+载入时若日历未覆盖今年前一年至后两年（跨年后）会自动延长并更新缓存。
+
+- 日历覆盖若干年（默认节假日首年与今年中较早者的前一年，至较晚者的后两年；数据超出范围时自动延长），
+  按星期几各存一个升序数组，只含非节假日的日期。
+- 某门课从 start 起的 N 节课 = 该星期数组中 searchsorted(start) 起的 N 个元素；
+  遇节假日自然顺延到最后一节之后，不必逐周循环判断。
+- 下期从本期最后一节之后的第一个可上课日开始；节假日冲突 = 下期原定的每周日期 ∩ 节假日。
+- 整列课程一次计算（按星期分 7 组），不逐行处理。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from holiday_calendar import load_calendar
+    cal = load_calendar()                          # 内置节假日表；或 load_calendar("节假日.ics")
+    plan = cal.schedule_terms(starts, lessons)    # starts：datetime64[D] 数组，lessons：每门课的堂数
+    plan["next"]       # 下期上课日期矩阵（每行一门课，不足 max(lessons) 的位置为 NaT）
+    plan["conflicts"]  # 下期原定日期中撞上节假日的（同样形状，无冲突为 NaT）
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DAY = np.timedelta64(1, "D")
+WEEK = np.timedelta64(7, "D")
+NAT = np.datetime64("NaT", "D")
+CALENDAR_VERSION = 1
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "节假日")
+WEEKDAY_NAMES = "一二三四五六日"   # 逢星期 列的写法，星期一为 0
+
+# ========== 内置节假日表 ==========
+BUILTIN_HOLIDAYS = [
+    "2025-12-25", "2025-12-26",
+    "2026-01-01", "2026-02-17", "2026-02-18", "2026-02-19",
+    "2026-04-03", "2026-04-04", "2026-04-06", "2026-04-07",
+    "2026-05-01", "2026-05-25", "2026-06-19", "2026-07-01",
+    "2026-09-26", "2026-10-01", "2026-10-19", "2026-12-25", "2026-12-26",
+]
+
+
+def weekday(dates) -> np.ndarray:
+    """星期一为 0（与 datetime.weekday() 相同）；1970-01-01 是星期四"""
+    return (np.asarray(dates, dtype="datetime64[D]").astype(np.int64) + 3) % 7
+
+
+def _default_horizon(holidays):
+    """节假日各年与今年中最早一年的前一年 1 月 1 日，至最晚一年的后两年 12 月 31 日"""
+    years = [int(np.datetime64("today", "Y").astype(int)) + 1970]
+    if len(holidays):
+        years += [int(y) + 1970 for y in holidays[[0, -1]].astype("datetime64[Y]").astype(int)]
+    return np.datetime64(f"{min(years) - 1}-01-01"), np.datetime64(f"{max(years) + 2}-12-31")
+
+
+class HolidayCalendar:
+    def __init__(self, holidays, start=None, end=None):
+        self.holidays = np.unique(np.asarray(list(holidays), dtype="datetime64[D]"))
+        self._holiday_set = set(self.holidays.tolist())
+        first, last = _default_horizon(self.holidays)
+        self._build(np.datetime64(start, "D") if start else first, np.datetime64(end, "D") if end else last)
+
+    def _build(self, start, end):
+        days = np.arange(start, end + DAY, dtype="datetime64[D]")
+        valid = days[~np.isin(days, self.holidays)]
+        wd = weekday(valid)
+        self.start, self.end = start, end
+        self.valid = [valid[wd == w] for w in range(7)]
+
+    def ensure(self, start, end):
+        """日历不够覆盖 [start, end] 时重新编排更长的范围"""
+        if start < self.start or end > self.end:
+            self._build(min(start, self.start), max(end, self.end))
+
+    def is_holiday(self, date) -> bool:
+        return np.datetime64(date, "D") in self._holiday_set
+
+    @property
+    def last_year(self):
+        """节假日数据覆盖到的最后一年；没有节假日时为 None"""
+        return int(self.holidays[-1].astype("datetime64[Y]").astype(int)) + 1970 if len(self.holidays) else None
+
+    # ========== 计数 ==========
+    def count_holidays(self, start, end) -> int:
+        """[start, end] 之间（含两端）的节假日天数"""
+        lo, hi = np.datetime64(start, "D"), np.datetime64(end, "D")
+        return int(np.searchsorted(self.holidays, hi, side="right") - np.searchsorted(self.holidays, lo, side="left"))
+
+    def count_sessions(self, weekdays: str, after, until) -> int:
+        """逢星期（如「二」「二、四」）的课在 (after, until] 之间、避开节假日后还剩几次"""
+        lo, hi = np.datetime64(after, "D"), np.datetime64(until, "D")
+        self.ensure(min(lo, hi), max(lo, hi))
+        total = 0
+        for w in {WEEKDAY_NAMES.index(ch) for ch in str(weekdays) if ch in WEEKDAY_NAMES}:
+            valid = self.valid[w]
+            total += max(0, int(np.searchsorted(valid, hi, side="right") - np.searchsorted(valid, lo, side="right")))
+        return total
+
+    # ========== 排课 ==========
+    def _take(self, valid, idx, lessons, width):
+        """valid[idx : idx + lessons] 排成 width 列的矩阵，不足的位置为 NaT"""
+        pos = idx[:, None] + np.arange(width)
+        out = valid[np.minimum(pos, len(valid) - 1)]
+        out[np.arange(width) >= lessons[:, None]] = NAT
+        return out
+
+    def schedule_terms(self, starts, lessons):
+        """
+        starts：本期开课日（datetime64[D]，NaT 表示无法排课）；lessons：每门课的堂数（≤0 表示无法排课）。
+        返回 dict：
+          ok：可排课的行；current / next：本期、下期上课日期矩阵；
+          next_start / next_end：下期首、末节；conflicts：下期原定日期中的节假日矩阵（其余为 NaT）。
+        """
+        starts = np.asarray(starts, dtype="datetime64[D]")
+        lessons = np.asarray(lessons, dtype=np.int64)
+        n = len(starts)
+        ok = ~np.isnat(starts) & (lessons > 0)
+        width = int(lessons[ok].max()) if ok.any() else 0
+        current = np.full((n, width), NAT)
+        following = np.full((n, width), NAT)
+        conflicts = np.full((n, width), NAT)
+        if not width:
+            return {"ok": ok, "current": current, "next": following, "conflicts": conflicts,
+                    "next_start": np.full(n, NAT), "next_end": np.full(n, NAT)}
+
+        # 每个节假日至多让一节课顺延一周：两期课加上所有节假日的周数足以覆盖
+        self.ensure(starts[ok].min(), starts[ok].max() + WEEK * (2 * width + len(self.holidays) + 2))
+
+        rows_all = np.flatnonzero(ok)
+        wd_all = weekday(starts[rows_all])
+        slots = np.arange(width)
+        for w in range(7):
+            rows = rows_all[wd_all == w]
+            if not len(rows):
+                continue
+            valid, count = self.valid[w], lessons[rows]
+            # 本期：开课日起（含）的 N 个可上课日
+            idx = np.searchsorted(valid, starts[rows], side="left")
+            current[rows] = self._take(valid, idx, count, width)
+            # 下期：本期最后一节之后的 N 个可上课日
+            last = valid[idx + count - 1]
+            nidx = np.searchsorted(valid, last, side="right")
+            following[rows] = self._take(valid, nidx, count, width)
+            # 下期原定日期（首节起每周一次，不顺延）中撞上节假日的
+            planned = valid[nidx][:, None] + WEEK * slots
+            hit = np.isin(planned, self.holidays) & (slots < count[:, None])
+            conflicts[rows] = np.where(hit, planned, NAT)
+
+        last_pos = np.maximum(lessons - 1, 0)
+        return {
+            "ok": ok,
+            "current": current,
+            "next": following,
+            "conflicts": conflicts,
+            "next_start": following[:, 0],
+            "next_end": following[np.arange(n), last_pos],
+        }
+
+
+def join_dates(matrix, sep: str = "X"):
+    """日期矩阵每行的有效日期按 YYYY-MM-DD 以 sep 连接（NaT 跳过）"""
+    text = np.datetime_as_string(matrix, unit="D")
+    keep = ~np.isnat(matrix)
+    return [sep.join(row[mask]) for row, mask in zip(text, keep)]
+
+
+# ========== 节假日来源 ==========
+def _ics_date(value: str):
+    # 20260101 / 20260101T000000Z → 2026-01-01
+    return np.datetime64(f"{value[:4]}-{value[4:6]}-{value[6:8]}", "D")
+
+
+def _load_ics(path: str):
+    with open(path, encoding="utf-8-sig") as f:
+        text = re.sub(r"\r?\n[ \t]", "", f.read())      # 展开折行
+    days = []
+    for event in re.findall(r"BEGIN:VEVENT(.*?)END:VEVENT", text, flags=re.S):
+        start = re.search(r"^DTSTART[^:]*:(\d{8})", event, flags=re.M)
+        if not start:
+            continue
+        first = _ics_date(start.group(1))
+        end = re.search(r"^DTEND[^:]*:(\d{8})", event, flags=re.M)
+        last = _ics_date(end.group(1)) if end else first + DAY       # 全日事件的 DTEND 不含当天
+        days.extend(np.arange(first, max(last, first + DAY), dtype="datetime64[D]"))
+    return days
+
+
+def _load_table(path: str):
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, encoding="utf-8-sig")
+    else:
+        df = pd.read_excel(path, dtype=str)
+    col = df["日期"] if "日期" in df.columns else df.iloc[:, 0]
+    # 2026/1/1、2026-01-01、Excel 日期（2026-01-01 00:00:00）统一成 YYYY-MM-DD 再解析
+    text = col.str.strip().str.replace("/", "-", regex=False).str.extract(r"^(\d{4}-\d{1,2}-\d{1,2})")[0]
+    dates = pd.to_datetime(text, format="%Y-%m-%d", errors="coerce").dropna()
+    return dates.to_numpy(dtype="datetime64[D]")
+
+
+def load_holidays(source=None) -> np.ndarray:
+    """按来源读取节假日，返回升序、去重的 datetime64[D] 数组"""
+    if source in (None, "builtin"):
+        days = BUILTIN_HOLIDAYS
+    elif not os.path.exists(source):
+        raise FileNotFoundError(source)
+    elif source.lower().endswith(".ics"):
+        days = _load_ics(source)
+    elif source.lower().endswith((".csv", ".xlsx", ".xls")):
+        days = _load_table(source)
+    else:
+        raise ValueError(f"不支持的节假日文件：{source}（可用 .ics / .csv / .xlsx）")
+    return np.unique(np.asarray(days, dtype="datetime64[D]"))
+
+
+# ========== 编好的日历缓存 ==========
+_CALENDARS = {}    # 同一进程内共用：{来源: HolidayCalendar}
+
+
+def _source_sha256(source) -> str:
+    if source in (None, "builtin"):
+        return hashlib.sha256("\n".join(BUILTIN_HOLIDAYS).encode("utf-8")).hexdigest()
+    h = hashlib.sha256()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _save_compiled(cal: HolidayCalendar, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez(f, version=CALENDAR_VERSION, holidays=cal.holidays, span=np.array([cal.start, cal.end]),
+                 **{f"valid{w}": cal.valid[w] for w in range(7)})
+    os.replace(tmp, path)
+
+
+def _load_compiled(path: str):
+    with np.load(path) as data:
+        if int(data["version"]) != CALENDAR_VERSION:
+            return None
+        cal = HolidayCalendar.__new__(HolidayCalendar)
+        cal.holidays = data["holidays"]
+        cal._holiday_set = set(cal.holidays.tolist())
+        cal.start, cal.end = data["span"]
+        cal.valid = [data[f"valid{w}"] for w in range(7)]
+    return cal
+
+
+def load_calendar(source=None, cache_dir: str = CACHE_DIR) -> HolidayCalendar:
+    """
+    source：None / "builtin"（内置表）或 .ics / .csv / .xlsx 文件路径。
+    同一来源在本进程内只载入一次；磁盘缓存按来源内容的 SHA-256 命名，内容变了自然失效。
+    """
+    key = "builtin" if source in (None, "builtin") else os.path.abspath(source)
+    sha = _source_sha256(source)
+    cached = _CALENDARS.get(key)
+    if cached is not None and cached[0] == sha:
+        return cached[1]
+
+    path = os.path.join(cache_dir, f"v{CALENDAR_VERSION}-{sha[:16]}.npz") if cache_dir else None
+    cal = None
+    if path and os.path.exists(path):
+        try:
+            cal = _load_compiled(path)
+        except (OSError, ValueError, KeyError):
+            cal = None   # 缓存损坏时重新编排
+    if cal is None:
+        cal = HolidayCalendar(load_holidays(source))
+        dirty = True
+    else:
+        # 跨年后缓存的范围可能不再覆盖今年前后，延长后写回
+        span = (cal.start, cal.end)
+        cal.ensure(*_default_horizon(cal.holidays))
+        dirty = (cal.start, cal.end) != span
+    if path and dirty:
+        try:
+            _save_compiled(cal, path)
+        except OSError:
+            pass   # 缓存目录不可写时只在内存中使用
+    _CALENDARS[key] = (sha, cal)
+    return cal
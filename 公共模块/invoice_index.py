@@ -0,0 +1,92 @@
+# invoice_index.py
+"""
+已处理发票索引：本地 SQLite，记录每份已入账发票 PDF 的内容哈希，防止同一发票被重复处理、重复写入支出賬。
+
+- invoices：PDF 字节的 SHA-256（主键）、类型、发票号、生成的领款单文件名、原文件名、归档路径、登记时间。
+- 处理前先按 SHA-256 查询（只需读文件算哈希，不必解析 PDF）；(类型, 发票号) 建有索引，可识别重新下载的同一张发票。
+- 首次使用时可把已有归档目录中的 PDF 一次性登记进来（由调用方解析后 add()）。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from invoice_index import InvoiceIndex
+    with InvoiceIndex("已处理发票.sqlite") as index:
+        known = index.lookup([sha256, ...])
+        index.add([(sha256, "PRINT", "104233", "2025年6月打印费领款单.docx", "hp.pdf", "已处理文件/20251101/hp.pdf")])
+"""
+import datetime
+import sqlite3
+
+INDEX_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    sha256        TEXT PRIMARY KEY,
+    kind          TEXT,
+    invoice_no    TEXT,
+    out_name      TEXT,
+    source_name   TEXT,
+    archived_path TEXT,
+    recorded_at   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_no ON invoices (kind, invoice_no);
+"""
+
+
+class InvoiceIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, INDEX_VERSION):
+            self.conn.close()
+            raise RuntimeError(f"发票索引版本不符（{version} ≠ {INDEX_VERSION}），请删除 {path} 后重建")
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM invoices)").fetchone()[0] == 1
+
+    # ========== 写入 ==========
+    def add(self, rows) -> int:
+        """rows：(sha256, 类型, 发票号, 领款单文件名, 原文件名, 归档路径)；已登记的哈希保持不变"""
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.conn:
+            cur = self.conn.executemany(
+                "INSERT OR IGNORE INTO invoices (sha256, kind, invoice_no, out_name, source_name, archived_path, "
+                "recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*r, now) for r in rows],
+            )
+        return cur.rowcount
+
+    # ========== 查询 ==========
+    def lookup(self, hashes):
+        """{sha256: (类型, 发票号, 领款单文件名, 归档路径)}，只含已登记的哈希"""
+        hashes = list(set(hashes))
+        found = {}
+        for i in range(0, len(hashes), 500):   # 分批，避免超出 SQLite 参数个数上限
+            chunk = hashes[i:i + 500]
+            found.update(
+                (r[0], r[1:])
+                for r in self.conn.execute(
+                    "SELECT sha256, kind, invoice_no, out_name, archived_path FROM invoices "
+                    f"WHERE sha256 IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        return found
+
+    def find_invoice(self, kind: str, invoice_no: str):
+        """同类型、同发票号的已登记记录 (领款单文件名, 归档路径)；没有则为 None"""
+        return self.conn.execute(
+            "SELECT out_name, archived_path FROM invoices WHERE kind = ? AND invoice_no = ? LIMIT 1",
+            (kind, invoice_no),
+        ).fetchone()
@@ -0,0 +1,149 @@
+# money.py
+"""
+金额文本统一解析
+
+支持的写法：$1,234.00 / HK$20 / HKD 1,234.50 / (1,234.00) 表示负数 / -$30 / 600 / 600.00
+'null'、空字符串、空值及其他无法解析的内容一律返回 NaN，由调用方决定按 0 处理还是跳过。
+
+- parse_money(series)：整列解析，返回 float64 Series（索引与原列一致）。
+  金额列重复值很多（$600.00、$20.00 ...），先 factorize 取唯一值，
+  只对唯一值各解析一次，再按编码映射回整列；
+  装有 pyarrow 时唯一值用 pyarrow.compute 整批清洗，否则逐个 str.translate + float。
+- parse_money_text(text)：单个字符串（如 PDF 中抽出的 "HKD 1,234.50"）。
+
+定点金额（以「分」为单位的 int64）：加总、分成、对账全部用整数完成，不受浮点误差影响。
+- to_cents(values)：金额（数值 / 文本 / 列）→ 分；无法解析的按 0。
+- split_percent(base, percent)：base × percent%，四舍五入到分（0.5 分进位）。
+- split_units(rate, units)：每单位金额 × 数量（每堂 × 堂数、每人 × 人数）。
+- format_cents(cents, fixed=False)：600 / 600.50；fixed=True 时固定两位 600.00。
+- cents_to_yuan(cents)：分 → 元（写入 Excel 数值单元格用）。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from money import parse_money, parse_money_text
+    from money import to_cents, split_percent, split_units, format_cents, cents_to_yuan
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+# 货币符号、千位符与空白：逐字删除；HKD / HK 前缀先整体去掉
+_DELETE = str.maketrans("", "", "$, \t\r\n\xa0\u3000")
+
+
+def _parse_one(text: str) -> float:
+    s = text.replace("HKD", "").replace("HK", "").translate(_DELETE)
+    negative = s[:1] == "(" and s[-1:] == ")"
+    try:
+        value = float(s.strip("()"))
+    except ValueError:
+        return math.nan
+    if not math.isfinite(value):   # float() 也接受 "inf" / "nan"，金额中一律视为无法解析
+        return math.nan
+    return -value if negative else value
+
+
+# pyarrow 可用时唯一值整批在 C++ 内核里清洗（规则与 _parse_one 相同）
+_ARROW_NOISE = r"HKD|HK|\$|,|[\s\x{a0}\x{3000}]"
+_ARROW_NUMBER = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+
+
+def _parse_many(uniques) -> np.ndarray:
+    if pa is None:
+        return np.fromiter((_parse_one(str(u)) for u in uniques), dtype=float, count=len(uniques))
+    arr = pa.array([str(u) for u in uniques], type=pa.string())
+    s = pc.replace_substring_regex(arr, _ARROW_NOISE, "")
+    negative = pc.and_(pc.starts_with(s, "("), pc.ends_with(s, ")"))
+    s = pc.utf8_trim(s, "()")
+    s = pc.if_else(pc.match_substring_regex(s, _ARROW_NUMBER), s, pa.scalar(None, pa.string()))
+    values = pc.cast(s, pa.float64())
+    values = pc.if_else(negative, pc.negate(values), values)
+    return values.to_numpy(zero_copy_only=False)
+
+
+def parse_money(values) -> pd.Series:
+    """金额列 → float64（无法解析为 NaN）；已是数值列时直接转 float"""
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.astype(float)
+
+    codes, uniques = pd.factorize(series)
+    parsed = _parse_many(uniques)
+    out = np.full(len(series), np.nan)
+    valid = codes >= 0
+    out[valid] = parsed[codes[valid]]
+    return pd.Series(out, index=series.index, name=series.name)
+
+
+def parse_money_text(text) -> float:
+    """单个金额字符串 → float（无法解析为 NaN），规则与 parse_money 相同"""
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return math.nan
+    return _parse_one(str(text))
+
+
+# ========== 定点金额（分，int64）==========
+def _round_div(num, den: int):
+    """整数除法，四舍五入（0.5 远离零）；num 可为 int 或 int64 数组"""
+    num = np.asarray(num, dtype=np.int64)
+    q = (np.abs(num) * 2 + den) // (den * 2)
+    return np.sign(num) * q
+
+
+def _as_scalar_or_array(arr, scalar: bool):
+    return int(arr) if scalar else arr
+
+
+def to_cents(values):
+    """金额 → 分（int64）。数值按四舍五入到分，文本先经 parse_money 解析；NaN / 无法解析记为 0。"""
+    scalar = np.ndim(values) == 0
+    if scalar:
+        yuan = np.array([values if isinstance(values, (int, float, np.number)) else parse_money_text(values)], dtype=float)
+    elif isinstance(values, pd.Series) or not np.issubdtype(np.asarray(values).dtype, np.number):
+        yuan = parse_money(values).to_numpy(dtype=float)
+    else:
+        yuan = np.asarray(values, dtype=float)
+    cents = np.rint(np.nan_to_num(yuan, nan=0.0) * 100).astype(np.int64)
+    return int(cents[0]) if scalar else cents
+
+
+def split_percent(base_cents, percent):
+    """base × percent%（percent 支持两位小数，如 33.33），结果四舍五入到分"""
+    scalar = np.ndim(base_cents) == 0 and np.ndim(percent) == 0
+    basis_points = np.rint(np.asarray(percent, dtype=float) * 100).astype(np.int64)   # 1% = 100
+    result = _round_div(np.asarray(base_cents, dtype=np.int64) * basis_points, 10_000)
+    return _as_scalar_or_array(result, scalar)
+
+
+def split_units(rate_cents, units):
+    """每单位金额 × 数量（数量支持两位小数，如 1.5 堂），结果四舍五入到分"""
+    scalar = np.ndim(rate_cents) == 0 and np.ndim(units) == 0
+    hundredths = np.rint(np.asarray(units, dtype=float) * 100).astype(np.int64)
+    result = _round_div(np.asarray(rate_cents, dtype=np.int64) * hundredths, 100)
+    return _as_scalar_or_array(result, scalar)
+
+
+def format_cents(cents, fixed: bool = False):
+    """分 → 金额文本（不带 $）：整数元省略小数（600 / 600.50）；fixed=True 时固定两位（600.00）。数组返回 list。"""
+    if np.ndim(cents) == 0:
+        c = int(cents)
+        sign, c = ("-" if c < 0 else ""), abs(c)
+        yuan, fen = divmod(c, 100)
+        if fen == 0 and not fixed:
+            return f"{sign}{yuan}"
+        return f"{sign}{yuan}.{fen:02d}"
+    return [format_cents(c, fixed) for c in np.asarray(cents, dtype=np.int64).tolist()]
+
+
+def cents_to_yuan(cents):
+    """分 → 元（float；分是整数，换算后的两位小数是精确的十进制表示）"""
+    if np.ndim(cents) == 0:
+        return round(int(cents) / 100, 2)
+    return np.round(np.asarray(cents, dtype=np.int64) / 100, 2)
@@ -0,0 +1,158 @@
+# pdf_convert.py
+"""
+Office 文档（docx 等）批量转 PDF。
+
+两种后端：
+- soffice：无界面 LibreOffice（Linux / 未装 Word 的机器）。一次启动转换一整批文件，
+  开 N 个进程并行，每个进程固定使用自己的用户配置目录（互不加锁、跨次运行复用，免去首次初始化）。
+- word：docx2pdf 调用 Microsoft Word（Windows / macOS）。同一输出目录的文件先集中到临时目录，
+  整个目录交给 docx2pdf 一次转换，共用一个 Word 会话，不再每个文件启动一次。
+backend="auto" 时：Windows / macOS 上装有 docx2pdf 则用 word，否则找 soffice。
+
+is_up_to_date(src, pdf)：PDF 存在且不早于源文件时无需重新转换。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from pdf_convert import convert_to_pdf, is_up_to_date
+    results = convert_to_pdf([("a.docx", "out/"), ("b.docx", "out/")], workers=4)   # {源文件: 是否成功}
+"""
+import math
+import os
+import pathlib
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SOFFICE_CANDIDATES = [
+    r"C:\Program Files\LibreOffice\program\soffice.exe",
+    r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+    "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+]
+# 每个转换进程的 LibreOffice 用户配置目录：<临时目录>/pdf_convert_lo_<序号>
+PROFILE_PREFIX = os.path.join(tempfile.gettempdir(), "pdf_convert_lo_")
+SOFFICE_TIMEOUT = 600   # 单批超时（秒）
+
+
+def pdf_path_for(src: str, out_dir: str) -> str:
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(src))[0] + ".pdf")
+
+
+def is_up_to_date(src: str, pdf: str) -> bool:
+    return os.path.exists(pdf) and os.path.getmtime(pdf) >= os.path.getmtime(src)
+
+
+def find_soffice():
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return next((p for p in SOFFICE_CANDIDATES if os.path.exists(p)), None)
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    if backend != "auto":
+        return backend
+    if sys.platform in ("win32", "darwin"):
+        try:
+            import docx2pdf  # noqa: F401
+            return "word"
+        except ImportError:
+            pass
+    if find_soffice():
+        return "soffice"
+    raise RuntimeError("❌ 找不到可用的转换程序：请安装 LibreOffice（soffice），或在 Windows / macOS 上安装 Word 与 docx2pdf")
+
+
+def _group_by_dir(jobs):
+    groups = {}
+    for src, out_dir in jobs:
+        groups.setdefault(os.path.abspath(out_dir), []).append(os.path.abspath(src))
+    return groups
+
+
+def _collect(sources, out_dir, started):
+    """转换后以输出文件是否生成（且为本次写入）判断成败"""
+    results = {}
+    for src in sources:
+        pdf = pdf_path_for(src, out_dir)
+        results[src] = os.path.exists(pdf) and os.path.getmtime(pdf) >= started - 1
+    return results
+
+
+# ========== soffice 后端 ==========
+def _soffice_batch(soffice, slots, out_dir, sources):
+    slot = slots.get()
+    try:
+        profile = pathlib.Path(f"{PROFILE_PREFIX}{slot}").as_uri()
+        started = time.time()
+        subprocess.run(
+            [soffice, f"-env:UserInstallation={profile}", "--headless", "--norestore", "--nolockcheck",
+             "--convert-to", "pdf", "--outdir", out_dir, *sources],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=SOFFICE_TIMEOUT,
+            check=False,
+        )
+        return _collect(sources, out_dir, started)
+    finally:
+        slots.put(slot)
+
+
+def _convert_soffice(jobs, workers):
+    soffice = find_soffice()
+    if not soffice:
+        raise RuntimeError("❌ 找不到 soffice，请先安装 LibreOffice")
+    groups = _group_by_dir(jobs)
+    workers = max(1, min(workers, len(jobs)))
+    slots = queue.Queue()
+    for i in range(workers):
+        slots.put(i)
+
+    # 每个输出目录按进程数切成若干批，每批由一个 soffice 进程一次转换
+    batches = []
+    for out_dir, sources in groups.items():
+        os.makedirs(out_dir, exist_ok=True)
+        size = math.ceil(len(sources) / workers)
+        batches += [(out_dir, sources[i:i + size]) for i in range(0, len(sources), size)]
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(lambda b: _soffice_batch(soffice, slots, *b), batches):
+            results.update(part)
+    return results
+
+
+# ========== word 后端（docx2pdf）==========
+def _convert_word(jobs):
+    from docx2pdf import convert
+
+    results = {}
+    for out_dir, sources in _group_by_dir(jobs).items():
+        os.makedirs(out_dir, exist_ok=True)
+        started = time.time()
+        with tempfile.TemporaryDirectory() as staging:
+            for src in sources:
+                shutil.copy2(src, staging)
+            try:
+                convert(staging, out_dir)   # 整个目录一次转换，共用一个 Word 会话
+            except Exception as e:
+                print(f"   ❌ Word 转换出错: {e}")
+        results.update(_collect(sources, out_dir, started))
+    return results
+
+
+def convert_to_pdf(jobs, backend: str = "auto", workers: int = None):
+    """
+    jobs：[(源文件, 输出目录)]；输出文件名为源文件名换成 .pdf。
+    返回 {源文件绝对路径: 是否成功}。
+    """
+    if not jobs:
+        return {}
+    backend = resolve_backend(backend)
+    if backend == "word":
+        return _convert_word(jobs)
+    return _convert_soffice(jobs, workers or min(4, os.cpu_count() or 1))
@@ -0,0 +1,75 @@
+# pdf_merge.py
+"""
+PDF 合并（PyMuPDF / fitz）：每个文件只打开一次，逐页判断是否空白，非空白页随即追加到输出文档。
+
+空白页判断由便宜到贵：
+1. 内容流为空 → 空白；
+2. 扫描内容流的操作符：有显示文字的操作符（Tj / TJ / ' / "）→ 非空白；
+   既无文字、也无任何绘制操作（填充、描边、图片 Do、渐变 sh、内嵌图片 BI）→ 空白；
+3. 只有图形 / 图片、没有文字时（可能是白色底图，也可能是扫描件）→ 低分辨率渲染成灰度图，全白才算空白。
+旧做法用文字提取判断，会把只有图片的页面误当成空白页。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from pdf_merge import merge_pdfs
+    stats = merge_pdfs(["a.pdf", "b.pdf"], "合并.pdf")
+    # {"pages": 写入页数, "blank": {文件: 跳过的空白页数}, "errors": {文件: 无法读取的原因}}
+"""
+import re
+
+import fitz  # PyMuPDF
+
+TEXT_OPS = {b"Tj", b"TJ", b"'", b'"'}
+PAINT_OPS = {b"f", b"F", b"f*", b"B", b"B*", b"b", b"b*", b"S", b"s", b"Do", b"sh", b"BI"}
+# 先去掉字符串、名称、注释，避免其中的字母被误当成操作符
+_NOISE = re.compile(rb"\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>|/[^\s/\[\]()<>{}%]*|%[^\r\n]*")
+_OPERATOR = re.compile(rb"[A-Za-z]+\*?|['\"]")
+RASTER_ZOOM = 0.5     # 36 dpi 灰度渲染
+WHITE_LEVEL = 250     # 灰度值不低于此值视为白色
+
+
+def is_blank_page(page) -> bool:
+    content = page.read_contents()   # 页面全部内容流（已解压、拼接）
+    if not content.strip():
+        return True
+    ops = set(_OPERATOR.findall(_NOISE.sub(b" ", content)))
+    if ops & TEXT_OPS:
+        return False
+    if not ops & PAINT_OPS:
+        return True
+    pix = page.get_pixmap(matrix=fitz.Matrix(RASTER_ZOOM, RASTER_ZOOM), colorspace=fitz.csGRAY, alpha=False)
+    return min(pix.samples) >= WHITE_LEVEL
+
+
+def merge_pdfs(paths, out_path: str, skip_blank: bool = True):
+    """
+    按 paths 顺序合并；每个源文件打开一次，逐页判断、追加，追加完即关闭。
+    返回 {"pages": 写入页数, "blank": {源文件: 跳过的空白页数}, "errors": {源文件: 原因}}；
+    无法打开的文件跳过并记入 errors；没有可写入的页面时不生成文件。
+    """
+    out = fitz.open()
+    blank, errors = {}, {}
+    for path in paths:
+        try:
+            src = fitz.open(path)
+        except Exception as e:
+            errors[path] = str(e)
+            continue
+        with src:
+            # 连续的非空白页作为一段一次追加
+            start = None
+            for i, page in enumerate(src):
+                if skip_blank and is_blank_page(page):
+                    blank[path] = blank.get(path, 0) + 1
+                    if start is not None:
+                        out.insert_pdf(src, from_page=start, to_page=i - 1)
+                        start = None
+                elif start is None:
+                    start = i
+            if start is not None:
+                out.insert_pdf(src, from_page=start, to_page=src.page_count - 1)
+    pages = out.page_count
+    if pages:
+        out.save(out_path, garbage=1, deflate=True)
+    out.close()
+    return {"pages": pages, "blank": blank, "errors": errors}
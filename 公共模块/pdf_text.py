@@ -0,0 +1,132 @@
+# pdf_text.py
+"""
+发票 PDF 按页惰性提取文本（只用 PyMuPDF / fitz），并按文件 SHA-256 缓存每页文本。
+
+- 只在用到某页时才提取该页；search() / find_page() 找到目标即停止，不再整份提取后再匹配。
+- 每页的纯文本（get_text()）与按行文本（get_text("dict") 的行）分别缓存；
+  缓存文件以 PDF 内容的 SHA-256 命名，文件改名、移动后仍可命中，内容变了自然失效。
+- 缓存写入先写临时文件再替换，多个进程各自处理不同 PDF 时互不影响。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from pdf_text import PdfText
+    with PdfText("invoice.pdf", cache_dir=".cache/页面文本") as pdf:
+        found = pdf.search({"发票号": r"Invoice Number\\s+(\\d+)"})
+        page = pdf.find_page("山景服務處")
+        lines = pdf.page_lines(page)
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import fitz  # PyMuPDF
+
+CACHE_VERSION = 1
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class PdfText:
+    def __init__(self, path: str, cache_dir: str = None):
+        self.path = path
+        self.sha256 = file_sha256(path)
+        self._doc = None
+        self._cache_file = os.path.join(cache_dir, f"{self.sha256}.json") if cache_dir else None
+        self._cache = {"version": CACHE_VERSION, "pages": None, "text": {}, "lines": {}}
+        self._dirty = False
+        if self._cache_file and os.path.exists(self._cache_file):
+            try:
+                with open(self._cache_file, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self._cache = data
+            except (OSError, ValueError):
+                pass   # 缓存损坏时当作没有缓存
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._dirty and self._cache_file:
+            os.makedirs(os.path.dirname(self._cache_file), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self._cache_file), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._cache, f, ensure_ascii=False)
+            os.replace(tmp, self._cache_file)
+            self._dirty = False
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    # ========== 按页提取（带缓存）==========
+    @property
+    def doc(self):
+        if self._doc is None:
+            self._doc = fitz.open(self.path)
+        return self._doc
+
+    @property
+    def page_count(self) -> int:
+        if self._cache["pages"] is None:
+            self._cache["pages"] = self.doc.page_count
+            self._dirty = True
+        return self._cache["pages"]
+
+    def page_text(self, i: int) -> str:
+        text = self._cache["text"].get(str(i))
+        if text is None:
+            text = self.doc.load_page(i).get_text()
+            self._cache["text"][str(i)] = text
+            self._dirty = True
+        return text
+
+    def page_lines(self, i: int):
+        """该页的文本行（同一行的各段以空格连接，去掉首尾空白）"""
+        lines = self._cache["lines"].get(str(i))
+        if lines is None:
+            lines = [
+                " ".join(span["text"].strip() for span in line["spans"]).strip()
+                for block in self.doc.load_page(i).get_text("dict")["blocks"]
+                for line in block.get("lines", [])
+            ]
+            self._cache["lines"][str(i)] = lines
+            self._dirty = True
+        return lines
+
+    def pages(self):
+        """依次产出 (页号, 文本)，调用方停止迭代后不再提取后续页面"""
+        for i in range(self.page_count):
+            yield i, self.page_text(i)
+
+    # ========== 查找（找到即停止）==========
+    def find_page(self, anchor: str):
+        """第一个包含 anchor 的页号；没有则为 None"""
+        for i, text in self.pages():
+            if anchor in text:
+                return i
+        return None
+
+    def search(self, patterns: dict):
+        """
+        patterns：{名称: 正则}。逐页匹配，每个正则取第一次匹配，全部找到后即停止；
+        返回 {名称: re.Match 或 None}。
+        """
+        found = dict.fromkeys(patterns)
+        for _, text in self.pages():
+            for name, pattern in patterns.items():
+                if found[name] is None:
+                    found[name] = re.search(pattern, text)
+            if all(m is not None for m in found.values()):
+                break
+        return found
@@ -0,0 +1,205 @@
+# receipt_ledger.py
+"""
+收据账本：把每次导出的 課程收據 / 會費收據 增量写入本地 SQLite，以 編號 为键。
+
+- receipts：每张收据一行（kind + 編號），记录经办人、付款方式、金额（分）、日期、是否撤銷及行指纹。
+- daily_totals：按 (日期, 經辨人員, 付款方式) 累计的金额与笔数。
+  只对新增/有变化的收据做增减，出报表时汇总这张小表，不必重扫全部历史收据。
+- 撤銷的收据保留在 receipts 中但不计入 daily_totals；撤銷状态变化时自动扣回/补回。
+- 经办人 / 付款方式为空值时以占位符入库，取出时还原为 NaN，
+  与 数据合并 中 build_staff_method_pivot() 的口径一致（空字符串经办人不计入个人与方式统计）。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from receipt_ledger import ReceiptLedger
+    with ReceiptLedger("收据账本.sqlite") as ledger:
+        counts = ledger.ingest(df_body, "課程收據", "編號", "經辨人員", "付款方式", "總額", "日期", "撤銷")
+        pivot = ledger.pivot(start_date, end_date)
+"""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+LEDGER_VERSION = 1
+NULL_KEY = "\u2400"                     # 空值（NaN）占位符「␀」
+RECEIPT_DATE_FORMAT = "%Y/%m/%d %H:%M"  # 导出格式：2025/11/6 17:33
+NOT_VOIDED = {"", "null", "否", "0", "false", "False", "N", "n"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    kind         TEXT    NOT NULL,
+    receipt_no   TEXT    NOT NULL,
+    staff        TEXT    NOT NULL,
+    method       TEXT    NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    day          TEXT    NOT NULL,
+    voided       INTEGER NOT NULL,
+    row_hash     INTEGER NOT NULL,
+    PRIMARY KEY (kind, receipt_no)
+);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day          TEXT    NOT NULL,
+    staff        TEXT    NOT NULL,
+    method       TEXT    NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    n            INTEGER NOT NULL,
+    PRIMARY KEY (day, staff, method)
+);
+"""
+
+_FIELDS = ["staff", "method", "amount_cents", "day", "voided"]
+
+
+def _key_text(series: pd.Series) -> pd.Series:
+    """去空白；NaN → 占位符"""
+    return series.astype(str).str.strip().where(series.notna(), NULL_KEY)
+
+
+def _day_filter(start, end):
+    if start is None and end is None:
+        return "", []
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("day >= ?")
+        params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+    if end is not None:
+        clauses.append("day <= ?")
+        params.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+    return " AND day != '' AND " + " AND ".join(clauses), params
+
+
+class ReceiptLedger:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, LEDGER_VERSION):
+            self.conn.close()
+            raise RuntimeError(f"收据账本版本不符（{version} ≠ {LEDGER_VERSION}），请删除 {path} 后重建")
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {LEDGER_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ========== 规范化一批导出行 ==========
+    @staticmethod
+    def _normalize(df, kind, id_col, staff_col, method_col, amount_col, date_col, void_col) -> pd.DataFrame:
+        ids = df[id_col].astype(str).str.strip().where(df[id_col].notna(), "")
+        amount = pd.to_numeric(df[amount_col], errors="coerce").fillna(0.0)
+        dates = pd.to_datetime(df[date_col], format=RECEIPT_DATE_FORMAT, errors="coerce")
+        if void_col and void_col in df.columns:
+            voided = ~df[void_col].fillna("").astype(str).str.strip().isin(NOT_VOIDED)
+        else:
+            voided = pd.Series(False, index=df.index)
+
+        rows = pd.DataFrame({
+            "kind": kind,
+            "receipt_no": ids,
+            "staff": _key_text(df[staff_col]),
+            "method": _key_text(df[method_col]),
+            "amount_cents": np.rint(amount.to_numpy() * 100).astype(np.int64),
+            "day": dates.dt.strftime("%Y-%m-%d").fillna(""),
+            "voided": voided.astype(np.int64).to_numpy(),
+        })
+        rows = rows[rows["receipt_no"] != ""].drop_duplicates("receipt_no", keep="last")
+        # 行指纹：任一统计相关字段变化即视为变更
+        rows["row_hash"] = pd.util.hash_pandas_object(rows[_FIELDS], index=False).to_numpy().view(np.int64)
+        return rows.reset_index(drop=True)
+
+    # ========== 增量写入 ==========
+    def ingest(self, df: pd.DataFrame, kind: str, id_col: str, staff_col: str, method_col: str,
+               amount_col: str, date_col: str, void_col: str = None) -> dict:
+        """
+        把一份导出（不含【總計】行）并入账本：只处理新增或字段有变化的收据。
+        返回：{"新增": n, "變更": n, "撤銷": n, "未變": n}
+        """
+        incoming = self._normalize(df, kind, id_col, staff_col, method_col, amount_col, date_col, void_col)
+        conn = self.conn
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (receipt_no TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM incoming")
+            conn.executemany("INSERT INTO incoming VALUES (?)", ((r,) for r in incoming["receipt_no"]))
+            old = pd.read_sql_query(
+                "SELECT r.receipt_no, r.staff, r.method, r.amount_cents, r.day, r.voided, r.row_hash "
+                "FROM receipts r JOIN incoming i ON r.receipt_no = i.receipt_no WHERE r.kind = ?",
+                conn, params=[kind],
+            )
+
+            merged = incoming.merge(old, on="receipt_no", how="left", suffixes=("", "_old"))
+            is_new = merged["row_hash_old"].isna()
+            is_changed = ~is_new & (merged["row_hash"] != merged["row_hash_old"])
+            touched = merged[is_new | is_changed]
+
+            # 旧版本（未撤銷）扣回，新版本（未撤銷）补入
+            old_part = touched[~is_new[touched.index] & (touched["voided_old"] == 0)]
+            new_part = touched[touched["voided"] == 0]
+            delta = pd.concat([
+                pd.DataFrame({
+                    "day": old_part["day_old"], "staff": old_part["staff_old"], "method": old_part["method_old"],
+                    "amount_cents": -old_part["amount_cents_old"].astype(np.int64), "n": -1,
+                }),
+                pd.DataFrame({
+                    "day": new_part["day"], "staff": new_part["staff"], "method": new_part["method"],
+                    "amount_cents": new_part["amount_cents"], "n": 1,
+                }),
+            ], ignore_index=True)
+            if not delta.empty:
+                delta = delta.groupby(["day", "staff", "method"], as_index=False)[["amount_cents", "n"]].sum()
+                conn.executemany(
+                    "INSERT INTO daily_totals (day, staff, method, amount_cents, n) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(day, staff, method) DO UPDATE SET "
+                    "amount_cents = amount_cents + excluded.amount_cents, n = n + excluded.n",
+                    delta.itertuples(index=False, name=None),
+                )
+                conn.execute("DELETE FROM daily_totals WHERE n = 0")
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO receipts "
+                "(kind, receipt_no, staff, method, amount_cents, day, voided, row_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                touched[["kind", "receipt_no", *_FIELDS, "row_hash"]].astype(object).itertuples(index=False, name=None),
+            )
+
+        newly_voided = (touched["voided"] == 1) & (is_new[touched.index] | (touched["voided_old"] == 0))
+        return {
+            "新增": int(is_new.sum()),
+            "變更": int(is_changed.sum()),
+            "撤銷": int(newly_voided.sum()),
+            "未變": int(len(merged) - len(touched)),
+        }
+
+    # ========== 统计查询（只读 daily_totals）==========
+    def pivot(self, start=None, end=None) -> pd.Series:
+        """
+        返回与 build_staff_method_pivot() 同结构的 Series：
+        以 (經辨人員, 付款方式) 为索引的金额（元），空值还原为 NaN，空字符串经办人已剔除。
+        start / end：含首尾两日；省略时统计账本内全部收据。
+        """
+        where, params = _day_filter(start, end)
+        df = pd.read_sql_query(
+            "SELECT staff, method, SUM(amount_cents) AS cents FROM daily_totals "
+            f"WHERE staff != ''{where} GROUP BY staff, method",
+            self.conn, params=params,
+        )
+        long_df = pd.DataFrame({
+            "經辨人員": df["staff"].where(df["staff"] != NULL_KEY).astype(object),
+            "付款方式": df["method"].where(df["method"] != NULL_KEY).astype(object),
+            "金額": df["cents"].astype(float) / 100,
+        })
+        return long_df.groupby(["經辨人員", "付款方式"], dropna=False, sort=True)["金額"].sum()
+
+    def grand_total(self, start=None, end=None) -> float:
+        """期间内全部未撤銷收据的金额合计（含经办人为空的收据）"""
+        where, params = _day_filter(start, end)
+        cents = self.conn.execute(
+            f"SELECT COALESCE(SUM(amount_cents), 0) FROM daily_totals WHERE 1 = 1{where}", params
+        ).fetchone()[0]
+        return cents / 100
@@ -0,0 +1,193 @@
+# receipt_loader.py
+"""
+屯門婦聯「會員及課程管理系統」CSV 导出文件的统一读取模块
+
+- 按导出类型（課程收據 / 會費收據 / 課程）声明列类型：
+  付款方式、經辨人員、會員類別 读成 category，编号类列固定为字符串。
+- 金额列（$1,234.00）在读取时统一解析为 float（见 money.py），后续脚本不必再各自清洗。
+- 解析结果写入 CSV 同目录下的 .cache/ 旁路文件（Parquet，缺少 pyarrow 时用 pickle），
+  以文件 mtime + SHA-256 为键；同一份导出再次读取时直接载入旁路文件。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from receipt_loader import read_export
+    df = read_export("屯門婦聯 - 會員及課程管理系統 - 課程收據.csv")
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from money import parse_money
+
+try:
+    import pyarrow  # noqa: F401
+    SIDECAR_EXT = ".parquet"
+except ImportError:
+    SIDECAR_EXT = ".pkl"
+
+# 旁路文件格式版本：修改下方 schema 或解析逻辑后 +1，旧缓存自动失效
+LOADER_VERSION = 3
+CACHE_DIRNAME = ".cache"
+
+# ========== 导出文件列定义 ==========
+EXPORT_SCHEMAS = {
+    "課程收據": {
+        "category": ["付款方式", "經辨人員", "會員類別"],
+        "text": ["編號", "會員編號", "會員姓名(中文)", "會員姓名(英文)", "課程名稱", "服務中心", "報名中心", "日期", "撤銷"],
+        "money": ["課程收費", "其他收費", "扣減", "總額"],
+    },
+    "會費收據": {
+        "category": ["付款方式", "經辨人員", "會員類別"],
+        "text": ["編號", "中心", "會員編號", "會員姓名(中文)", "會員姓名(英文)", "日期", "撤銷"],
+        "money": ["會費"],
+    },
+    "課程": {
+        "category": ["服務中心", "類別", "逢星期"],
+        "text": ["編號", "名稱", "上課日期", "時間", "堂數", "上限", "收費", "導師", "操作"],
+        "money": [],
+    },
+}
+
+
+def detect_kind(path: str):
+    """按文件名识别导出类型（文件名形如「屯門婦聯 - 會員及課程管理系統 - 課程收據.csv」）"""
+    name = os.path.basename(path)
+    for kind in ("課程收據", "會費收據"):
+        if kind in name:
+            return kind
+    if name.endswith("課程.csv"):
+        return "課程"
+    return None
+
+
+# ========== 旁路缓存 ==========
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_paths(path: str, variant: str):
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+    name = os.path.basename(path)
+    return folder, os.path.join(folder, f"{name}.meta.json"), f"{name}.{variant}."
+
+
+def _current_sha(path: str, meta_path: str) -> str:
+    """mtime / 大小未变时沿用记录的哈希，避免每次都重新计算整个文件"""
+    st = os.stat(path)
+    meta = {}
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+    if meta.get("mtime_ns") == st.st_mtime_ns and meta.get("size") == st.st_size and meta.get("sha256"):
+        return meta["sha256"]
+
+    sha = _file_sha256(path)
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": sha}, f)
+    return sha
+
+
+def _read_sidecar(sidecar: str) -> pd.DataFrame:
+    if not sidecar.endswith(".parquet"):
+        return pd.read_pickle(sidecar)
+    df = pd.read_parquet(sidecar)
+    # Parquet 把文本列的缺失值读回为 None；统一还原为 NaN，与直接解析 CSV 的结果一致
+    # （否则 astype(str) 得到 'None' 而不是 'nan'）
+    obj_cols = df.columns[df.dtypes == object]
+    if len(obj_cols):
+        df[obj_cols] = df[obj_cols].where(df[obj_cols].notna(), np.nan)
+    return df
+
+
+def _write_sidecar(df: pd.DataFrame, sidecar: str):
+    tmp = sidecar + ".tmp"
+    if sidecar.endswith(".parquet"):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, sidecar)
+
+
+def clear_cache(path: str):
+    """删除某个 CSV 的全部旁路文件"""
+    folder, meta_path, _ = _cache_paths(path, "")
+    if not os.path.isdir(folder):
+        return
+    prefix = os.path.basename(path) + "."
+    for fname in os.listdir(folder):
+        if fname.startswith(prefix):
+            os.remove(os.path.join(folder, fname))
+
+
+# ========== CSV 解析 ==========
+def _parse_csv(path: str, kind, parse_money_cols: bool, as_text: bool, encoding: str) -> pd.DataFrame:
+    if as_text:
+        df = pd.read_csv(path, dtype=str, encoding=encoding).fillna("")
+        return df.apply(lambda col: col.str.strip())
+
+    schema = EXPORT_SCHEMAS.get(kind, {})
+    header = pd.read_csv(path, nrows=0, encoding=encoding).columns
+    text_cols = set(schema.get("text", [])) | set(schema.get("category", []))
+    money_cols = [c for c in schema.get("money", []) if c in header]
+    if parse_money_cols:
+        text_cols |= set(money_cols)
+
+    df = pd.read_csv(path, dtype={c: str for c in header if c in text_cols}, encoding=encoding)
+
+    for col in schema.get("category", []):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    if parse_money_cols:
+        for col in money_cols:
+            df[col] = parse_money(df[col])
+    return df
+
+
+def read_export(path: str, kind=None, parse_money_cols: bool = True, as_text: bool = False,
+                use_cache: bool = True, encoding: str = "utf-8-sig") -> pd.DataFrame:
+    """
+    读取屯門婦聯 CSV 导出文件。
+    - kind：'課程收據' / '會費收據' / '課程'；为 None 时按文件名识别。
+    - parse_money_cols：金额列解析为 float（as_text=True 时忽略）。
+    - as_text：全部列读为去空白的字符串（空值为 ""），兼容 dtype=str 的旧写法。
+    - use_cache：命中旁路文件时直接载入，否则解析 CSV 并写入旁路文件。
+    文件不存在时抛出 FileNotFoundError，由调用方按各自的方式报错。
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+    kind = kind or detect_kind(path)
+    variant = f"v{LOADER_VERSION}-{kind or 'raw'}-{'text' if as_text else ('money' if parse_money_cols else 'raw')}"
+    if not use_cache:
+        return _parse_csv(path, kind, parse_money_cols, as_text, encoding)
+
+    folder, meta_path, prefix = _cache_paths(path, variant)
+    try:
+        sha = _current_sha(path, meta_path)
+        sidecar = os.path.join(folder, f"{prefix}{sha[:16]}{SIDECAR_EXT}")
+        if os.path.exists(sidecar):
+            return _read_sidecar(sidecar)
+    except Exception:
+        # 缓存目录不可写/旁路文件损坏：退回直接解析
+        return _parse_csv(path, kind, parse_money_cols, as_text, encoding)
+
+    df = _parse_csv(path, kind, parse_money_cols, as_text, encoding)
+    try:
+        for fname in os.listdir(folder):
+            if fname.startswith(prefix):
+                os.remove(os.path.join(folder, fname))
+        _write_sidecar(df, sidecar)
+    except Exception:
+        pass
+    return df
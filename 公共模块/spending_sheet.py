@@ -0,0 +1,63 @@
+# spending_sheet.py
+"""
+「會計及財務記賬系統 - Excel滙入記錄模板 - 支出賬」写入，供 1A（导师费）与 1B（杂费）共用。
+
+- 数据从第 9 行开始，A 列为序号；B~E、L、M 为固定值，由 spending_row() 统一填充。
+- find_append_row(ws)：一次读取 A 列，返回第一个空行与已有的最大序号（不再逐行 ws[f"A{r}"] 试探）。
+- write_rows(ws, first_row, rows)：整批按行列号写入（ws.cell），不再逐格拼接 "A9" 形式的坐标字符串。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from spending_sheet import SPENDING_SHEET, FIRST_DATA_ROW, spending_row, find_append_row, write_rows
+"""
+SPENDING_SHEET = "支出賬"
+FIRST_DATA_ROW = 9
+DATE_FORMAT = "yyyy-mm-dd"
+EFFECTIVE_DATE_COLUMN = 6   # F 列：生效日期
+
+
+def spending_row(seq, effective_date, account, account_name, entry_date, desc, amount, payee, ref, *extra):
+    """按模板列顺序（A~O，其后为附加列）构造一行"""
+    return [
+        seq,             # A 序号
+        "T005",          # B
+        "山景-SK",       # C
+        "---",           # D
+        "---",           # E
+        effective_date,  # F 生效日期
+        account,         # G 科目编号
+        account_name,    # H 科目名称
+        entry_date,      # I 录入日期
+        desc,            # J 描述
+        amount,          # K 金额（元）
+        "否",            # L
+        "否",            # M
+        payee,           # N 收款人
+        ref,             # O 编号
+        *extra,
+    ]
+
+
+def find_append_row(ws, first_row: int = FIRST_DATA_ROW):
+    """从 first_row 起找 A 列第一个空行；返回 (空行行号, 已有最大序号)"""
+    row, max_seq = first_row, 0
+    for (value,) in ws.iter_rows(min_row=first_row, max_col=1, values_only=True):
+        if value is None:
+            break
+        if isinstance(value, int):
+            max_seq = max(max_seq, value)
+        row += 1
+    return row, max_seq
+
+
+def write_rows(ws, first_row: int, rows, number_formats=None):
+    """
+    从 first_row 起逐行写入 rows（列表的列表）。
+    number_formats：{列号: 格式}，如 {EFFECTIVE_DATE_COLUMN: DATE_FORMAT}。
+    """
+    number_formats = number_formats or {}
+    for r, values in enumerate(rows, start=first_row):
+        for c, value in enumerate(values, start=1):
+            cell = ws.cell(row=r, column=c, value=value)
+            if c in number_formats:
+                cell.number_format = number_formats[c]
@@ -0,0 +1,44 @@
+# xlsx_style.py
+"""
+openpyxl 写出时的共享样式：每种 (字体, 边框, 对齐) 组合只登记一次，单元格只引用样式 ID。
+配合 write-only 工作簿逐行 append，不必写完再读回、逐格设置样式。
+
+用法：
+    sys.path.append(<仓库根目录>/公共模块)
+    from xlsx_style import StylePool, styled_cell
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("表1")
+    left = StylePool(wb).get(alignment=Alignment(horizontal="left"))
+    ws.append([styled_cell(ws, v, left) for v in values])
+"""
+from openpyxl.cell.cell import Cell
+from openpyxl.styles.cell_style import StyleArray
+
+
+class StylePool:
+    """
+    把 (font, border, alignment) 组合登记到 workbook 一次，得到共享样式 ID（StyleArray）。
+    写单元格时只拷贝这个小数组，不再逐格复制字体/边框/对齐对象。
+    """
+    def __init__(self, wb):
+        self.wb = wb
+        self._cache = {}
+
+    def get(self, font=None, border=None, alignment=None) -> StyleArray:
+        key = (font, border, alignment)
+        style = self._cache.get(key)
+        if style is None:
+            style = StyleArray()
+            if font is not None:
+                style.fontId = self.wb._fonts.add(font)
+            if border is not None:
+                style.borderId = self.wb._borders.add(border)
+            if alignment is not None:
+                style.alignmentId = self.wb._alignments.add(alignment)
+            self._cache[key] = style
+        return style
+
+
+def styled_cell(ws, value, style: StyleArray) -> Cell:
+    # 与 openpyxl 的 WriteOnlyCell 一样先占位 A1，append() 时再改成实际坐标
+    return Cell(ws, row=1, column=1, value=value, style_array=style)
@@ -0,0 +1,452 @@
+"""
+公共模块 性能测试（合成数据）
+
+用法：
+    python 性能测试.py 加载 [--rows 100000]
+    python 性能测试.py 金额 [--n 1000000]
+    python 性能测试.py 模板 [--n 500] [--template 领款单-模板.docx]
+    python 性能测试.py 发票 [--pages 50] [--anchor 10]
+    python 性能测试.py 合并 [--n 300]
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+import warnings
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from receipt_loader import read_export
+from money import parse_money, parse_money_text
+from docx_cache import render_docx
+from pdf_text import PdfText
+from pdf_merge import merge_pdfs
+
+METHODS = ["現金", "FPS", "PayPal", "支票"]
+MEMBER_TYPES = ["普通會員", "長者會員", "學生會員", "家庭會員", "非會員"]
+
+
+# ========== 合成「課程收據」导出 ==========
+def make_course_receipts(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    fee = rng.integers(1, 40, rows) * 50.0
+    other = np.where(rng.random(rows) < 0.1, 20.0, 0.0)
+    discount = np.where(rng.random(rows) < 0.2, 30.0, 0.0)
+    total = fee + other - discount
+
+    def money(values):
+        return [f"${v:,.2f}" for v in values]
+
+    return pd.DataFrame({
+        "#": np.arange(1, rows + 1),
+        "編號": [f"RS{i:09d}" for i in range(rows)],
+        "服務中心": "山景服務處|(undefined)",
+        "報名中心": "山景服務處|(undefined)",
+        "會員編號": [f"MS{i:09d}" for i in range(rows)],
+        "會員姓名(中文)": "",
+        "會員姓名(英文)": "",
+        "會員類別": rng.choice(MEMBER_TYPES, rows),
+        "課程名稱": [f"合成課程{i % 300}|(SIC{i % 300:05d})" for i in range(rows)],
+        "課程收費": money(fee),
+        "其他收費": money(other),
+        "扣減": np.where(discount > 0, money(discount), "null"),
+        "總額": money(total),
+        "付款方式": rng.choice(METHODS, rows),
+        "日期": "2025/11/6 17:33",
+        "撤銷": "",
+        "經辨人員": rng.choice([f"職員{i:02d}" for i in range(30)], rows),
+    })
+
+
+def timed(func, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# ========== 测试项：CSV 冷解析 vs 旁路文件热加载 ==========
+def assert_same_frame(cold: pd.DataFrame, warm: pd.DataFrame):
+    """热加载须与冷解析完全一致：缺失值的种类（NaN / None）不同也算不一致"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")   # pandas 对 NaN / None 不一致只给 FutureWarning
+        pd.testing.assert_frame_equal(cold, warm)
+    assert cold.isna().equals(warm.isna()), "缺失值位置不一致"
+    text_cols = cold.columns[cold.dtypes == object]
+    assert cold[text_cols].astype(str).equals(warm[text_cols].astype(str)), "文本列 astype(str) 结果不一致"
+
+
+def bench_load(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "屯門婦聯 - 會員及課程管理系統 - 課程收據.csv")
+        make_course_receipts(args.rows).to_csv(path, index=False, encoding="utf-8-sig")
+        print(f"合成 CSV：{args.rows} 行，{os.path.getsize(path) / 1e6:.1f} MB")
+
+        def legacy():
+            df = pd.read_csv(path)
+            for col in ["課程收費", "其他收費", "扣減", "總額"]:
+                df[col] = pd.to_numeric(df[col].replace(r"[\$,]", "", regex=True), errors="coerce")
+
+        def typed_no_cache():
+            read_export(path, use_cache=False)
+
+        t_legacy = timed(legacy)
+        t_typed = timed(typed_no_cache)
+
+        # 第一次带缓存读取：解析 + 写旁路文件
+        t0 = time.perf_counter()
+        cold = read_export(path)
+        t_cold = time.perf_counter() - t0
+
+        t_warm = timed(lambda: read_export(path), repeat=5)
+        warm = read_export(path)
+        assert_same_frame(cold, warm)
+        # 金额列不解析时（扣減 等保留文本）同样比较冷、热两次读取
+        assert_same_frame(read_export(path, parse_money_cols=False), read_export(path, parse_money_cols=False))
+        assert warm["總額"].sum() == parse_money(pd.read_csv(path)["總額"]).sum()
+
+    print(f"{'pd.read_csv + 逐列清洗':<24}{t_legacy * 1000:>10.1f} ms")
+    print(f"{'类型化解析（不缓存）':<24}{t_typed * 1000:>10.1f} ms")
+    print(f"{'冷读取（解析+写旁路）':<24}{t_cold * 1000:>10.1f} ms")
+    print(f"{'热读取（旁路文件）':<24}{t_warm * 1000:>10.1f} ms  ({t_legacy / t_warm:.1f}x)")
+
+
+# ========== 测试项：金额列解析 ==========
+def make_money_texts(n: int, distinct: bool, seed: int = 0) -> pd.Series:
+    """混合各种写法的金额文本；distinct=False 时金额集中在常见收费（接近真实导出）"""
+    rng = np.random.default_rng(seed)
+    if distinct:
+        amounts = rng.integers(0, 10_000_000, n) / 100
+    else:
+        amounts = rng.integers(1, 80, n) * 25.0
+    styles = rng.integers(0, 10, n)
+    texts = []
+    for a, st in zip(amounts, styles):
+        if st < 6:
+            texts.append(f"${a:,.2f}")
+        elif st == 6:
+            texts.append(f"HK${a:,.2f}")
+        elif st == 7:
+            texts.append(f"HKD {a:,.2f}")
+        elif st == 8:
+            texts.append(f"(${a:,.2f})")
+        else:
+            texts.append("null")
+    return pd.Series(texts, dtype=object)
+
+
+def legacy_row_loop(series: pd.Series):
+    """1A 第十节的逐行写法（只去 $ 与千位符）"""
+    out = []
+    for x in series.astype(str).tolist():
+        x = x.strip().replace("$", "").replace(",", "")
+        try:
+            out.append(float(x))
+        except ValueError:
+            out.append(np.nan)
+    return out
+
+
+def legacy_regex_chain(series: pd.Series):
+    """类别归类合并的 str.replace 链 + extract"""
+    return (
+        series.str.replace(",", "")
+        .str.replace("$", "")
+        .str.replace("HK", "")
+        .str.extract(r"(\d+\.?\d*)")[0]
+        .astype(float)
+    )
+
+
+def legacy_to_float_safe(series: pd.Series):
+    """数据合并 to_float_safe 的正则替换 + to_numeric"""
+    return pd.to_numeric(series.replace(r"[\$,]", "", regex=True), errors="coerce")
+
+
+def bench_money(args):
+    print(f"{'写法':<26}{'常见金额(ms)':>14}{'全不重复(ms)':>14}")
+    cases = {"常见金额": make_money_texts(args.n, distinct=False),
+             "全不重复": make_money_texts(args.n, distinct=True)}
+
+    # 正确性：与逐个调用 parse_money_text 的结果一致
+    for series in cases.values():
+        sample = series.iloc[:20_000]
+        expected = np.array([parse_money_text(x) for x in sample])
+        np.testing.assert_array_equal(parse_money(sample).to_numpy(), expected)
+
+    rows = [
+        ("逐行 float()（1A 第十节）", legacy_row_loop),
+        ("replace 链 + extract（类别归类）", legacy_regex_chain),
+        ("正则 + to_numeric（to_float_safe）", legacy_to_float_safe),
+        ("parse_money（factorize + 向量化）", parse_money),
+    ]
+    for label, func in rows:
+        t = [timed(lambda s=s: func(s), repeat=1) for s in cases.values()]
+        print(f"{label:<26}{t[0] * 1000:>14.1f}{t[1] * 1000:>14.1f}")
+    print("注：旧写法不识别 HKD / 括号负数，结果与 parse_money 不完全相同，仅作耗时对照。")
+
+
+# ========== 测试项：docx 模板逐份解析 vs 缓存渲染 ==========
+def make_lingkuan_template(path: str):
+    """合成一份与「领款单-模板.docx」字段相同的模板（未指定 --template 时使用）"""
+    import docx
+
+    doc = docx.Document()
+    doc.add_heading("屯門婦聯 領款單", level=1)
+    doc.add_paragraph("領款日期：{{领款日期}}　　第 {{m1}}{{m2}} 月 第 {{期}} 期")
+    doc.add_paragraph("抬頭：{{抬头}}")
+    table = doc.add_table(rows=3, cols=2)
+    table.style = "Table Grid"
+    for i, (label, tag) in enumerate([("項目名字&編號", "项目名字编号"), ("項目金額", "项目金额"), ("港幣圓數大寫", "港币圆数大写")]):
+        table.cell(i, 0).text = label
+        table.cell(i, 1).text = "{{" + tag + "}}"
+    for _ in range(40):
+        doc.add_paragraph("備註：本領款單由系統生成，經手人簽署後方為有效。")
+    doc.save(path)
+
+
+def lingkuan_contexts(n: int):
+    for i in range(n):
+        courses = [f"合成課程{i % 37 + k}(SIC25{i % 900 + k:04d})" for k in range(3)]
+        yield {
+            "领款日期": "1/11/2025", "m1": "1", "m2": "1", "期": "1",
+            "抬头": f"導師{i % 50:02d}",
+            "项目名字编号": "\n".join(courses),
+            "项目金额": f"${(i % 97 + 1) * 150:.2f}",
+            "港币圆数大写": "壹仟伍佰元正",
+        }
+
+
+def document_xml(path: str) -> bytes:
+    from lxml import etree
+
+    with zipfile.ZipFile(path) as z:
+        return etree.tostring(etree.fromstring(z.read("word/document.xml")), method="c14n")
+
+
+def bench_template(args):
+    from docxtpl import DocxTemplate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = args.template
+        if not template:
+            template = os.path.join(tmp, "领款单-模板.docx")
+            make_lingkuan_template(template)
+        contexts = list(lingkuan_contexts(args.n))
+
+        def legacy():
+            for i, ctx in enumerate(contexts):
+                doc = DocxTemplate(template)
+                doc.render(ctx)
+                doc.save(os.path.join(tmp, f"a{i}.docx"))
+
+        def cached():
+            for i, ctx in enumerate(contexts):
+                render_docx(template, ctx, os.path.join(tmp, f"b{i}.docx"))
+
+        t_legacy = timed(legacy, repeat=1)
+        t_cached = timed(cached, repeat=1)   # 含首次解析模板
+        for i in (0, len(contexts) // 2, len(contexts) - 1):
+            assert document_xml(os.path.join(tmp, f"a{i}.docx")) == document_xml(os.path.join(tmp, f"b{i}.docx"))
+
+    print(f"渲染 {args.n} 份领款单（{os.path.basename(template)}）")
+    print(f"{'DocxTemplate 逐份解析':<24}{t_legacy:>10.2f} s  ({t_legacy / args.n * 1000:.1f} ms/份)")
+    print(f"{'docx_cache 缓存渲染':<24}{t_cached:>10.2f} s  ({t_cached / args.n * 1000:.1f} ms/份，{t_legacy / t_cached:.1f}x)")
+
+
+# ========== 测试项：发票 PDF 整份提取 vs 按页惰性提取 + 缓存 ==========
+BRANCHES = ["屯門服務處", "元朗服務處", "天水圍服務處", "荃灣服務處", "大埔服務處"]
+
+
+def make_invoices(tmp: str, pages: int, anchor: int):
+    """合成多页 FB 发票（第 anchor 页为山景服務處）与打印费发票（首页为汇总，其后为明细）"""
+    import fitz
+
+    fb, hp = fitz.open(), fitz.open()
+    for i in range(1, pages + 1):
+        branch = "山景服務處" if i == anchor else BRANCHES[i % len(BRANCHES)]
+        page = fb.new_page()
+        page.insert_text((50, 50), branch, fontname="china-t")
+        head = ["Balance Due", f"HKD{i * 37 + 500:,}.00", f"# INV-{9000 + i}", "Invoice Date", "23 Dec 2025"]
+        for k, line in enumerate(head + [f"Campaign {i}-{k} impressions {k * 1234} reach {k * 321}" for k in range(40)]):
+            page.insert_text((50, 70 + 15 * k), line, fontsize=9)
+
+        page = hp.new_page()
+        body = ["Invoice Number 104233", "Total Amount 1234.50", "Clicks Charge Period 29 May 2025 - 28 Jun 2025"] if i == 1 else []
+        for k, line in enumerate(body + [f"Device SN{i:04d}-{k} mono clicks {k * 17} colour clicks {k * 3}" for k in range(45)]):
+            page.insert_text((50, 50 + 15 * k), line, fontsize=9)
+    paths = os.path.join(tmp, "fb.pdf"), os.path.join(tmp, "hp.pdf")
+    fb.save(paths[0])
+    hp.save(paths[1])
+    return paths
+
+
+def legacy_fb(path: str):
+    import fitz
+
+    for page in fitz.open(path):
+        if "山景服務處" in page.get_text():
+            return [
+                " ".join(span["text"].strip() for span in line["spans"]).strip()
+                for block in page.get_text("dict")["blocks"]
+                for line in block.get("lines", [])
+            ]
+
+
+def legacy_print(path: str):
+    from PyPDF2 import PdfReader
+
+    text = "".join(page.extract_text() for page in PdfReader(path).pages)
+    return re.search(r"Invoice Number\s+(\d+)", text), re.search(r"Total Amount\s+([0-9]+\.[0-9]{2})", text)
+
+
+def lazy_fb(path: str, cache_dir=None):
+    with PdfText(path, cache_dir) as pdf:
+        return pdf.page_lines(pdf.find_page("山景服務處"))
+
+
+def lazy_print(path: str, cache_dir=None):
+    with PdfText(path, cache_dir) as pdf:
+        found = pdf.search({"invoice": r"Invoice Number\s+(\d+)", "amount": r"Total Amount\s+([0-9]+\.[0-9]{2})"})
+    return found["invoice"], found["amount"]
+
+
+def bench_invoice(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        fb, hp = make_invoices(tmp, args.pages, args.anchor)
+        cache_dir = os.path.join(tmp, "cache")
+        assert legacy_fb(fb) == lazy_fb(fb)
+        lazy_fb(fb, cache_dir)
+        lazy_print(hp, cache_dir)
+
+        rows = [
+            ("FB：逐页 get_text + dict", lambda: legacy_fb(fb)),
+            ("FB：PdfText（无缓存）", lambda: lazy_fb(fb)),
+            ("FB：PdfText（缓存命中）", lambda: lazy_fb(fb, cache_dir)),
+            ("打印费：PyPDF2 整份提取", lambda: legacy_print(hp)),
+            ("打印费：PdfText（无缓存）", lambda: lazy_print(hp)),
+            ("打印费：PdfText（缓存命中）", lambda: lazy_print(hp, cache_dir)),
+        ]
+        print(f"{args.pages} 页发票，山景服務處在第 {args.anchor} 页；打印费字段在首页")
+        for label, func in rows:
+            try:
+                t = timed(func)
+            except ImportError as e:
+                print(f"{label:<26}{'跳过（' + str(e) + '）':>14}")
+                continue
+            print(f"{label:<26}{t * 1000:>10.1f} ms")
+
+
+# ========== 测试项：PDF 合并（文字提取判空 + PdfMerger vs pdf_merge）==========
+def make_single_pages(tmp: str, n: int):
+    """合成 n 个单页 PDF：约 80% 文字页、10% 空白页、10% 只有图片的页面（扫描件）"""
+    import fitz
+
+    rng = np.random.default_rng(0)
+    scan = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 200, 280), False)
+    scan.set_rect(scan.irect, (255,))
+    scan.set_rect(fitz.IRect(20, 20, 180, 60), (40,))   # 深色块模拟手写 / 印章
+    scan_png = scan.tobytes("png")
+
+    paths, kinds = [], []
+    for i in range(n):
+        kind = rng.choice(["文字", "空白", "图片"], p=[0.8, 0.1, 0.1])
+        doc = fitz.open()
+        page = doc.new_page()
+        if kind == "文字":
+            for k in range(30):
+                page.insert_text((50, 60 + 20 * k), f"Payment requisition {i:04d} line {k} amount ${k * 37 + i:,}.00")
+        elif kind == "图片":
+            page.insert_image(page.rect, stream=scan_png)
+        path = os.path.join(tmp, f"{i:04d}.pdf")
+        doc.save(path)
+        paths.append(path)
+        kinds.append(kind)
+    return paths, kinds
+
+
+def legacy_merge(paths, out_path):
+    from PyPDF2 import PdfMerger, PdfReader
+
+    def is_blank(path):
+        for page in PdfReader(path).pages:
+            text = page.extract_text()
+            if text and text.strip():
+                return False
+        return True
+
+    merger = PdfMerger()
+    kept = 0
+    for path in paths:
+        if not is_blank(path):
+            merger.append(path)
+            kept += 1
+    merger.write(out_path)
+    merger.close()
+    return kept
+
+
+def bench_merge(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, kinds = make_single_pages(tmp, args.n)
+        counts = {k: kinds.count(k) for k in ("文字", "空白", "图片")}
+        results = {}
+
+        def legacy():
+            results["legacy"] = legacy_merge(paths, os.path.join(tmp, "a.pdf"))
+
+        def merged():
+            results["new"] = merge_pdfs(paths, os.path.join(tmp, "b.pdf"))["pages"]
+
+        try:
+            t_legacy = timed(legacy)
+        except ImportError as e:
+            t_legacy = None
+            print(f"未安装 PyPDF2，跳过旧写法（{e}）")
+        t_new = timed(merged)
+
+    print(f"合并 {args.n} 个单页 PDF（文字 {counts['文字']}、空白 {counts['空白']}、只有图片 {counts['图片']}）")
+    if t_legacy is not None:
+        print(f"{'PdfReader 判空 + PdfMerger':<28}{t_legacy * 1000:>10.0f} ms  保留 {results['legacy']} 页")
+    print(f"{'pdf_merge 单次读取':<28}{t_new * 1000:>10.0f} ms  保留 {results['new']} 页"
+          + (f"（{t_legacy / t_new:.1f}x）" if t_legacy else ""))
+    print("注：旧写法以文字提取判空，只有图片的页面也会被当作空白页丢弃。")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="公共模块 性能测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("加载", help="CSV 冷解析 vs 旁路文件热加载")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.set_defaults(func=bench_load)
+
+    p = sub.add_parser("金额", help="金额列解析：逐行 / 旧正则写法 vs parse_money")
+    p.add_argument("--n", type=int, default=1_000_000)
+    p.set_defaults(func=bench_money)
+
+    p = sub.add_parser("模板", help="docx 模板：DocxTemplate 逐份解析 vs docx_cache 缓存渲染")
+    p.add_argument("--n", type=int, default=500)
+    p.add_argument("--template", help="模板路径（默认：合成一份领款单模板）")
+    p.set_defaults(func=bench_template)
+
+    p = sub.add_parser("发票", help="发票 PDF：整份提取 vs PdfText 按页惰性提取 + 缓存")
+    p.add_argument("--pages", type=int, default=50)
+    p.add_argument("--anchor", type=int, default=10, help="山景服務處所在页（从 1 起）")
+    p.set_defaults(func=bench_invoice)
+
+    p = sub.add_parser("合并", help="PDF 合并：文字提取判空 + PdfMerger vs pdf_merge 单次读取")
+    p.add_argument("--n", type=int, default=300)
+    p.set_defaults(func=bench_merge)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
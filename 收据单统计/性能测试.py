@@ -0,0 +1,253 @@
+"""
+数据合并 性能测试（合成数据，不读取真实收据）
+
+用法：
+    python 性能测试.py 汇总 [--rows 10000 50000 100000] [--staff 40]
+    python 性能测试.py 写出 [--rows 10000 50000 100000]
+    python 性能测试.py 内存 [--rows 50000 100000 200000] [--skip-full]
+"""
+import argparse
+import importlib.util
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_PATH = os.path.join(BASE_DIR, "数据合并1.4.3.py")
+LEGACY_SCRIPT_PATH = os.path.join(BASE_DIR, "历史版本", "数据合并1.4.2.py")
+
+METHODS = ["現金", "FPS", "PayPal", "支票", "八達通"]
+
+
+# ========== 载入被测脚本（文件名含“.”，不能直接 import）==========
+def load_merge_script(path: str = SCRIPT_PATH):
+    spec = importlib.util.spec_from_file_location("数据合并", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ========== 合成收据 CSV ==========
+def make_receipts(rows: int, staff_count: int, amount_col: str, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    staff = np.array([f"職員{i:02d}" for i in range(staff_count)])
+    amounts = rng.integers(0, 2000, rows).astype(float)
+    df = pd.DataFrame({
+        "#": np.arange(1, rows + 1),
+        "編號": [f"RS{i:09d}" for i in range(rows)],
+        "會員姓名(中文)": "",
+        "課程名稱": "合成課程",
+        amount_col: [f"${a:,.2f}" for a in amounts],
+        "付款方式": rng.choice(METHODS, rows),
+        "經辨人員": rng.choice(staff, rows),
+    })
+    total = pd.DataFrame([{"課程名稱": "【總計】", amount_col: f"${amounts.sum():,.2f}"}])
+    return pd.concat([df, total], ignore_index=True)
+
+
+def write_csv(df: pd.DataFrame, folder: str, name: str) -> str:
+    path = os.path.join(folder, name)
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+
+# ========== 1.4.3 之前的逐人过滤写法（对照组）==========
+def legacy_staff_summaries(df_course, df_fee):
+    df_course_valid = df_course[df_course["經辨人員"].astype(str).str.strip() != ""]
+    df_fee_valid = df_fee[df_fee["經辨人員"].astype(str).str.strip() != ""]
+    staff_set = set(df_course_valid["經辨人員"].dropna().astype(str).str.strip().unique())
+    staff_set |= set(df_fee_valid["經辨人員"].dropna().astype(str).str.strip().unique())
+
+    merged_vars = {}
+    for staff in sorted(s for s in staff_set if s):
+        course_rows = df_course_valid[df_course_valid["經辨人員"].astype(str).str.strip() == staff]
+        fee_rows = df_fee_valid[df_fee_valid["經辨人員"].astype(str).str.strip() == staff]
+        staff_total = float(course_rows["總額"].sum()) + float(fee_rows["會費"].sum())
+        course_group = (
+            df_course_valid[df_course_valid["經辨人員"].astype(str).str.strip() == staff]
+            .groupby("付款方式")["總額"].sum().to_dict()
+        )
+        fee_group = (
+            df_fee_valid[df_fee_valid["經辨人員"].astype(str).str.strip() == staff]
+            .groupby("付款方式")["會費"].sum().to_dict()
+        )
+        methods = {m: course_group.get(m, 0) + fee_group.get(m, 0) for m in sorted(set(course_group) | set(fee_group))}
+        line1 = f"{staff}【總計】${staff_total:.0f}"
+        line2 = "  ".join(f"{m}${v:.0f}" for m, v in methods.items())
+        merged_vars[staff] = line1 + ("\n" + line2 if line2 else "")
+    return merged_vars
+
+
+def timed(func, *args, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+# ========== 测试项：经办人汇总 ==========
+def bench_summary(args):
+    merge = load_merge_script()
+    print(f"{'行数':>8} {'经办人':>6} {'逐人过滤(s)':>12} {'单次groupby(s)':>14} {'加速':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            course_path = write_csv(make_receipts(rows, args.staff, "總額", seed=1), tmp, "課程收據.csv")
+            fee_path = write_csv(make_receipts(rows // 10, args.staff, "會費", seed=2), tmp, "會費收據.csv")
+            df_course = merge.to_float_safe(pd.read_csv(course_path), "總額", "課程收據")
+            df_fee = merge.to_float_safe(pd.read_csv(fee_path), "會費", "會費收據")
+
+            def engine():
+                pivot = merge.build_staff_method_pivot([
+                    (df_course, "經辨人員", "付款方式", "總額"),
+                    (df_fee, "經辨人員", "付款方式", "會費"),
+                ])
+                return merge.render_summaries(pivot, "bench", 0.0)[1]
+
+            t_old, old_vars = timed(legacy_staff_summaries, df_course, df_fee)
+            t_new, new_vars = timed(engine)
+            assert old_vars == new_vars, "两种写法的统计文本不一致"
+            print(f"{rows:>8} {args.staff:>6} {t_old:>12.3f} {t_new:>14.3f} {t_old / t_new:>6.1f}x")
+
+
+# ========== 1.4.3 之前的导出写法（对照组）：pandas 写源表 → 加外框 → 逐格复制到“最终输出” ==========
+def legacy_export(legacy, filename, df_course, df_fee, total_summary, merged_vars, info_rows):
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    with pd.ExcelWriter(filename, engine="openpyxl") as writer:
+        df_course.to_excel(writer, sheet_name="課程收據", index=False)
+        df_fee.to_excel(writer, sheet_name="會費收據", index=False)
+        pd.DataFrame(columns=["統計"]).to_excel(writer, sheet_name="統計結果", index=False)
+        wb = writer.book
+
+        thin = Side(border_style="thin", color="000000")
+        border = Border(top=thin, bottom=thin, left=thin, right=thin)
+        for name in ("課程收據", "會費收據", "統計結果"):
+            ws = wb[name]
+            for row in ws.iter_rows(min_row=1, max_row=ws.max_row, max_col=ws.max_column):
+                for cell in row:
+                    cell.border = border
+
+        ws_stat = wb["統計結果"]
+        align_center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        for r, text in enumerate([total_summary, *merged_vars.values()], 1):
+            ws_stat.cell(row=r, column=1, value=text)
+            ws_stat.merge_cells(start_row=r, start_column=1, end_row=r, end_column=7)
+            ws_stat.cell(row=r, column=1).font = Font(size=14, bold=True) if r == 1 else Font(size=12)
+            ws_stat.cell(row=r, column=1).alignment = align_center
+
+        ws_info = wb.create_sheet("數據信息")
+        for row in info_rows:
+            ws_info.append(list(row))
+
+        ws_out = wb.create_sheet("最终输出")
+        current_row = 1
+        current_row = legacy.copy_sheet_content(wb["課程收據"], ws_out, current_row)
+        current_row = legacy.copy_sheet_content(wb["會費收據"], ws_out, current_row)
+        start = current_row
+        current_row = legacy.copy_sheet_content(wb["統計結果"], ws_out, current_row, preserve_merges=False)
+        for r in range(start, current_row):
+            if ws_out.cell(row=r, column=1).value not in (None, ""):
+                ws_out.merge_cells(start_row=r, start_column=1, end_row=r, end_column=7)
+        for r in range(1, ws_out.max_row + 1):
+            cell = ws_out.cell(row=r, column=3)
+            a = cell.alignment
+            cell.alignment = Alignment(horizontal="left", vertical=a.vertical, wrap_text=a.wrap_text)
+
+        wb._sheets.remove(ws_out)
+        wb._sheets.insert(0, ws_out)
+
+
+# ========== 测试项：导出工作簿 ==========
+def bench_export(args):
+    merge = load_merge_script()
+    legacy = load_merge_script(LEGACY_SCRIPT_PATH)
+    print(f"{'行数':>8} {'逐格复制(s)':>12} {'一趟写出(s)':>12} {'加速':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            df_course, df_fee, total_summary, merged_vars = build_export_inputs(merge, rows)
+            info_rows = [("數據日期", "bench")]
+            old_path = os.path.join(tmp, "legacy.xlsx")
+            new_path = os.path.join(tmp, "new.xlsx")
+
+            t_old, _ = timed(legacy_export, legacy, old_path, df_course, df_fee, total_summary, merged_vars, info_rows, repeat=1)
+            t_new, _ = timed(merge.write_receipt_workbook, new_path, df_course, df_fee, total_summary, merged_vars, info_rows, repeat=1)
+            print(f"{rows:>8} {t_old:>12.2f} {t_new:>12.2f} {t_old / t_new:>6.1f}x")
+
+
+# ========== 测试项：导出峰值内存（整表 vs 流式）==========
+def build_export_inputs(merge, rows: int):
+    df_course = merge.to_float_safe(make_receipts(rows, 40, "總額", seed=1), "總額", "課程收據")
+    df_fee = merge.to_float_safe(make_receipts(rows // 10, 40, "會費", seed=2), "會費", "會費收據")
+    pivot = merge.build_staff_method_pivot([
+        (df_course, "經辨人員", "付款方式", "總額"),
+        (df_fee, "經辨人員", "付款方式", "會費"),
+    ])
+    total_summary, merged_vars = merge.render_summaries(pivot, "bench", float(df_course["總額"].iloc[-1]))
+    return df_course, df_fee, total_summary, merged_vars
+
+
+def traced_peak(func, *args, **kwargs):
+    """只统计 func 执行期间新分配内存的峰值（不含已在内存中的 DataFrame）"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6, time.perf_counter() - t0
+
+
+def bench_memory(args):
+    merge = load_merge_script()
+    print(f"{'行数':>8} {'整表峰值(MB)':>12} {'流式峰值(MB)':>12} {'流式耗时(s)':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            df_course, df_fee, total_summary, merged_vars = build_export_inputs(merge, rows)
+            info_rows = [("數據日期", "bench")]
+            path = os.path.join(tmp, "out.xlsx")
+
+            full = "—"
+            if not args.skip_full:
+                peak, _ = traced_peak(merge.write_receipt_workbook, path, df_course, df_fee,
+                                      total_summary, merged_vars, info_rows, streaming=False)
+                full = f"{peak:.1f}"
+            peak, seconds = traced_peak(merge.write_receipt_workbook, path, df_course, df_fee,
+                                        total_summary, merged_vars, info_rows, streaming=True)
+            print(f"{rows:>8} {full:>12} {peak:>12.1f} {seconds:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据合并 性能测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("汇总", help="经办人 × 付款方式 汇总：逐人过滤 vs 单次 groupby")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    p.add_argument("--staff", type=int, default=40)
+    p.set_defaults(func=bench_summary)
+
+    p = sub.add_parser("写出", help="导出工作簿：逐格复制样式 vs 一趟写出 + 共享样式")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    p.set_defaults(func=bench_export)
+
+    p = sub.add_parser("内存", help="导出峰值内存：整表写出 vs 流式（write-only）写出")
+    p.add_argument("--rows", type=int, nargs="+", default=[50_000, 100_000, 200_000])
+    p.add_argument("--skip-full", action="store_true", help="只测流式写出（整表模式在 20 万行时很慢）")
+    p.set_defaults(func=bench_memory)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
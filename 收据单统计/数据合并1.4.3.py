@@ -1,14 +1,23 @@
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Alignment, Font
 from openpyxl import Workbook
-from copy import copy as shallow_copy
 from openpyxl.styles import Border, Side
+import argparse
+import calendar
 import traceback
 import sys
 import os
 
+# 共用 CSV 读取模块（仓库根目录 /公共模块）
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "公共模块"))
+from receipt_loader import read_export
+from money import parse_money
+from receipt_ledger import ReceiptLedger
+from xlsx_style import StylePool, styled_cell
+
 # ========== 控制台提示/退出 ==========
 def pause_and_exit(code=0):
     try:
@@ -26,6 +35,20 @@ def warn(msg: str):
 def info(msg: str):
     print(f"【信息】{msg}")
 
+class ReportError(Exception):
+    """批量模式（非交互）下代替 pause_and_exit 抛出的错误，由调用方逐期间汇总"""
+
+def fail(msg: str, pause: bool = True):
+    """报错后：交互模式暂停并退出；pause=False（批量模式、进程池任务）抛出 ReportError"""
+    error(msg)
+    if pause:
+        pause_and_exit(1)
+    raise ReportError(msg)
+
+# ========== 输入文件 ==========
+COURSE_CSV = "屯門婦聯 - 會員及課程管理系統 - 課程收據.csv"
+FEE_CSV    = "屯門婦聯 - 會員及課程管理系統 - 會費收據.csv"
+
 # ========== 关键列定义（含别名）==========
 # 注意：逻辑字段必须解析成功，否则报错并暂停
 REQUIRED_COURSE_FIELDS = {
@@ -71,144 +94,28 @@ def parse_date_input(user_input: str):
     filename  = f"{display}.xlsx"
     return start_date, end_date, excel_var, display, filename
 
-# ========= 安全复制单元格样式，规避 StyleProxy 报错 =========
-def safe_copy_cell_style(src_cell, tgt_cell):
-    try:
-        if src_cell.has_style:
-            # Font
-            try:
-                tgt_cell.font = shallow_copy(src_cell.font)
-            except Exception:
-                f = src_cell.font
-                try:
-                    tgt_cell.font = Font(
-                        name=f.name, size=f.size, bold=f.bold, italic=f.italic,
-                        vertAlign=f.vertAlign, underline=f.underline, strike=f.strike, color=f.color
-                    )
-                except Exception:
-                    pass
-
-            # Fill
-            try:
-                tgt_cell.fill = shallow_copy(src_cell.fill)
-            except Exception:
-                pass
-
-            # Border
-            try:
-                tgt_cell.border = shallow_copy(src_cell.border)
-            except Exception:
-                pass
-
-            # Alignment
-            try:
-                tgt_cell.alignment = shallow_copy(src_cell.alignment)
-            except Exception:
-                a = src_cell.alignment
-                try:
-                    tgt_cell.alignment = Alignment(
-                        horizontal=a.horizontal,
-                        vertical=a.vertical,
-                        textRotation=a.textRotation,
-                        wrap_text=(a.wrapText if hasattr(a, "wrapText") else getattr(a, "wrap_text", None)),
-                        shrink_to_fit=(a.shrinkToFit if hasattr(a, "shrinkToFit") else getattr(a, "shrink_to_fit", None)),
-                        indent=a.indent,
-                    )
-                except Exception:
-                    pass
-
-            # Number format
-            try:
-                tgt_cell.number_format = src_cell.number_format
-            except Exception:
-                pass
-
-            # Protection
-            try:
-                tgt_cell.protection = shallow_copy(src_cell.protection)
-            except Exception:
-                pass
-    except Exception:
-        pass
-
-# ========= 将一个 sheet 的内容（值+样式）复制到目标 sheet =========
-def copy_sheet_content(src_ws, tgt_ws, start_row: int, preserve_merges: bool = True, blank_row_after: bool = True):
-    """
-    把 src_ws 的所有单元格（值与样式）复制到 tgt_ws，从 start_row 开始写入。
-    - preserve_merges=True 时，复制源表的合并单元格到目标（偏移后）。
-    - preserve_merges=False（用于“統計結果”），只复制值与样式，不复制合并。
-    - 表之间插入空行：blank_row_after=True。
-    返回：下一次可写的起始行号。
-    """
-    max_row = src_ws.max_row
-    max_col = src_ws.max_column
-
-    # 复制列宽（只复制到源表的 max_col）
-    for c in range(1, max_col + 1):
-        letter = get_column_letter(c)
-        src_dim = src_ws.column_dimensions.get(letter)
-        if src_dim and src_dim.width:
-            tgt_ws.column_dimensions[letter].width = src_dim.width
-
-    # 复制行高与单元格（值+样式）
-    for r in range(1, max_row + 1):
-        tgt_r = start_row + r - 1
-
-        # 行高
-        rd = src_ws.row_dimensions.get(r)
-        if rd and rd.height:
-            tgt_ws.row_dimensions[tgt_r].height = rd.height
-
-        # 单元格
-        for c in range(1, max_col + 1):
-            src_cell = src_ws.cell(row=r, column=c)
-            tgt_cell = tgt_ws.cell(row=tgt_r, column=c, value=src_cell.value)
-            safe_copy_cell_style(src_cell, tgt_cell)
-
-    # 复制合并单元格（偏移后）
-    if preserve_merges and src_ws.merged_cells and len(src_ws.merged_cells.ranges) > 0:
-        for m_range in src_ws.merged_cells.ranges:
-            min_col = m_range.min_col
-            max_col_merge = m_range.max_col
-            min_row = m_range.min_row + (start_row - 1)
-            max_row_merge = m_range.max_row + (start_row - 1)
-            tgt_ws.merge_cells(
-                start_row=min_row,
-                start_column=min_col,
-                end_row=max_row_merge,
-                end_column=max_col_merge
-            )
-
-    # 计算下一起始行（表间空一行）
-    next_start_row = start_row + max_row + (1 if blank_row_after else 0)
-    return next_start_row
-
-# ========= 安全读取 CSV =========
-def read_csv_safe(path: str) -> pd.DataFrame:
+# ========= 安全读取 CSV（类型化读取 + 旁路缓存，见 公共模块/receipt_loader.py）=========
+def read_csv_safe(path: str, pause: bool = True) -> pd.DataFrame:
+    if not os.path.exists(path):
+        fail(f"读取失败：文件不存在 -> {path}", pause)
     try:
-        if not os.path.exists(path):
-            error(f"读取失败：文件不存在 -> {path}")
-            pause_and_exit(1)
-        df = pd.read_csv(path)
-        if df.empty:
-            warn(f"文件为空：{path}")
-        return df
+        df = read_export(path)
     except FileNotFoundError:
-        error(f"读取失败：找不到文件 -> {path}")
-        pause_and_exit(1)
+        fail(f"读取失败：找不到文件 -> {path}", pause)
     except PermissionError:
-        error(f"读取失败：没有权限访问 -> {path}")
-        pause_and_exit(1)
+        fail(f"读取失败：没有权限访问 -> {path}", pause)
     except UnicodeDecodeError:
-        error(f"读取失败：编码错误，请确认 CSV 编码格式 -> {path}")
-        pause_and_exit(1)
+        fail(f"读取失败：编码错误，请确认 CSV 编码格式 -> {path}", pause)
     except Exception as e:
-        error(f"读取失败：{path} -> {e}")
         traceback.print_exc()
-        pause_and_exit(1)
+        fail(f"读取失败：{path} -> {e}", pause)
+    if df.empty:
+        warn(f"文件为空：{path}")
+    return df
 
 # ========= 关键列解析（仅输出缺失逻辑字段名）=========
-def resolve_required_columns_minimal(df: pd.DataFrame, field_alias_map: dict, table_alias: str) -> dict:
+def resolve_required_columns_minimal(df: pd.DataFrame, field_alias_map: dict, table_alias: str,
+                                     pause: bool = True) -> dict:
     """
     将逻辑字段映射为表内真实列名；任一解析失败即仅报出缺失的逻辑字段名并退出。
     返回：{逻辑字段: 实际列名}
@@ -228,25 +135,273 @@ def resolve_required_columns_minimal(df: pd.DataFrame, field_alias_map: dict, ta
             resolved[logical] = hit
 
     if missing_fields:
-        for logical in missing_fields:
+        for logical in missing_fields[:-1]:
             error(f"{table_alias} 缺少关键列：『{logical}』")
-        pause_and_exit(1)
+        fail(f"{table_alias} 缺少关键列：『{missing_fields[-1]}』", pause)
 
     return resolved
 
 # ========= 将金额列安全转为数值 =========
-def to_float_safe(df: pd.DataFrame, col: str, table_alias: str):
+def to_float_safe(df: pd.DataFrame, col: str, table_alias: str, pause: bool = True):
     if col not in df.columns:
-        error(f"{table_alias} 缺少关键金额列「{col}」，无法继续。")
-        pause_and_exit(1)
+        fail(f"{table_alias} 缺少关键金额列「{col}」，无法继续。", pause)
     try:
-        df[col] = df[col].replace(r"[\$,]", "", regex=True)
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype(float)
+        df[col] = parse_money(df[col]).fillna(0.0)
         return df
     except Exception as e:
-        error(f"{table_alias} 金额列「{col}」清洗失败：{e}")
         traceback.print_exc()
-        pause_and_exit(1)
+        fail(f"{table_alias} 金额列「{col}」清洗失败：{e}", pause)
+
+# ========= 经办人 × 付款方式 汇总引擎（单次 groupby）=========
+def build_staff_method_pivot(sources) -> pd.Series:
+    """
+    sources：[(df, 經辨人員列, 付款方式列, 金额列), ...]
+    每个来源的经办人列只规范化一次（astype(str).str.strip()），
+    然后把所有来源拼成长表，一次 groupby([經辨人員, 付款方式]) 求和。
+    - 经办人去空白后为 "" 的行视为无效行，直接剔除。
+    - 经办人为空值（NaN）的行保留，只计入付款方式合计，不计入个人统计。
+    - 付款方式为空值的行保留，只计入个人【總計】，不单列方式。
+    返回：以 (經辨人員, 付款方式) 为索引的金额 Series。
+    """
+    frames = []
+    for df, staff_col, method_col, amount_col in sources:
+        staff = df[staff_col]
+        frames.append(pd.DataFrame({
+            "經辨人員": staff.astype(str).str.strip().where(staff.notna()).astype(object),
+            "付款方式": df[method_col].astype(object),
+            "金額": pd.to_numeric(df[amount_col], errors="coerce").fillna(0.0).astype(float),
+        }))
+
+    long_df = pd.concat(frames, ignore_index=True)
+    long_df = long_df[long_df["經辨人員"] != ""]
+    return long_df.groupby(["經辨人員", "付款方式"], dropna=False, sort=True)["金額"].sum()
+
+def render_summaries(pivot: pd.Series, excel_var: str, grand_total: float):
+    """
+    由 build_staff_method_pivot() 的结果渲染“統計結果”文本。
+    返回：(total_summary, {经办人: 统计文本})
+    """
+    method_totals = pivot.groupby(level="付款方式").sum()
+    merged_line1 = f"{excel_var} 【總計】${grand_total:.0f}"
+    merged_line2 = "  ".join(f"{m}${v:.0f}" for m, v in method_totals.items())
+    total_summary = merged_line1 + ("\n" + merged_line2 if merged_line2 else "")
+
+    merged_vars = {}
+    staff_pivot = pivot[pivot.index.get_level_values("經辨人員").notna()]
+    for staff, group in staff_pivot.groupby(level="經辨人員"):
+        staff_total = float(group.sum())
+        methods = group.droplevel("經辨人員")
+        methods = methods[methods.index.notna()]
+        line1 = f"{staff}【總計】${staff_total:.0f}"
+        line2 = "  ".join(f"{m}${v:.0f}" for m, v in methods.items())
+        merged_vars[staff] = line1 + ("\n" + line2 if line2 else "")
+
+    return total_summary, merged_vars
+
+# ========= 导出样式（与 1.4.3 之前 pandas 表头 + 外框 + C列左对齐 的效果一致）=========
+THIN = Side(border_style="thin", color="000000")
+BORDER_ALL = Border(top=THIN, bottom=THIN, left=THIN, right=THIN)
+FONT_HEADER = Font(bold=True)
+FONT_TITLE = Font(size=14, bold=True)   # “統計結果”第一行标题加粗
+FONT_BODY = Font(size=12)
+ALIGN_HEADER = Alignment(horizontal="center", vertical="top")
+ALIGN_HEADER_LEFT = Alignment(horizontal="left", vertical="top")
+ALIGN_LEFT = Alignment(horizontal="left")
+ALIGN_STAT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+ROW_HEIGHT_14 = 20
+ROW_HEIGHT_12 = 16
+STAT_MERGE_COLS = 7
+LEFT_ALIGN_COL = 3   # “最终输出”C列左对齐
+OUT_COL_WIDTHS = {"A": 3, "B": 12, "C": 9.75, "D": 32, "E": 7, "F": 9.75, "G": 9.75}
+
+STREAMING_MIN_ROWS = 50_000   # 收据总行数达到此值时改用流式（write-only）写出；设为 None 则始终整表写出
+FRAME_CHUNK_ROWS = 10_000     # 逐块转换 DataFrame，避免一次性生成全部行的 Python 对象
+
+def _frame_rows(df: pd.DataFrame, chunk: int = FRAME_CHUNK_ROWS):
+    """逐行产出 Python 原生值（NaN → None），按块转换，不复制整张表"""
+    for start in range(0, len(df), chunk):
+        part = df.iloc[start:start + chunk]
+        columns = [part[c].astype(object).where(part[c].notna(), None).tolist() for c in part.columns]
+        yield from zip(*columns)
+
+def _stat_rows(total_summary: str, merged_vars: dict):
+    """(文本, 是否标题, 行高)"""
+    yield total_summary, True, ROW_HEIGHT_14 * (total_summary.count("\n") + 1 if total_summary else 1)
+    for text in merged_vars.values():
+        yield text, False, ROW_HEIGHT_12 * (text.count("\n") + 1 if text else 1)
+
+def _merge_edge_styles(pool: StylePool, border: Border):
+    """
+    流式写出时没有 merge_cells() 自动补边框，这里按 openpyxl 合并格的规则
+    预先算好合并区内 B..F（上/下边）与末列 G（上/下/右边）的样式；无边框时返回 None
+    """
+    if border is None:
+        return None
+    middle = Border(top=border.top, bottom=border.bottom)
+    last = Border(top=border.top, bottom=border.bottom, right=border.right)
+    return pool.get(border=middle), pool.get(border=last)
+
+def write_receipt_workbook(filename: str, df_course: pd.DataFrame, df_fee: pd.DataFrame,
+                           total_summary: str, merged_vars: dict, info_rows, streaming: bool = False):
+    """
+    一趟写出整个工作簿：每一行同时写入源工作表（課程收據/會費收據/統計結果）和“最终输出”，
+    不再先写源表、再读回逐格复制样式。
+    streaming=True 时使用 write-only 工作表：行写出后即落盘，内存占用不随收据数增长。
+    """
+    wb = Workbook(write_only=streaming)
+    if streaming:
+        ws_out = wb.create_sheet("最终输出")
+    else:
+        ws_out = wb.active
+        ws_out.title = "最终输出"
+    ws_course = wb.create_sheet("課程收據")
+    ws_fee = wb.create_sheet("會費收據")
+    ws_stat = wb.create_sheet("統計結果")
+    ws_info = wb.create_sheet("數據信息")
+
+    # 列宽需在写第一行之前设定（write-only 模式下列信息写在表头）
+    for letter, width in OUT_COL_WIDTHS.items():
+        ws_out.column_dimensions[letter].width = width
+    ws_stat.column_dimensions[get_column_letter(1)].width = 60
+
+    pool = StylePool(wb)
+    header = pool.get(font=FONT_HEADER, border=BORDER_ALL, alignment=ALIGN_HEADER)
+    header_left = pool.get(font=FONT_HEADER, border=BORDER_ALL, alignment=ALIGN_HEADER_LEFT)
+    body = pool.get(border=BORDER_ALL)
+    body_left = pool.get(border=BORDER_ALL, alignment=ALIGN_LEFT)
+    stat_title = pool.get(font=FONT_TITLE, border=BORDER_ALL, alignment=ALIGN_STAT)
+    stat_body = pool.get(font=FONT_BODY, alignment=ALIGN_STAT)
+    stat_edges = {True: _merge_edge_styles(pool, BORDER_ALL), False: None}
+
+    # write-only 工作表没有可靠的 max_row，行号自行计数
+    row_counts = {}
+
+    def emit(ws, cells, height=None) -> int:
+        r = row_counts.get(ws.title, 0) + 1
+        row_counts[ws.title] = r
+        if height is not None:
+            ws.row_dimensions[r].height = height   # 须在该行写出前设定
+        ws.append(cells)
+        return r
+
+    def out_style(col_idx, normal, left):
+        return left if col_idx == LEFT_ALIGN_COL else normal
+
+    # 1) 課程收據 / 2) 會費收據：源表与“最终输出”逐行同步写入，表间空一行
+    for ws_src, df in ((ws_course, df_course), (ws_fee, df_fee)):
+        emit(ws_src, [styled_cell(ws_src, v, header) for v in df.columns])
+        emit(ws_out, [styled_cell(ws_out, v, out_style(i, header, header_left)) for i, v in enumerate(df.columns, 1)])
+        for values in _frame_rows(df):
+            emit(ws_src, [styled_cell(ws_src, v, body) for v in values])
+            emit(ws_out, [styled_cell(ws_out, v, out_style(i, body, body_left)) for i, v in enumerate(values, 1)])
+        emit(ws_out, [])
+
+    # 3) 統計結果：每行 1~7 列合并
+    last_col = get_column_letter(STAT_MERGE_COLS)
+    for text, is_title, height in _stat_rows(total_summary, merged_vars):
+        style = stat_title if is_title else stat_body
+        edges = stat_edges[is_title]
+        for ws in (ws_stat, ws_out):
+            cells = [styled_cell(ws, text, style)]
+            if streaming and edges:
+                middle, last = edges
+                cells += [styled_cell(ws, None, middle) for _ in range(STAT_MERGE_COLS - 2)]
+                cells.append(styled_cell(ws, None, last))
+            r = emit(ws, cells, height)
+            if streaming:
+                ws.merged_cells.add(f"A{r}:{last_col}{r}")
+            else:
+                ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=STAT_MERGE_COLS)
+
+    # 4) 數據信息
+    for row in info_rows:
+        ws_info.append(list(row))
+
+    wb.save(filename)
+
+# ========= 单期报表：清理 → 排序编号 → 金额清洗 → 汇总 =========
+def build_period_report(df_course: pd.DataFrame, df_fee: pd.DataFrame,
+                        colmap_course: dict, colmap_fee: dict, excel_var: str, ledger_totals=None,
+                        pause: bool = True):
+    """
+    输入两张收据表（最后一行为【總計】行），返回 (df_course, df_fee, total_summary, merged_vars)。
+    交互模式与批量模式共用；pause=False 时出错抛出 ReportError，不等待回车、不退出进程。
+    ledger_totals：(pivot, 總額) —— 账本模式下直接用收据账本的汇总，不再扫描本期收据。
+    """
+    # ===== 清理非必需列（不影响关键列）=====
+    drop_cols_course = ["服務中心","報名中心","會員編號","會員姓名(英文)","會員類別","課程收費","其他收費","扣減","日期","撤銷"]
+    df_course = df_course.drop(columns=[c for c in drop_cols_course if c in df_course.columns], errors="ignore")
+
+    drop_cols_fee = ["中心","會員編號","會員姓名(英文)","日期","撤銷"]
+    df_fee = df_fee.drop(columns=[c for c in drop_cols_fee if c in df_fee.columns], errors="ignore")
+
+    # ===== 課程收據：排序（经办人 + 編號）=====
+    if colmap_course["編號"] in df_course.columns:
+        df_course = df_course.sort_values(by=[colmap_course["經辨人員"], colmap_course["編號"]], ascending=[False, True])
+    else:
+        df_course = df_course.sort_values(by=colmap_course["經辨人員"], ascending=False)
+
+    # 序号列（覆盖到倒数第二行）
+    if colmap_course["#"] in df_course.columns:
+        n = len(df_course)
+        if n > 1:
+            col_idx = df_course.columns.get_loc(colmap_course["#"])
+            df_course.iloc[:-1, col_idx] = range(1, n)
+        else:
+            df_course[colmap_course["#"]] = [1]
+
+    # 金额清洗
+    df_course = to_float_safe(df_course, colmap_course["總額"], "課程收據", pause)
+    課程總額 = df_course[colmap_course["總額"]].iloc[-1] if not df_course[colmap_course["總額"]].empty else 0.0
+
+    # ===== 會費收據：排序（经办人 + 編號）=====
+    if colmap_fee["編號"] in df_fee.columns:
+        df_fee = df_fee.sort_values(by=[colmap_fee["經辨人員"], colmap_fee["編號"]], ascending=[False, True])
+    else:
+        df_fee = df_fee.sort_values(by=colmap_fee["經辨人員"], ascending=False)
+
+    # 序号列
+    if colmap_fee["#"] in df_fee.columns:
+        n_fee = len(df_fee)
+        if n_fee > 1:
+            col_idx_fee = df_fee.columns.get_loc(colmap_fee["#"])
+            df_fee.iloc[:-1, col_idx_fee] = range(1, n_fee)
+        else:
+            df_fee[colmap_fee["#"]] = [1]
+
+    # 金额清洗
+    df_fee = to_float_safe(df_fee, colmap_fee["會費"], "會費收據", pause)
+    會費總額 = df_fee[colmap_fee["會費"]].iloc[-1] if not df_fee[colmap_fee["會費"]].empty else 0.0
+
+    if ledger_totals is not None:
+        pivot, 最終總額 = ledger_totals
+        total_summary, merged_vars = render_summaries(pivot, excel_var, 最終總額)
+        return df_course, df_fee, total_summary, merged_vars
+
+    # ===== 合併總額 + 经办人×付款方式 一次性汇总 =====
+    最終總額 = float(課程總額) + float(會費總額)
+    try:
+        pivot = build_staff_method_pivot([
+            (df_course, colmap_course["經辨人員"], colmap_course["付款方式"], colmap_course["總額"]),
+            (df_fee,    colmap_fee["經辨人員"],    colmap_fee["付款方式"],    colmap_fee["會費"]),
+        ])
+    except Exception as e:
+        traceback.print_exc()
+        fail(f"按『經辨人員 × 付款方式』汇总失败：{e}", pause)
+
+    total_summary, merged_vars = render_summaries(pivot, excel_var, 最終總額)
+    return df_course, df_fee, total_summary, merged_vars
+
+def make_info_rows(excel_var: str, display_str: str, start_date: datetime, end_date: datetime):
+    return [
+        ("數據日期", excel_var),
+        ("顯示日期", display_str),
+        ("開始日期(ISO)", start_date.strftime("%Y-%m-%d")),
+        ("結束日期(ISO)", end_date.strftime("%Y-%m-%d")),
+    ]
+
+def use_streaming(df_course: pd.DataFrame, df_fee: pd.DataFrame) -> bool:
+    return STREAMING_MIN_ROWS is not None and len(df_course) + len(df_fee) >= STREAMING_MIN_ROWS
 
 # ========= 主流程 =========
 def main():
@@ -259,255 +414,22 @@ def main():
         print(f"输出文件名：{filename_str}")
 
         # ===== 读取 CSV =====
-        df_course = read_csv_safe("屯門婦聯 - 會員及課程管理系統 - 課程收據.csv")
-        df_fee    = read_csv_safe("屯門婦聯 - 會員及課程管理系統 - 會費收據.csv")
+        df_course = read_csv_safe(COURSE_CSV)
+        df_fee    = read_csv_safe(FEE_CSV)
 
         # ===== 精简报错：逐字段仅报“缺少的逻辑字段名”=====
         colmap_course = resolve_required_columns_minimal(df_course, REQUIRED_COURSE_FIELDS, "課程收據")
         colmap_fee    = resolve_required_columns_minimal(df_fee,    REQUIRED_FEE_FIELDS,    "會費收據")
 
-        # ===== 清理非必需列（不影响关键列）=====
-        drop_cols_course = ["服務中心","報名中心","會員編號","會員姓名(英文)","會員類別","課程收費","其他收費","扣減","日期","撤銷"]
-        df_course = df_course.drop(columns=[c for c in drop_cols_course if c in df_course.columns], errors="ignore")
-
-        drop_cols_fee = ["中心","會員編號","會員姓名(英文)","日期","撤銷"]
-        df_fee = df_fee.drop(columns=[c for c in drop_cols_fee if c in df_fee.columns], errors="ignore")
-
-        # ===== 課程收據：排序（经办人 + 編號）=====
-        if colmap_course["編號"] in df_course.columns:
-            df_course = df_course.sort_values(by=[colmap_course["經辨人員"], colmap_course["編號"]], ascending=[False, True])
-        else:
-            df_course = df_course.sort_values(by=colmap_course["經辨人員"], ascending=False)
-
-        # 序号列（覆盖到倒数第二行）
-        if colmap_course["#"] in df_course.columns:
-            n = len(df_course)
-            if n > 1:
-                col_idx = df_course.columns.get_loc(colmap_course["#"])
-                df_course.iloc[:-1, col_idx] = range(1, n)
-            else:
-                df_course[colmap_course["#"]] = [1]
-
-        # 金额清洗
-        df_course = to_float_safe(df_course, colmap_course["總額"], "課程收據")
-        課程總額 = df_course[colmap_course["總額"]].iloc[-1] if not df_course[colmap_course["總額"]].empty else 0.0
-
-        # 有效行（经办人非空）
-        df_course_valid = df_course[df_course[colmap_course["經辨人員"]].astype(str).str.strip() != ""]
-
-        # 付款方式汇总
-        try:
-            group_course = df_course_valid.groupby(colmap_course["付款方式"])[colmap_course["總額"]].sum().to_dict()
-        except Exception as e:
-            error(f"課程收據按『{colmap_course['付款方式']}』汇总失败：{e}")
-            traceback.print_exc()
-            pause_and_exit(1)
-
-        # ===== 會費收據：排序（经办人 + 編號）=====
-        if colmap_fee["編號"] in df_fee.columns:
-            df_fee = df_fee.sort_values(by=[colmap_fee["經辨人員"], colmap_fee["編號"]], ascending=[False, True])
-        else:
-            df_fee = df_fee.sort_values(by=colmap_fee["經辨人員"], ascending=False)
-
-        # 序号列
-        if colmap_fee["#"] in df_fee.columns:
-            n_fee = len(df_fee)
-            if n_fee > 1:
-                col_idx_fee = df_fee.columns.get_loc(colmap_fee["#"])
-                df_fee.iloc[:-1, col_idx_fee] = range(1, n_fee)
-            else:
-                df_fee[colmap_fee["#"]] = [1]
-
-        # 金额清洗
-        df_fee = to_float_safe(df_fee, colmap_fee["會費"], "會費收據")
-        會費總額 = df_fee[colmap_fee["會費"]].iloc[-1] if not df_fee[colmap_fee["會費"]].empty else 0.0
-
-        df_fee_valid = df_fee[df_fee[colmap_fee["經辨人員"]].astype(str).str.strip() != ""]
-
-        try:
-            group_fee = df_fee_valid.groupby(colmap_fee["付款方式"])[colmap_fee["會費"]].sum().to_dict()
-        except Exception as e:
-            error(f"會費收據按『{colmap_fee['付款方式']}』汇总失败：{e}")
-            traceback.print_exc()
-            pause_and_exit(1)
-
-        # ===== 合併總額及付款方式 =====
-        最終總額 = float(課程總額) + float(會費總額)
-        all_methods = set(group_course.keys()) | set(group_fee.keys())
-        merged_method_totals = {m: group_course.get(m, 0) + group_fee.get(m, 0) for m in all_methods}
-
-        merged_line1 = f"{excel_var} 【總計】${最終總額:.0f}"
-        merged_line2 = "  ".join([f"{m}${merged_method_totals[m]:.0f}" for m in merged_method_totals])
-        total_summary = merged_line1 + ("\n" + merged_line2 if merged_line2 else "")
-
-        # ===== 各經辨人員統計 =====
-        staff_set = set()
-        staff_set |= set(df_course_valid[colmap_course["經辨人員"]].dropna().astype(str).str.strip().unique())
-        staff_set |= set(df_fee_valid[colmap_fee["經辨人員"]].dropna().astype(str).str.strip().unique())
-        all_staff = sorted([s for s in staff_set if s])
-
-        merged_vars = {}
-        for staff in all_staff:
-            # 各来源筛选
-            course_total = df_course_valid[
-                df_course_valid[colmap_course["經辨人員"]].astype(str).str.strip() == staff
-            ][colmap_course["總額"]].sum()
-            fee_total    = df_fee_valid[
-                df_fee_valid[colmap_fee["經辨人員"]].astype(str).str.strip() == staff
-            ][colmap_fee["會費"]].sum()
-            staff_total  = float(course_total) + float(fee_total)
-
-            # 各方式
-            try:
-                course_group_staff = (
-                    df_course_valid[df_course_valid[colmap_course["經辨人員"]].astype(str).str.strip() == staff]
-                    .groupby(colmap_course["付款方式"])[colmap_course["總額"]].sum().to_dict()
-                )
-            except Exception as e:
-                error(f"課程收據员『{staff}』方式汇总失败：{e}")
-                traceback.print_exc()
-                pause_and_exit(1)
+        df_course, df_fee, total_summary, merged_vars = build_period_report(
+            df_course, df_fee, colmap_course, colmap_fee, excel_var)
 
-            try:
-                fee_group_staff = (
-                    df_fee_valid[df_fee_valid[colmap_fee["經辨人員"]].astype(str).str.strip() == staff]
-                    .groupby(colmap_fee["付款方式"])[colmap_fee["會費"]].sum().to_dict()
-                )
-            except Exception as e:
-                error(f"會費收據员『{staff}』方式汇总失败：{e}")
-                traceback.print_exc()
-                pause_and_exit(1)
-
-            all_staff_methods = set(course_group_staff.keys()) | set(fee_group_staff.keys())
-            merged_staff_methods = {m: course_group_staff.get(m, 0) + fee_group_staff.get(m, 0) for m in all_staff_methods}
-
-            line1 = f"{staff}【總計】${staff_total:.0f}"
-            line2 = "  ".join([f"{m}${merged_staff_methods[m]:.0f}" for m in merged_staff_methods])
-            merged_vars[staff] = line1 + ("\n" + line2 if line2 else "")
-
-        # ===== 导出Excel（含“最终输出”拼接）=====
-        with pd.ExcelWriter(filename_str, engine="openpyxl") as writer:
-            # 先把三张数据表写出去
-            df_course.to_excel(writer, sheet_name="課程收據", index=False)
-            df_fee.to_excel(writer, sheet_name="會費收據", index=False)
-            pd.DataFrame(columns=["統計"]).to_excel(writer, sheet_name="統計結果", index=False)
-
-            wb = writer.book
-
-            # === 外框新增功能 1.4.3：为源工作表所有单元格添加外框 ===
-            thin = Side(border_style="thin", color="000000")
-            border = Border(top=thin, bottom=thin, left=thin, right=thin)
-
-            def add_border_to_sheet(ws):
-                max_r = ws.max_row
-                max_c = ws.max_column
-                for r in range(1, max_r + 1):
-                    for c in range(1, max_c + 1):
-                        cell = ws.cell(row=r, column=c)
-                        cell.border = border
-
-            # 为“課程收據 / 會費收據 / 統計結果”三个源工作表统一添加外框
-            if "課程收據" in wb.sheetnames:
-                add_border_to_sheet(wb["課程收據"])
-            if "會費收據" in wb.sheetnames:
-                add_border_to_sheet(wb["會費收據"])
-            if "統計結果" in wb.sheetnames:
-                add_border_to_sheet(wb["統計結果"])
-
-            # === 填充“統計結果”的展示（1×7 合并行）===
-            ws_stat = wb["統計結果"]
-            align_center = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            font_title = Font(size=14, bold=True)  # 第一行标题加粗
-            font_body  = Font(size=12)
-            row_height_14 = 20
-            row_height_12 = 16
-
-            # 总汇
-            ws_stat["A1"] = total_summary
-            ws_stat.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
-            ws_stat["A1"].font = font_title
-            ws_stat["A1"].alignment = align_center
-            ws_stat.row_dimensions[1].height = row_height_14 * (total_summary.count("\n") + 1 if total_summary else 1)
-
-            # 各经辨人員
-            row_idx = 2
-            for staff, text in merged_vars.items():
-                ws_stat.cell(row=row_idx, column=1, value=text)
-                ws_stat.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=7)
-                cell = ws_stat.cell(row=row_idx, column=1)
-                cell.font = font_body
-                cell.alignment = align_center
-                ws_stat.row_dimensions[row_idx].height = row_height_12 * (text.count("\n") + 1 if text else 1)
-                row_idx += 1
-
-            ws_stat.column_dimensions[get_column_letter(1)].width = 60
-
-            # 数据信息
-            ws_info = wb.create_sheet("數據信息")
-            ws_info["A1"] = "數據日期";       ws_info["B1"] = excel_var
-            ws_info["A2"] = "顯示日期";       ws_info["B2"] = display_str
-            ws_info["A3"] = "開始日期(ISO)"; ws_info["B3"] = start_date.strftime("%Y-%m-%d")
-            ws_info["A4"] = "結束日期(ISO)"; ws_info["B4"] = end_date.strftime("%Y-%m-%d")
-
-            # === 生成“最终输出”，并把三张表按次序拼接（保留样式）===
-            if "最终输出" in wb.sheetnames:
-                del wb["最终输出"]
-            ws_out = wb.create_sheet("最终输出")
-
-            current_row = 1
-
-            # 1) 課程收據：保留合并
-            if "課程收據" in wb.sheetnames:
-                current_row = copy_sheet_content(wb["課程收據"], ws_out, current_row, preserve_merges=True, blank_row_after=True)
-
-            # 2) 會費收據：保留合并
-            if "會費收據" in wb.sheetnames:
-                current_row = copy_sheet_content(wb["會費收據"], ws_out, current_row, preserve_merges=True, blank_row_after=True)
-
-            # 3) 統計結果：先不带合并复制，随后逐行执行 1~7 列合并
-            if "統計結果" in wb.sheetnames:
-                start_row_stat_in_out = current_row
-                current_row = copy_sheet_content(wb["統計結果"], ws_out, current_row, preserve_merges=False, blank_row_after=True)
-
-                # 逐行合并 1~7 列（仅对有值的行）
-                max_row_copied = current_row - 1
-                for r in range(start_row_stat_in_out, max_row_copied + 1):
-                    val = ws_out.cell(row=r, column=1).value
-                    if val is not None and str(val).strip() != "":
-                        ws_out.merge_cells(start_row=r, start_column=1, end_row=r, end_column=7)
-
-            # === 设置“最终输出”列宽 ===
-            ws_out.column_dimensions["A"].width = 3
-            ws_out.column_dimensions["B"].width = 12
-            ws_out.column_dimensions["C"].width = 9.75
-            ws_out.column_dimensions["D"].width = 32
-            ws_out.column_dimensions["E"].width = 7
-            ws_out.column_dimensions["F"].width = 9.75
-            ws_out.column_dimensions["G"].width = 9.75
-
-            # === 重设“最终输出”C列为左对齐（尽量保留原有的其它对齐属性）===
-            max_r = ws_out.max_row
-            for r in range(1, max_r + 1):
-                cell = ws_out.cell(row=r, column=3)  # C列
-                a = cell.alignment if cell.has_style else Alignment()
-                try:
-                    new_align = Alignment(
-                        horizontal="left",
-                        vertical=a.vertical,
-                        textRotation=a.textRotation,
-                        wrap_text=(a.wrapText if hasattr(a, "wrapText") else getattr(a, "wrap_text", None)),
-                        shrink_to_fit=(a.shrinkToFit if hasattr(a, "shrinkToFit") else getattr(a, "shrink_to_fit", None)),
-                        indent=a.indent,
-                    )
-                except Exception:
-                    new_align = Alignment(horizontal="left")
-                cell.alignment = new_align
-
-            # === 将“最终输出”移动到最前 ===
-            sheets = wb._sheets
-            out_sheet = wb["最终输出"]
-            sheets.remove(out_sheet)
-            sheets.insert(0, out_sheet)
+        # ===== 导出Excel（课程/会费/统计与“最终输出”同一趟写出）=====
+        info_rows = make_info_rows(excel_var, display_str, start_date, end_date)
+        streaming = use_streaming(df_course, df_fee)
+        if streaming:
+            info(f"收据共 {len(df_course) + len(df_fee)} 行，使用流式写出")
+        write_receipt_workbook(filename_str, df_course, df_fee, total_summary, merged_vars, info_rows, streaming=streaming)
 
         print(f"\n✅ 已输出文件：{filename_str}")
         print("✅ 已生成“最终输出”工作表")
@@ -525,5 +447,177 @@ def main():
         traceback.print_exc()
         pause_and_exit(1)
 
+# ========= 批量模式：一次读取 CSV，按「日期」切分为多个期间并行输出 =========
+DATE_FIELD = {"日期": ["日期", "收據日期", "收据日期", "付款日期"]}
+RECEIPT_DATE_FORMAT = "%Y/%m/%d %H:%M"   # 导出格式：2025/11/6 17:33
+SPLIT_CHOICES = ("月", "半月", "双周")
+
+def periods_for_year(year: int, split: str):
+    """把一年切成若干期间，返回 parse_date_input() 可接受的「日.月-日.月.年」字符串"""
+    def fmt(a: datetime, b: datetime):
+        return f"{a.day}.{a.month}-{b.day}.{b.month}.{b.year}"
+
+    periods = []
+    if split == "双周":
+        start = datetime(year, 1, 1)
+        year_end = datetime(year, 12, 31)
+        while start <= year_end:
+            end = min(start + timedelta(days=13), year_end)
+            periods.append(fmt(start, end))
+            start = end + timedelta(days=1)
+        return periods
+
+    for month in range(1, 13):
+        first = datetime(year, month, 1)
+        last = datetime(year, month, calendar.monthrange(year, month)[1])
+        if split == "半月":
+            mid = datetime(year, month, 15)
+            periods += [fmt(first, mid), fmt(mid + timedelta(days=1), last)]
+        else:
+            periods.append(fmt(first, last))
+    return periods
+
+def partition_by_period(df: pd.DataFrame, date_col: str, amount_col: str, bounds):
+    """
+    按收据日期切分（含首尾两日），每份末尾补回按本期重新合计的【總計】行。
+    注意：系统导出的【總計】按 課程收費+其他收費-扣減 计算，个别收据金额不一致时
+    会与逐行 總額 之和相差几元；批量模式统一采用逐行之和，与经办人分项一致。
+    bounds：[(start_date, end_date), ...]；先按日期排序一次，再用二分查找切片。
+    """
+    body, total_row = df.iloc[:-1], df.iloc[[-1]]
+    dates = pd.to_datetime(body[date_col], format=RECEIPT_DATE_FORMAT, errors="coerce")
+    unparsed = int(dates.isna().sum())
+    if unparsed:
+        warn(f"{unparsed} 行「{date_col}」无法解析，批量模式下不计入任何期间")
+
+    # 【總計】行里有数值的列（總額 / 會費，以及課程收費、扣減等）都按本期重新合计
+    sum_cols = [c for c in df.columns
+                if c == amount_col or (pd.api.types.is_numeric_dtype(df[c]) and pd.notna(total_row[c].iloc[0]))]
+
+    order = dates.sort_values(kind="stable").dropna()
+    sorted_body = body.loc[order.index]
+    stamps = order.values
+
+    parts = []
+    for start_date, end_date in bounds:
+        lo = stamps.searchsorted(pd.Timestamp(start_date).to_datetime64(), side="left")
+        hi = stamps.searchsorted((pd.Timestamp(end_date) + pd.Timedelta(days=1)).to_datetime64(), side="left")
+        part = sorted_body.iloc[lo:hi]
+        total = total_row.copy()
+        for col in sum_cols:
+            total[col] = float(pd.to_numeric(part[col], errors="coerce").sum())
+        parts.append(pd.concat([part, total]))
+    return parts
+
+# ========= 账本模式：增量并入收据账本，统计直接读累计表 =========
+LEDGER_FILE = "收据账本.sqlite"
+VOID_FIELD = {"撤銷": ["撤銷", "撤销", "作廢", "作废"]}
+
+def update_ledger(ledger_file, df_course, df_fee, colmap_course, colmap_fee, date_course, date_fee, bounds):
+    """把两张收据表（去掉【總計】行）并入账本，返回每个期间的 (pivot, 總額)"""
+    sources = [
+        ("課程收據", df_course, colmap_course, colmap_course["總額"], date_course),
+        ("會費收據", df_fee,    colmap_fee,    colmap_fee["會費"],    date_fee),
+    ]
+    with ReceiptLedger(ledger_file) as ledger:
+        for kind, df, colmap, amount_col, date_col in sources:
+            void_col = next((c for c in VOID_FIELD["撤銷"] if c in df.columns), None)
+            counts = ledger.ingest(df.iloc[:-1], kind, colmap["編號"], colmap["經辨人員"], colmap["付款方式"],
+                                   amount_col, date_col, void_col)
+            info(f"账本 {kind}：" + "，".join(f"{k} {v}" for k, v in counts.items()))
+        return [(ledger.pivot(start, end), ledger.grand_total(start, end)) for start, end in bounds]
+
+def _write_period(task):
+    """进程池任务：生成一个期间的工作簿，返回 (文件路径, 课程收据数, 会费收据数)"""
+    period, df_course, df_fee, colmap_course, colmap_fee, out_dir, ledger_totals = task
+    start_date, end_date, excel_var, display_str, filename_str = parse_date_input(period)
+    n_course, n_fee = len(df_course) - 1, len(df_fee) - 1
+    df_course, df_fee, total_summary, merged_vars = build_period_report(
+        df_course, df_fee, colmap_course, colmap_fee, excel_var, ledger_totals, pause=False)
+    path = os.path.join(out_dir, filename_str)
+    write_receipt_workbook(path, df_course, df_fee, total_summary, merged_vars,
+                           make_info_rows(excel_var, display_str, start_date, end_date),
+                           streaming=use_streaming(df_course, df_fee))
+    return path, n_course, n_fee
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        description="数据合并批量模式：一次读取收据 CSV，按期间批量生成统计工作簿",
+        epilog="示例：python 数据合并1.4.3.py --ranges 30.10-9.11.2025 10.11-23.11.2025\n"
+               "      python 数据合并1.4.3.py --year 2025 --split 双周\n"
+               "      python 数据合并1.4.3.py --ledger --ranges 30.10-9.11.2025",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--ranges", nargs="+", metavar="日.月-日.月.年", help="一个或多个期间")
+    group.add_argument("--year", type=int, help="按年份切分期间（配合 --split）")
+    parser.add_argument("--split", choices=SPLIT_CHOICES, default="半月", help="--year 的切分方式（默认：半月）")
+    parser.add_argument("--out-dir", default=".", help="输出目录（默认：当前目录）")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认：CPU 核数）")
+    parser.add_argument("--keep-empty", action="store_true", help="没有任何收据的期间也输出工作簿")
+    parser.add_argument("--ledger", action="store_true",
+                        help="先把 CSV 增量并入收据账本，再由账本汇总生成“統計結果”（撤銷的收据不计入）")
+    parser.add_argument("--ledger-file", default=LEDGER_FILE, help=f"收据账本路径（默认：{LEDGER_FILE}）")
+    args = parser.parse_args(argv)
+
+    periods = args.ranges if args.ranges else periods_for_year(args.year, args.split)
+    try:
+        parsed = [parse_date_input(p) for p in periods]
+    except ValueError as ve:
+        error(f"期间格式错误：{ve}")
+        sys.exit(1)
+
+    # ===== 只读一次 CSV（批量模式不等待回车，出错直接退出）=====
+    try:
+        df_course = read_csv_safe(COURSE_CSV, pause=False)
+        df_fee    = read_csv_safe(FEE_CSV, pause=False)
+        colmap_course = resolve_required_columns_minimal(df_course, REQUIRED_COURSE_FIELDS, "課程收據", pause=False)
+        colmap_fee    = resolve_required_columns_minimal(df_fee,    REQUIRED_FEE_FIELDS,    "會費收據", pause=False)
+        date_course = resolve_required_columns_minimal(df_course, DATE_FIELD, "課程收據", pause=False)["日期"]
+        date_fee    = resolve_required_columns_minimal(df_fee,    DATE_FIELD, "會費收據", pause=False)["日期"]
+    except ReportError:
+        sys.exit(1)
+
+    bounds = [(p[0], p[1]) for p in parsed]
+    ledger_totals = [None] * len(bounds)
+    if args.ledger:
+        ledger_totals = update_ledger(args.ledger_file, df_course, df_fee, colmap_course, colmap_fee,
+                                      date_course, date_fee, bounds)
+
+    course_parts = partition_by_period(df_course, date_course, colmap_course["總額"], bounds)
+    fee_parts    = partition_by_period(df_fee,    date_fee,    colmap_fee["會費"],    bounds)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    tasks = []
+    for period, part_course, part_fee, totals in zip(periods, course_parts, fee_parts, ledger_totals):
+        if not args.keep_empty and len(part_course) == 1 and len(part_fee) == 1:
+            info(f"{period}：没有收据，跳过")
+            continue
+        tasks.append((period, part_course, part_fee, colmap_course, colmap_fee, args.out_dir, totals))
+
+    if not tasks:
+        warn("所有期间均没有收据，未生成任何文件。")
+        return
+
+    info(f"共 {len(tasks)} 个期间，开始并行生成 ...")
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(_write_period, t): t[0] for t in tasks}
+        for future in as_completed(futures):
+            period = futures[future]
+            try:
+                path, n_course, n_fee = future.result()
+                print(f"✅ {period}：課程收據 {n_course} 行，會費收據 {n_fee} 行 -> {path}")
+            except Exception as e:
+                failed += 1
+                error(f"{period} 生成失败：{e}")
+
+    if failed:
+        error(f"{failed} 个期间生成失败")
+        sys.exit(1)
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        batch_main(sys.argv[1:])
+    else:
+        main()
@@ -1,17 +1,20 @@
+import os
+import sys
 import pandas as pd
 from datetime import datetime
 
+# 共用 CSV 读取模块（仓库根目录 /公共模块）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "公共模块"))
+from receipt_loader import read_export
+from money import parse_money
+
 # 文件路径
 course_file = "屯門婦聯 - 會員及課程管理系統 - 課程.csv"
 receipt_file = "屯門婦聯 - 會員及課程管理系統 - 課程收據.csv"
 
-# 读取CSV时强制为字符串，避免格式问题
-df_course = pd.read_csv(course_file, dtype=str)
-df_receipt = pd.read_csv(receipt_file, dtype=str)
-
-# 清洗空白字符和缺失值
-df_course = df_course.fillna("").applymap(str.strip)
-df_receipt = df_receipt.fillna("").applymap(str.strip)
+# 读取CSV时强制为字符串并清洗空白字符和缺失值，避免格式问题
+df_course = read_export(course_file, as_text=True)
+df_receipt = read_export(receipt_file, as_text=True)
 
 # 筛选付款方式为“現金”的数据
 df_cash = df_receipt[df_receipt["付款方式"] == "現金"].copy()
@@ -24,14 +27,7 @@ df_cash["類別"] = df_cash["課程名稱"].map(name_to_category).fillna("")
 
 # 尝试将總額转为浮点数（用于后续统计）
 if "總額" in df_cash.columns:
-    df_cash["總額_clean"] = (
-        df_cash["總額"]
-        .str.replace(",", "")  # 去除千位符
-        .str.replace("$", "")
-        .str.replace("HK", "")
-        .str.extract("(\d+\.?\d*)")[0]
-        .astype(float)
-    )
+    df_cash["總額_clean"] = parse_money(df_cash["總額"])
 else:
     df_cash["總額_clean"] = 0.0
 
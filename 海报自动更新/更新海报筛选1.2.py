@@ -1,9 +1,14 @@
 import os
 import shutil
 import re
+import sys
 from datetime import datetime
 from pptx import Presentation
 
+# 共用节假日日历（仓库根目录 /公共模块）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "公共模块"))
+from holiday_calendar import load_calendar
+
 # ===== 路径设置 =====
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DISABLED_DIR = os.path.join(BASE_DIR, "海报", "Disabled")
@@ -41,7 +46,7 @@ def parse_date_text(date_text: str):
     return start_date, f"{start_str}-{end_str}"
 
 
-def process_pptx_file(filepath, today, log_entries):
+def process_pptx_file(filepath, today, log_entries, calendar):
     filename = os.path.basename(filepath)
     prs = Presentation(filepath)
 
@@ -72,7 +77,8 @@ def process_pptx_file(filepath, today, log_entries):
             # 添加日志
             log_entries.append(f"{filename}")
             log_entries.append(f"日期：{raw_date_str}")
-            log_entries.append(f"课程已开始{diff_days}日(当前日期{today.strftime('%d/%m/%Y')})\n")
+            log_entries.append(f"课程已开始{diff_days}日(当前日期{today.strftime('%d/%m/%Y')})")
+            log_entries.append(f"其中公眾假期{calendar.count_holidays(start_date, today)}日\n")
 
             print(f"✅ 已复制：{filename}（开始于 {start_date.strftime('%d/%m/%Y')}，已开始 {diff_days} 日）")
         else:
@@ -96,10 +102,11 @@ def main():
 
     # 日志首行
     log_entries = [f"==========【更新于 {date_str}】=========="]
+    calendar = load_calendar()
 
     for file in pptx_files:
         full_path = os.path.join(DISABLED_DIR, file)
-        process_pptx_file(full_path, today, log_entries)
+        process_pptx_file(full_path, today, log_entries, calendar)
 
     # 写入日志
     if len(log_entries) > 1:
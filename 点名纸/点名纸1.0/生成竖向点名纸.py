@@ -1,8 +1,13 @@
 
-from docxtpl import DocxTemplate
 import json
+import os
+import sys
 from datetime import datetime
 
+# 共用模板缓存（仓库根目录 /公共模块）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "公共模块"))
+from docx_cache import render_docx
+
 # 载入 JSON 数据
 with open("attendance.json", "r", encoding="utf-8") as f:
     data = json.load(f)["data"]
@@ -53,10 +58,6 @@ context = {
     "學員列表": students
 }
 
-# 加载模板并渲染
-tpl = DocxTemplate("测试模板竖.docx")  # 请使用无 loop.index 的模板
-tpl.render(context)
-
-# 保存生成文件
-tpl.save("output_課堂點名紙.docx")
+# 加载模板（缓存）并渲染、保存生成文件
+render_docx("测试模板竖.docx", context, "output_課堂點名紙.docx")  # 请使用无 loop.index 的模板
 print("✅ 渲染成功，檔案已輸出：output_課堂點名紙.docx")
@@ -1,6 +1,12 @@
 import pandas as pd
 from datetime import datetime
 import os
+import sys
+
+# 共用 CSV 读取模块、节假日日历（仓库根目录 /公共模块）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "公共模块"))
+from receipt_loader import read_export
+from holiday_calendar import load_calendar
 
 # ========== 设置 ==========
 input_file = "屯門婦聯 - 會員及課程管理系統 - 課程.csv"  # 原始数据文件
@@ -12,7 +18,8 @@ target_column = "上課日期"
 today = datetime.today().date()
 
 # ========== 读取数据 ==========
-df = pd.read_csv(input_file)
+df = read_export(input_file, kind="課程")
+calendar = load_calendar()
 
 # ========== 检查必要列是否存在 ==========
 if target_column not in df.columns:
@@ -42,6 +49,8 @@ for index, row in df.iterrows():
         if delta_days <= 25:
             row_data = row.to_dict()
             row_data["缴费日期差"] = delta_days
+            # 今天之后到结课日还有几堂课（按逢星期计，避开公眾假期）
+            row_data["剩余堂數"] = calendar.count_sessions(row.get("逢星期", ""), today, end_date)
             filtered_rows.append(row_data)
     except Exception as e:
         print(f"第{index+2}行处理出错：{e}")
@@ -49,8 +58,8 @@ for index, row in df.iterrows():
 # ========== 构建新DataFrame并排序 ==========
 if filtered_rows:
     output_df = pd.DataFrame(filtered_rows)
-    # 将"缴费日期差"移至第一列
-    cols = ["缴费日期差"] + [col for col in output_df.columns if col != "缴费日期差"]
+    # 将"缴费日期差"移至第一列，新增的"剩余堂數"放在最后，原有各列位置不变
+    cols = ["缴费日期差"] + [col for col in output_df.columns if col not in ("缴费日期差", "剩余堂數")] + ["剩余堂數"]
     output_df = output_df[cols]
 
     # 排序
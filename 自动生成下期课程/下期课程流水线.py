@@ -0,0 +1,99 @@
+"""
+下期课程流水线：课程更新 → 日期更新 一次完成
+
+- 课程匹配得到的未匹配课程直接以 DataFrame 交给排课，不再写出、重新读取 待更新课程.csv
+  （加 --debug-csv 时仍写出该 CSV，便于核对中间结果）；
+- 每个阶段计时，结束时打印，并追加到 输出目录/流水线耗时.log；
+- 课程表与输出位置可用参数指定，默认沿用当前目录下的 等待(下期课程) / 进行(本期课程) / output。
+
+用法：
+    python 下期课程流水线.py [--wait 下期课程.csv] [--progress 本期课程.csv] [--output output]
+                            [--holidays 节假日.xlsx] [--mode assign] [--scorer rapidfuzz] [--debug-csv]
+"""
+import argparse
+import importlib.util
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TIMING_LOG = "流水线耗时.log"
+
+
+def load_script(filename):
+    """按文件路径载入同目录的脚本（文件名含“.”，不能直接 import）"""
+    spec = importlib.util.spec_from_file_location(os.path.splitext(filename)[0].replace(".", "_"),
+                                                  os.path.join(BASE_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+course_update = load_script("课程更新1.4.py")
+date_update = load_script("日期更新1.4.py")
+
+
+# ========== 阶段计时 ==========
+@contextmanager
+def stage(timings, name):
+    start = time.perf_counter()
+    yield
+    timings.append((name, time.perf_counter() - start))
+
+
+def report_timings(timings, output_dir, stamp):
+    total = sum(seconds for _, seconds in timings)
+    lines = [f"   {name}：{seconds:.2f} 秒" for name, seconds in timings]
+    print("⏱️ 各阶段耗时：")
+    print("\n".join(lines))
+    print(f"   合计：{total:.2f} 秒")
+
+    with open(os.path.join(output_dir, TIMING_LOG), "a", encoding="utf-8") as f:
+        f.write(f"{stamp}\t" + "\t".join(f"{name}={seconds:.3f}" for name, seconds in timings)
+                + f"\t合计={total:.3f}\n")
+
+
+# ========= 主执行入口 =========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="课程更新 → 日期更新 一次完成")
+    course_update.add_match_arguments(parser)
+    parser.add_argument("--holidays", default=date_update.HOLIDAY_SOURCE,
+                        help="节假日来源：.ics / .csv / .xlsx 文件（默认：内置节假日表）")
+    parser.add_argument("--debug-csv", action="store_true", help="另外写出中间结果 待更新课程.csv")
+    args = parser.parse_args(argv)
+
+    stamp = datetime.now().strftime("%Y-%m-%d_%H%M")
+    os.makedirs(args.output, exist_ok=True)
+    timings = []
+
+    print("🔍 正在执行课程匹配与日志生成...")
+    with stage(timings, "读取课程表"):
+        wait_df, progress_df = course_update.load_course_tables(args.wait, args.progress)
+    with stage(timings, "课程匹配"):
+        unmatched_df, match_log, mapping_df = course_update.match_courses(
+            progress_df, wait_df, course_update.parse_weights(args.weight), args.threshold, args.scorer, args.mode,
+            args.log_level, args.top_k
+        )
+    with stage(timings, "写出匹配日志"):
+        course_update.write_match_outputs(unmatched_df, match_log, mapping_df, args.output, stamp,
+                                          pending_csv=args.debug_csv, log_format=args.log_format)
+
+    if not unmatched_df.empty:
+        print("📅 正在更新下期开课日期（含逢星期列）...")
+        df = unmatched_df.reset_index(drop=True)
+        with stage(timings, "载入节假日"):
+            calendar = date_update.load_calendar(args.holidays)
+        with stage(timings, "排课"):
+            update_df = date_update.build_update_frame(df, calendar)
+        with stage(timings, "写出工作簿"):
+            xlsx_path = os.path.join(args.output, f"{stamp}_待更新课程.xlsx")
+            date_update.write_update_workbook(xlsx_path, df, update_df)
+        print(f"✅ 已生成：{xlsx_path}")
+
+    report_timings(timings, args.output, stamp)
+    print("🎉 下期课程流水线完成。")
+
+
+if __name__ == "__main__":
+    main()
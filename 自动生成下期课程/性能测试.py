@@ -0,0 +1,409 @@
+"""
+课程更新 性能测试（合成课程表，不读取真实导出）
+
+用法：
+    python 性能测试.py 匹配 [--rows 5000] [--teachers 100] [--scorer difflib] [--skip-legacy]
+    python 性能测试.py 分配 [--rows 5000] [--teachers 100] [--scorer rapidfuzz]
+    python 性能测试.py 日志 [--rows 5000] [--teachers 20] [--scorer rapidfuzz]
+    python 性能测试.py 排课 [--rows 20000]
+    python 性能测试.py 写出 [--files 20] [--rows 2000] [--workers N]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "公共模块"))
+from course_matcher import LOG_CHUNK_ROWS, LOG_COLUMNS, LOG_LEVELS, MatchLog, match_courses, score_blocks, SCORERS
+from holiday_calendar import HolidayCalendar, join_dates, load_calendar
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATE_SCRIPT_PATH = os.path.join(BASE_DIR, "日期更新1.4.py")
+
+SUBJECTS = ["成人羽毛球", "I LOVE PHONICS", "兒童畫班", "太極班", "瑜伽伸展", "英語會話", "中國舞", "書法班",
+            "綜合功課輔導", "爵士舞", "拉丁舞", "小提琴", "鋼琴", "奧數", "普通話拼音", "乒乓球"]
+LEVELS = ["", "A", "B", "C", "(初班)", "(中班)", "(高班)"]
+WEEKDAYS = ["一", "二", "三", "四", "五", "六", "日"]
+TIMES = ["09:30 (開始)|11:00 (結束)", "14:00 (開始)|16:00 (結束)", "17:30 (開始)|18:30 (結束)", "19:00 (開始)|21:00 (結束)"]
+
+
+# ========== 合成课程表 ==========
+def make_courses(rows: int, teachers: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    subject = rng.choice(SUBJECTS, rows)
+    level = rng.choice(LEVELS, rows)
+    promo = np.where(rng.random(rows) < 0.3, "(優惠課程)", "")
+    return pd.DataFrame({
+        "編號": [f"SIC{seed}{i:06d}" for i in range(rows)],
+        "名稱": [f"{s}{lv}{p}|(SIC{seed}{i:06d})" for i, (s, lv, p) in enumerate(zip(subject, level, promo))],
+        "時間": rng.choice(TIMES, rows),
+        "逢星期": rng.choice(WEEKDAYS, rows),
+        "堂數": [f"{n} (堂數)|0 (停課)|" for n in rng.integers(4, 13, rows)],
+        "上限": [f"{n} 人" for n in rng.choice([6, 8, 10, 12, 15, 20], rows)],
+        "收費": [f"${n}.00 (課程)|" for n in rng.integers(8, 60, rows) * 10],
+        "導師": rng.choice([f"導師{i:03d}" for i in range(teachers)], rows),
+    })
+
+
+# ========== 旧版逐对匹配（课程更新1.4 原实现）==========
+def legacy_match(progress_df, wait_df):
+    unmatched, log_records, mapping_records = [], [], []
+    for _, rowA in progress_df.iterrows():
+        teacher = rowA.get("導師", "")
+        nameA = rowA.get("名稱", "")
+        wait_subset = wait_df[wait_df["導師"] == teacher]
+        best_score, best_rowB, best_name_score, best_extra = -1, None, 0, {}
+        for _, rowB in wait_subset.iterrows():
+            nameB = rowB.get("名稱", "")
+            sim = SequenceMatcher(None, nameA, nameB).ratio()
+            name_score = sim * 60
+            if name_score < 50:
+                extras = {k: 0 for k in ["逢星期得分", "時間得分", "收費得分", "堂數得分", "上限得分"]}
+                total = name_score
+                result = "否（相似度過低）"
+            else:
+                extras = {
+                    "逢星期得分": 12 if rowA.get("逢星期") == rowB.get("逢星期") else 0,
+                    "時間得分": 10 if rowA.get("時間") == rowB.get("時間") else 0,
+                    "收費得分": 8 if rowA.get("收費") == rowB.get("收費") else 0,
+                    "堂數得分": 6 if rowA.get("堂數") == rowB.get("堂數") else 0,
+                    "上限得分": 4 if rowA.get("上限") == rowB.get("上限") else 0,
+                }
+                total = name_score + sum(extras.values())
+                result = "是" if total >= 85 else "否"
+            log_records.append({"A_课程名称": nameA, "B_课程名称": nameB, "导师": teacher,
+                                "名称相似度": round(sim, 4), "主体名称得分": round(name_score, 2), **extras,
+                                "总分": round(total, 2), "是否匹配": result})
+            if total > best_score:
+                best_score, best_rowB, best_name_score, best_extra = total, rowB, name_score, extras
+        if best_score >= 85 and best_rowB is not None:
+            mapping_records.append({"A_课程名称": nameA, "B_课程名称": best_rowB["名稱"], "导师": teacher,
+                                    "总分": round(best_score, 2), "主体名称得分": round(best_name_score, 2),
+                                    "附加加分": sum(best_extra.values()), "匹配备注": "匹配成功（最佳得分）"})
+        else:
+            unmatched.append(rowA)
+    return pd.DataFrame(unmatched), pd.DataFrame(log_records), pd.DataFrame(mapping_records)
+
+
+def make_tables(args):
+    progress_df = make_courses(args.rows, args.teachers, seed=1)
+    wait_df = make_courses(args.rows, args.teachers, seed=2)
+    # 一半的下期课程延续本期课程（课程编号是新的），保证有足够的匹配
+    half = args.rows // 2
+    same = ["時間", "逢星期", "堂數", "上限", "收費", "導師"]
+    # 另有一成本期课程是并行班：与前面的课程同名同时段，下期合并为一班，两门本期课程争同一个下期课程
+    twins = half // 10
+    progress_df.loc[half:half + twins - 1, same] = progress_df.loc[:twins - 1, same].to_numpy()
+    progress_df.loc[half:half + twins - 1, "名稱"] = [
+        f"{name.split('|')[0]}|({code})" for name, code in zip(progress_df["名稱"][:twins], progress_df["編號"][half:])
+    ]
+    wait_df.loc[:half - 1, same] = progress_df.loc[:half - 1, same].to_numpy()
+    wait_df.loc[:half - 1, "名稱"] = [
+        f"{name.split('|')[0]}|({code})" for name, code in zip(progress_df["名稱"][:half], wait_df["編號"][:half])
+    ]
+    print(f"📊 本期 {args.rows:,} 行 × 下期 {args.rows:,} 行，导师 {args.teachers} 位")
+    return progress_df, wait_df
+
+
+def bench_match(args):
+    progress_df, wait_df = make_tables(args)
+    t0 = time.perf_counter()
+    new = match_courses(progress_df, wait_df, scorer=args.scorer)
+    t_new = time.perf_counter() - t0
+    print(f"   course_matcher（{args.scorer}）：{t_new:.2f} s，候选对 {len(new[1]):,}，匹配 {len(new[2]):,}")
+
+    if args.skip_legacy:
+        return
+    t0 = time.perf_counter()
+    old = legacy_match(progress_df, wait_df)
+    t_old = time.perf_counter() - t0
+    print(f"   旧版逐对匹配：{t_old:.2f} s（{t_old / t_new:.1f}×）")
+    same = all(
+        a.to_csv(index=False) == b.to_csv(index=False)
+        for a, b in zip(old, new)
+    )
+    print(f"   输出一致：{'✅' if same else '❌'}")
+
+
+def bench_assign(args):
+    progress_df, wait_df = make_tables(args)
+    for mode in ("greedy", "assign"):
+        t0 = time.perf_counter()
+        _, _, mapping_df = match_courses(progress_df, wait_df, scorer=args.scorer, mode=mode)
+        elapsed = time.perf_counter() - t0
+        mapped = mapping_df[mapping_df["B_课程名称"] != ""]
+        shared = mapped.duplicated(["导师", "B_课程名称"], keep=False).sum()
+        print(f"   {mode:<6}：{elapsed:.2f} s，匹配 {len(mapped):,}，"
+              f"与其他课程共用同一下期课程 {shared:,}，总分合计 {mapped['总分'].astype(float).sum():,.1f}")
+        if mode == "assign":
+            print(f"   两种方式结果不同：{(mapping_df['两种方式一致'] == '否').sum():,} 条")
+
+
+# ========== 匹配日志：逐导师 DataFrame 拼接（course_matcher 原实现）vs MatchLog 列式存储 ==========
+def legacy_log(progress_df, wait_df, blocks, threshold=85):
+    names_a = progress_df["名稱"].to_numpy(dtype=object)
+    names_b = wait_df["名稱"].to_numpy(dtype=object)
+    parts = []
+    for teacher, blk in blocks:
+        a, b, total = blk["a"], blk["b"], blk["total"]
+        na, nb = total.shape
+        parts.append(pd.DataFrame({
+            "pos": np.repeat(a, nb),
+            "A_课程名称": np.repeat(names_a[a], nb),
+            "B_课程名称": np.tile(names_b[b], na),
+            "导师": teacher,
+            "名称相似度": blk["sim"].ravel().round(4),
+            "主体名称得分": blk["name"].ravel().round(2),
+            **{k: v.ravel() for k, v in blk["extras"].items()},
+            "总分": total.ravel().round(2),
+            "是否匹配": np.select([~blk["passed"].ravel(), total.ravel() >= threshold],
+                               ["否（相似度過低）", "是"], "否"),
+        }))
+    df = pd.concat(parts, ignore_index=True)
+    df = df.iloc[np.argsort(df["pos"].to_numpy(), kind="stable")]
+    return df[LOG_COLUMNS].reset_index(drop=True)
+
+
+def _peak_mb(func):
+    """func 运行期间新增内存的峰值（MB，tracemalloc 统计；计时另外不开 tracemalloc 运行）"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def _timed(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def bench_log(args):
+    progress_df, wait_df = make_tables(args)
+    blocks = list(score_blocks(progress_df, wait_df, scorer=args.scorer))
+
+    def build(level="all", top_k=None):
+        log = MatchLog(progress_df, wait_df, level=level, top_k=top_k)
+        for _, blk in blocks:
+            log.add(blk)
+        return log
+
+    old, t_old = _timed(lambda: legacy_log(progress_df, wait_df, blocks))
+    new, t_new = _timed(lambda: build().frame())
+    same = old.to_csv(index=False) == new.to_csv(index=False)
+    del new
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "匹配日志")
+        _, t_old_csv = _timed(old.to_csv, path + ".csv", index=False, encoding="utf-8-sig")
+        del old
+        _, t_csv = _timed(lambda: build().write(path + ".csv"))
+        _, t_parquet = _timed(lambda: build().write(path + ".parquet"))
+
+    log = build()
+    m_old = _peak_mb(lambda: legacy_log(progress_df, wait_df, blocks))
+    m_frame = _peak_mb(log.frame)
+    m_store = _peak_mb(build)
+    m_chunk = _peak_mb(lambda: next(log.chunks()).to_csv(index=False))
+    print(f"   逐导师 DataFrame 拼接：{t_old:.2f} s，峰值 {m_old:.0f} MB；再写出 CSV {t_old_csv:.2f} s")
+    print(f"   MatchLog 整表取出：{t_new:.2f} s，峰值 {m_frame:.0f} MB，输出一致：{'✅' if same else '❌'}")
+    print(f"   MatchLog 分块写出：CSV {t_csv:.2f} s / Parquet {t_parquet:.2f} s；"
+          f"列式存储 {m_store:.0f} MB + 每块（{LOG_CHUNK_ROWS:,} 行）{m_chunk:.0f} MB，共 {len(log):,} 行")
+
+    for level in LOG_LEVELS:
+        print(f"   日志级别 {level:<6}：{len(build(level)):,} 行")
+    print(f"   每门课前 3 名     ：{len(build(top_k=3)):,} 行")
+
+
+# ========== 旧版逐行排课（日期更新1.4 原实现；补课日期按时间排序，下期从真正的最后一节之后开始）==========
+def legacy_adjust(dates, holidays):
+    valid, conflicts = [], []
+    if not dates:
+        return valid, conflicts
+    extra = dates[-1] + timedelta(days=7)
+    for d in dates:
+        if d.date() in holidays:
+            conflicts.append(d)
+            while extra.date() in holidays:
+                extra += timedelta(days=7)
+            valid.append(extra)
+            extra += timedelta(days=7)
+        else:
+            valid.append(d)
+    return valid, conflicts
+
+
+def legacy_schedule(df, holidays):
+    out = []
+    for _, row in df.iterrows():
+        start = pd.to_datetime(str(row["上課日期"]).strip()[:10], errors="coerce")
+        lessons = int(row["堂數"])
+        current, _ = legacy_adjust([start + timedelta(days=7 * i) for i in range(lessons)], holidays)
+        next_start = max(current) + timedelta(days=7)
+        while next_start.date() in holidays:
+            next_start += timedelta(days=7)
+        following, conflicts = legacy_adjust([next_start + timedelta(days=7 * i) for i in range(lessons)], holidays)
+        out.append(("X".join(d.strftime("%Y-%m-%d") for d in sorted(following)),
+                    "X".join(d.strftime("%Y-%m-%d") for d in conflicts)))
+    return out
+
+
+def bench_schedule(args):
+    rng = np.random.default_rng(0)
+    holidays = {d.date() for d in pd.to_datetime(rng.choice(pd.date_range("2025-01-01", "2028-12-31"), 60))}
+    df = pd.DataFrame({
+        "上課日期": [f"{d:%Y-%m-%d} (開始)|" for d in pd.Timestamp("2025-09-01") + pd.to_timedelta(rng.integers(0, 600, args.rows), "D")],
+        "堂數": rng.integers(1, 16, args.rows).astype(str),
+    })
+    print(f"📊 {args.rows:,} 门课，节假日 {len(holidays)} 天")
+
+    t0 = time.perf_counter()
+    cal = HolidayCalendar(holidays)
+    starts = pd.to_datetime(df["上課日期"].str[:10], format="%Y-%m-%d").to_numpy(dtype="datetime64[D]")
+    plan = cal.schedule_terms(starts, df["堂數"].astype(int).to_numpy())
+    new = list(zip(join_dates(plan["next"]), join_dates(plan["conflicts"])))
+    t_new = time.perf_counter() - t0
+    print(f"   HolidayCalendar 整列排课：{t_new * 1000:.0f} ms")
+
+    t0 = time.perf_counter()
+    old = legacy_schedule(df, holidays)
+    t_old = time.perf_counter() - t0
+    print(f"   旧版逐行 timedelta 循环：{t_old * 1000:.0f} ms（{t_old / t_new:.1f}×）")
+    print(f"   下期上课日期与节假日冲突一致：{'✅' if old == new else '❌'}")
+
+
+# ========== 载入被测脚本（文件名含“.”，不能直接 import）==========
+_date_script = None
+
+
+def load_date_script():
+    global _date_script
+    if _date_script is None:
+        spec = importlib.util.spec_from_file_location("日期更新", DATE_SCRIPT_PATH)
+        _date_script = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_date_script)
+    return _date_script
+
+
+def make_pending_csv(path, rows: int, seed: int):
+    rng = np.random.default_rng(seed)
+    starts = pd.Timestamp("2025-11-01") + pd.to_timedelta(rng.integers(0, 150, rows), "D")
+    pd.DataFrame({
+        "#": np.arange(1, rows + 1),
+        "編號": [f"SIC{seed:02d}{i:05d}" for i in range(rows)],
+        "名稱": [f"{s}|(SIC{seed:02d}{i:05d})" for i, s in enumerate(rng.choice(SUBJECTS, rows))],
+        "上課日期": [f"{d:%Y-%m-%d} (開始)|" for d in starts],
+        "時間": rng.choice(TIMES, rows),
+        "逢星期": rng.choice(WEEKDAYS, rows),
+        "堂數": [f"{n} (堂數)|0 (停課)|" for n in rng.integers(1, 13, rows)],
+        "上限": "10 人",
+        "收費": "$320.00 (課程)|",
+        "導師": rng.choice([f"導師{i:03d}" for i in range(30)], rows),
+    }).to_csv(path, index=False)
+
+
+def legacy_write(xlsx_path, df, update_df):
+    """旧写法：to_excel 写原始数据 → load_workbook 重新打开 → 逐行 append → 逐格设置对齐"""
+    from openpyxl import load_workbook
+    from openpyxl.styles import Alignment
+
+    script = load_date_script()
+    df.to_excel(xlsx_path, index=False, sheet_name="原始数据")
+    wb = load_workbook(xlsx_path)
+    ws = wb.create_sheet("日期更新")
+    ws.append(list(update_df.columns))
+    for row in update_df.itertuples(index=False):
+        ws.append(list(row))
+    for letter, width in script.col_widths.items():
+        ws.column_dimensions[letter].width = width
+    for row in ws.iter_rows(min_row=2, max_col=10):
+        for cell in row:
+            cell.alignment = Alignment(horizontal="left", vertical="center")
+    wb.save(xlsx_path)
+
+
+def _write_job(job):
+    csv_path, xlsx_path, writer = job
+    script = load_date_script()
+    df = pd.read_csv(csv_path, dtype=str).fillna("")
+    update_df = script.build_update_frame(df, load_calendar())
+    (legacy_write if writer == "legacy" else script.write_update_workbook)(xlsx_path, df, update_df)
+
+
+def bench_write(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        csvs = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"{i:02d}_待更新课程.csv")
+            make_pending_csv(path, args.rows, i)
+            csvs.append(path)
+        print(f"📊 {args.files} 个待更新课程 CSV × {args.rows:,} 行")
+
+        t0 = time.perf_counter()
+        for path in csvs:
+            _write_job((path, path[:-4] + "_旧.xlsx", "legacy"))
+        t_old = time.perf_counter() - t0
+        print(f"   旧写法（逐个文件，to_excel + 重新打开 + 逐格对齐）：{t_old:.2f} s")
+
+        t0 = time.perf_counter()
+        for path in csvs:
+            _write_job((path, path[:-4] + ".xlsx", "new"))
+        t_seq = time.perf_counter() - t0
+        print(f"   一趟写出（逐个文件）：{t_seq:.2f} s（{t_old / t_seq:.1f}×）")
+
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(_write_job, [(p, p[:-4] + ".xlsx", "new") for p in csvs]))
+        t_par = time.perf_counter() - t0
+        print(f"   一趟写出（{args.workers or os.cpu_count()} 进程并行）：{t_par:.2f} s（{t_old / t_par:.1f}×）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="课程更新 性能测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("匹配", help="本期 → 下期课程匹配：逐对 SequenceMatcher vs course_matcher 分块矩阵")
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--teachers", type=int, default=100)
+    p.add_argument("--scorer", choices=SCORERS, default="difflib")
+    p.add_argument("--skip-legacy", action="store_true", help="不运行旧版（行数很大时旧版很慢）")
+    p.set_defaults(func=bench_match)
+
+    p = sub.add_parser("分配", help="贪心（各取最高分）vs 每位导师一对一最优分配")
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--teachers", type=int, default=100)
+    p.add_argument("--scorer", choices=SCORERS, default="rapidfuzz")
+    p.set_defaults(func=bench_assign)
+
+    p = sub.add_parser("日志", help="匹配日志：逐导师 DataFrame 拼接 vs MatchLog 列式存储 / 分块写出，各日志级别行数")
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--teachers", type=int, default=20)
+    p.add_argument("--scorer", choices=SCORERS, default="rapidfuzz")
+    p.set_defaults(func=bench_log)
+
+    p = sub.add_parser("排课", help="日期更新：逐行 timedelta 循环 vs HolidayCalendar 整列排课")
+    p.add_argument("--rows", type=int, default=20000)
+    p.set_defaults(func=bench_schedule)
+
+    p = sub.add_parser("写出", help="日期更新工作簿：to_excel + 重新打开逐格设置 vs 一趟写出 + 多文件并行")
+    p.add_argument("--files", type=int, default=20)
+    p.add_argument("--rows", type=int, default=2000)
+    p.add_argument("--workers", type=int, default=None)
+    p.set_defaults(func=bench_write)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,42 @@
+import argparse
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
 import pandas as pd
-import re
-from datetime import datetime, timedelta
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Border, Font, Side
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "公共模块"))
+from holiday_calendar import load_calendar, join_dates
+from xlsx_style import StylePool, styled_cell
 
 # ========= 配置路径 =========
 BASE_DIR = os.getcwd()
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 
-# ========= 固定节假日（不再读取「节假日安排.xlsx」） =========
-holiday_dates = {
-    datetime(2025, 12, 25).date(),
-    datetime(2025, 12, 26).date(),
-    datetime(2026, 1, 1).date(),
-    datetime(2026, 2, 17).date(),
-    datetime(2026, 2, 18).date(),
-    datetime(2026, 2, 19).date(),
-    datetime(2026, 4, 3).date(),
-    datetime(2026, 4, 4).date(),
-    datetime(2026, 4, 6).date(),
-    datetime(2026, 4, 7).date(),
-    datetime(2026, 5, 1).date(),
-    datetime(2026, 5, 25).date(),
-    datetime(2026, 6, 19).date(),
-    datetime(2026, 7, 1).date(),
-    datetime(2026, 9, 26).date(),
-    datetime(2026, 10, 1).date(),
-    datetime(2026, 10, 19).date(),
-    datetime(2026, 12, 25).date(),
-    datetime(2026, 12, 26).date(),
-}
+# ========= 节假日来源 =========
+# None：内置节假日表（公共模块/holiday_calendar.py 的 BUILTIN_HOLIDAYS）；
+# 也可指向 .ics / .csv / .xlsx 文件（如本目录的 节假日安排.xlsx），或运行时用 --holidays 指定。
+# 编好的日历按来源内容缓存在 公共模块/.cache/节假日，来源不变时不再重新解析。
+HOLIDAY_SOURCE = None
 
 # ========= 工具函数 =========
 
-def extract_lessons(raw):
-    match = re.search(r"(\d+)\s*\(堂數\)", str(raw))
-    return int(match.group(1)) if match else 0
-
-
-def adjust_dates_for_holidays(dates, holiday_dates):
-    valid_dates = []
-    conflict_dates = []
-
-    if not dates:
-        return valid_dates, conflict_dates
+def extract_lessons(col):
+    """「4 (堂數)|0 (停課)|…」→ 4；没有堂數的为 0"""
+    return col.astype(str).str.extract(r"(\d+)\s*\(堂數\)")[0].fillna(0).astype(int).to_numpy()
 
-    # 从原始列表最后一天 +7 开始准备补课日期
-    extra_date = dates[-1] + timedelta(days=7)
 
-    for d in dates:
-        if d.date() in holiday_dates:
-            conflict_dates.append(d)
-            while extra_date.date() in holiday_dates:
-                extra_date += timedelta(days=7)
-            valid_dates.append(extra_date)
-            extra_date += timedelta(days=7)
-        else:
-            valid_dates.append(d)
-
-    return valid_dates, conflict_dates
+def parse_start_dates(col):
+    """「2025-12-16 (開始)|…」取前 10 个字符解析为开课日；无法解析的为 NaT"""
+    text = col.astype(str).str.strip().str[:10]
+    dates = pd.to_datetime(text, format="%Y-%m-%d", errors="coerce")
+    rest = dates.isna() & (text != "")
+    if rest.any():   # 非 YYYY-MM-DD 写法的少数行逐个解析
+        dates[rest] = [pd.to_datetime(t, errors="coerce") for t in text[rest]]
+    return dates.to_numpy(dtype="datetime64[D]")
 
 
 # ========= 列宽设置（加入新的“逢星期”列） =========
@@ -77,118 +54,121 @@ col_widths = {
 }
 
 
-def process_csv(csv_path):
-    filename = os.path.basename(csv_path).replace(".csv", "")
-    xlsx_path = os.path.join(OUTPUT_DIR, filename + ".xlsx")
-
-    # 读入 CSV → 写入原始数据工作表
-    df = pd.read_csv(csv_path, dtype=str).fillna("")
-    df.to_excel(xlsx_path, index=False, sheet_name="原始数据")
-
-    wb = load_workbook(xlsx_path)
+# ========= 样式：原始数据表头与 pandas to_excel 相同；日期更新数据行左对齐、垂直居中 =========
+THIN = Side(border_style="thin")
+HEADER_STYLE = {
+    "font": Font(bold=True),
+    "border": Border(top=THIN, bottom=THIN, left=THIN, right=THIN),
+    "alignment": Alignment(horizontal="center", vertical="top"),
+}
+BODY_ALIGNMENT = Alignment(horizontal="left", vertical="center")
+
+# ========== 新增“逢星期”列，因此所有列后移 ==========
+UPDATE_HEADERS = [
+    "逢星期",
+    "名稱",
+    "下期开课时间",
+    "下期结课时间",
+    "本期上課日期",
+    "堂數",
+    "導師",
+    "編號",
+    "备注",
+    "上课日期",
+]
+
+
+def build_update_frame(df, calendar):
+    """整列排课：本期有效日期 → 下期开课日 → 下期上课日期与节假日冲突，返回「日期更新」表"""
+    def column(name):
+        return df[name] if name in df.columns else pd.Series("", index=df.index)
+
+    lessons = extract_lessons(column("堂數"))
+    plan = calendar.schedule_terms(parse_start_dates(column("上課日期")), lessons)
+    ok = plan["ok"]
+    if calendar.last_year is not None and ok.any():
+        beyond = plan["next_end"][ok].max().astype("datetime64[Y]").astype(int) + 1970
+        if beyond > calendar.last_year:
+            print(f"⚠️ 节假日数据只到 {calendar.last_year} 年，{calendar.last_year + 1} 年起的上课日期未避开节假日，请更新节假日来源")
+    conflicts = np.array(join_dates(plan["conflicts"]), dtype=object)
+
+    return pd.DataFrame({
+        "逢星期": column("逢星期").to_numpy(),
+        "名稱": column("名稱").to_numpy(),
+        "下期开课时间": np.where(ok, np.datetime_as_string(plan["next_start"], unit="D"), ""),
+        "下期结课时间": np.where(ok, np.datetime_as_string(plan["next_end"], unit="D"), ""),
+        "本期上課日期": column("上課日期").astype(str).str.strip().to_numpy(),
+        "堂數": pd.Series(lessons, dtype=object).where(lessons > 0, "").to_numpy(),
+        "導師": column("導師").to_numpy(),
+        "編號": column("編號").to_numpy(),
+        "备注": np.where(~ok, "未安排課節", np.where(conflicts != "", "節假日衝突：" + conflicts, "")),
+        "上课日期": np.where(ok, join_dates(plan["next"]), ""),
+    }, columns=UPDATE_HEADERS)
+
+
+def _frame_rows(df):
+    """逐行产出 Python 原生值（按列转换一次，不逐行取 Series）"""
+    return zip(*(df[c].tolist() for c in df.columns))
+
+
+def write_update_workbook(xlsx_path, df, update_df):
+    """
+    一次写出「原始数据」「日期更新」两张表（write-only 工作簿）：
+    样式只登记一次，按列分配给单元格，不再写完后重新打开、逐格设置对齐。
+    """
+    wb = Workbook(write_only=True)
+    ws_raw = wb.create_sheet("原始数据")
     ws = wb.create_sheet("日期更新")
-
-    # ========== 新增“逢星期”列，因此所有列后移 ==========
-    headers = [
-        "逢星期",
-        "名稱",
-        "下期开课时间",
-        "下期结课时间",
-        "本期上課日期",
-        "堂數",
-        "導師",
-        "編號",
-        "备注",
-        "上课日期",
-    ]
-    ws.append(headers)
-
-    for idx, row in df.iterrows():
-        weekday = row.get("逢星期", "")      # 原始数据中 H 列
-        name = row.get("名稱", "")
-        start_str = str(row.get("上課日期", "")).strip()
-        teacher = row.get("導師", "")
-        code = row.get("編號", "")
-        raw_lesson = row.get("堂數", "")
-        lessons = extract_lessons(raw_lesson)
-
-        original_date_display = start_str
-        remark = ""
-        next_start_str = ""
-        next_end_str = ""
-        next_term_dates_str = ""
-
-        # 解析「本期开课日」
-        try:
-            current_start_date = pd.to_datetime(start_str[:10], errors="coerce")
-        except Exception:
-            current_start_date = None
-
-        if pd.isna(current_start_date) or lessons <= 0:
-            remark = "未安排課節"
-        else:
-            # ========== 1) 生成本期有效上课日期 ==========
-            current_naive_dates = [
-                current_start_date + timedelta(days=7 * i) for i in range(lessons)
-            ]
-            current_valid_dates, _ = adjust_dates_for_holidays(current_naive_dates, holiday_dates)
-
-            last_current_date = current_valid_dates[-1]
-
-            # ========== 2) 计算 下期开课时间（保持同星期） ==========
-            next_start_date = last_current_date + timedelta(days=7)
-            while next_start_date.date() in holiday_dates:
-                next_start_date += timedelta(days=7)
-
-            # ========== 3) 生成下期上课日期（节假日顺延） ==========
-            next_naive_dates = [
-                next_start_date + timedelta(days=7 * i) for i in range(lessons)
-            ]
-            next_valid_dates, conflict_dates = adjust_dates_for_holidays(
-                next_naive_dates, holiday_dates
-            )
-
-            next_term_dates_str = "X".join(d.strftime("%Y-%m-%d") for d in next_valid_dates)
-            next_start_str = next_valid_dates[0].strftime("%Y-%m-%d")
-            next_end_str = next_valid_dates[-1].strftime("%Y-%m-%d")
-
-            if conflict_dates:
-                remark = "節假日衝突：" + "X".join(
-                    d.strftime("%Y-%m-%d") for d in conflict_dates
-                )
-
-        # ========== 写入新行（含新增的“逢星期”列） ==========
-        ws.append([
-            weekday,
-            name,
-            next_start_str,
-            next_end_str,
-            original_date_display,
-            lessons if lessons > 0 else "",
-            teacher,
-            code,
-            remark,
-            next_term_dates_str,
-        ])
-
-    # ========= 设置列宽 & 对齐 =========
     for col_letter, width in col_widths.items():
-        ws.column_dimensions[col_letter].width = width
+        ws.column_dimensions[col_letter].width = width   # write-only 模式下须在写第一行之前设定
+
+    pool = StylePool(wb)
+    header = pool.get(**HEADER_STYLE)
+    column_styles = [pool.get(alignment=BODY_ALIGNMENT)] * len(update_df.columns)
 
-    for row in ws.iter_rows(min_row=2, max_col=10):
-        for cell in row:
-            cell.alignment = Alignment(horizontal="left", vertical="center")
+    ws_raw.append([styled_cell(ws_raw, name, header) for name in df.columns])
+    for values in _frame_rows(df):
+        ws_raw.append(values)
+
+    ws.append(list(update_df.columns))
+    for values in _frame_rows(update_df):
+        ws.append([styled_cell(ws, v, style) for v, style in zip(values, column_styles)])
 
     wb.save(xlsx_path)
-    print(f"✅ 已处理：{os.path.basename(csv_path)} → {os.path.basename(xlsx_path)}")
+
+
+def process_csv(csv_path, calendar=None):
+    calendar = calendar or load_calendar(HOLIDAY_SOURCE)
+    xlsx_path = os.path.splitext(csv_path)[0] + ".xlsx"   # 与 CSV 同目录、同名
+
+    df = pd.read_csv(csv_path, dtype=str).fillna("")
+    write_update_workbook(xlsx_path, df, build_update_frame(df, calendar))
+    return f"✅ 已处理：{os.path.basename(csv_path)} → {os.path.basename(xlsx_path)}"
 
 
 # ========= 主执行入口 =========
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="更新下期开课日期")
+    parser.add_argument("--holidays", default=HOLIDAY_SOURCE,
+                        help="节假日来源：.ics / .csv / .xlsx 文件（默认：内置节假日表）")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="待更新课程 CSV 所在目录（默认：output）")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认：CPU 核数）")
+    args = parser.parse_args()
+
     print("📅 正在更新下期开课日期（含逢星期列）...")
+    calendar = load_calendar(args.holidays)
 
-    for fname in os.listdir(OUTPUT_DIR):
-        if fname.endswith(".csv") and "待更新课程" in fname:
-            process_csv(os.path.join(OUTPUT_DIR, fname))
+    csv_paths = [
+        os.path.join(args.output, fname) for fname in sorted(os.listdir(args.output))
+        if fname.endswith(".csv") and "待更新课程" in fname
+    ]
+    # 各 CSV 互不相关，多个文件时并行处理
+    if len(csv_paths) > 1 and args.workers != 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for message in pool.map(process_csv, csv_paths, repeat(calendar)):
+                print(message)
+    else:
+        for path in csv_paths:
+            print(process_csv(path, calendar))
 
     print("🎉 所有课程日期已更新完毕。")
@@ -1,8 +1,12 @@
+import argparse
 import os
+import sys
 import pandas as pd
-import re
 from datetime import datetime
-from difflib import SequenceMatcher
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "公共模块"))
+import course_matcher
+from course_matcher import DEFAULT_THRESHOLD, DEFAULT_WEIGHTS, LOG_LEVELS, MODES, SCORERS
 
 # =========================
 # 路径配置
@@ -12,114 +16,109 @@ WAIT_PATH = os.path.join(BASE_DIR, "等待(下期课程)")
 PROGRESS_PATH = os.path.join(BASE_DIR, "进行(本期课程)")
 OUTPUT_PATH = os.path.join(BASE_DIR, "output")
 
-wait_file = [f for f in os.listdir(WAIT_PATH) if f.endswith(".csv")][0]
-progress_file = [f for f in os.listdir(PROGRESS_PATH) if f.endswith(".csv")][0]
-
-wait_df = pd.read_csv(os.path.join(WAIT_PATH, wait_file), dtype=str).fillna("")
-progress_df = pd.read_csv(os.path.join(PROGRESS_PATH, progress_file), dtype=str).fillna("")
-
 # =========================
-# 工具函数
+# 读取课程表
 # =========================
-def similarity(a, b):
-    return SequenceMatcher(None, a, b).ratio()
-
-def extra_scores(rowA, rowB):
-    return {
-        "逢星期得分": 12 if rowA.get("逢星期") == rowB.get("逢星期") else 0,
-        "時間得分": 10 if rowA.get("時間") == rowB.get("時間") else 0,
-        "收費得分": 8 if rowA.get("收費") == rowB.get("收費") else 0,
-        "堂數得分": 6 if rowA.get("堂數") == rowB.get("堂數") else 0,
-        "上限得分": 4 if rowA.get("上限") == rowB.get("上限") else 0,
-    }
+def first_csv(path):
+    """path 为目录时取其中（按文件名排序）第一个 CSV；为文件时原样返回"""
+    if os.path.isfile(path):
+        return path
+    files = sorted(f for f in os.listdir(path) if f.endswith(".csv"))
+    if not files:
+        raise FileNotFoundError(f"❌ {path} 中没有 CSV 文件")
+    return os.path.join(path, files[0])
+
+
+def load_course_tables(wait_path=WAIT_PATH, progress_path=PROGRESS_PATH):
+    """返回 (下期课程 wait_df, 本期课程 progress_df)，全部列读为字符串"""
+    wait_df = pd.read_csv(first_csv(wait_path), dtype=str).fillna("")
+    progress_df = pd.read_csv(first_csv(progress_path), dtype=str).fillna("")
+    return wait_df, progress_df
 
-# =========================
-# 匹配函数：附带完整日志与成功映射记录
-# =========================
-def match_courses():
-    unmatched = []
-    log_records = []
-    mapping_records = []
-
-    for _, rowA in progress_df.iterrows():
-        teacher = rowA.get("導師", "")
-        nameA = rowA.get("名稱", "")
-        wait_subset = wait_df[wait_df["導師"] == teacher]
-
-        best_score = -1
-        best_match_rowB = None
-        best_match_name_score = 0
-        best_match_extra = {}
-
-        for _, rowB in wait_subset.iterrows():
-            nameB = rowB.get("名稱", "")
-            sim = similarity(nameA, nameB)
-            name_score = sim * 60
-
-            if name_score < 50:
-                extras = {key: 0 for key in ["逢星期得分", "時間得分", "收費得分", "堂數得分", "上限得分"]}
-                total = name_score
-                match_result = "否（相似度過低）"
-            else:
-                extras = extra_scores(rowA, rowB)
-                total = name_score + sum(extras.values())
-                match_result = "是" if total >= 85 else "否"
-
-            log_records.append({
-                "A_课程名称": nameA,
-                "B_课程名称": nameB,
-                "导师": teacher,
-                "名称相似度": round(sim, 4),
-                "主体名称得分": round(name_score, 2),
-                **extras,
-                "总分": round(total, 2),
-                "是否匹配": match_result
-            })
-
-            if total > best_score:
-                best_score = total
-                best_match_rowB = rowB
-                best_match_name_score = name_score
-                best_match_extra = extras
-
-        if best_score >= 85 and best_match_rowB is not None:
-            mapping_records.append({
-                "A_课程名称": nameA,
-                "B_课程名称": best_match_rowB["名稱"],
-                "导师": teacher,
-                "总分": round(best_score, 2),
-                "主体名称得分": round(best_match_name_score, 2),
-                "附加加分": sum(best_match_extra.values()),
-                "匹配备注": "匹配成功（最佳得分）"
-            })
-        else:
-            unmatched.append(rowA)
-
-    return pd.DataFrame(unmatched), pd.DataFrame(log_records), pd.DataFrame(mapping_records)
 
 # =========================
-# 主执行入口
+# 匹配函数：附带完整日志与成功映射记录
 # =========================
-if __name__ == "__main__":
-    print("🔍 正在执行课程匹配与日志生成...")
-
-    unmatched_df, log_df, mapping_df = match_courses()
-    now = datetime.now().strftime("%Y-%m-%d_%H%M")
+def match_courses(progress_df, wait_df, weights=None, threshold=DEFAULT_THRESHOLD, scorer="difflib", mode="greedy",
+                  log_level="all", top_k=None):
+    # 按导师分块、整块打分（见 公共模块/course_matcher.py）；匹配日志以 MatchLog 返回，写出时分块生成
+    return course_matcher.match_courses(progress_df, wait_df, weights=weights, threshold=threshold,
+                                        scorer=scorer, mode=mode, log_level=log_level, top_k=top_k,
+                                        stream_log=True)
+
+
+def parse_weights(items):
+    """["名稱=60", "時間=10", ...] → {"名稱": 60.0, "時間": 10.0}"""
+    weights = {}
+    for item in items or []:
+        key, _, value = item.partition("=")
+        if key not in DEFAULT_WEIGHTS or not value:
+            raise SystemExit(f"❌ 无法识别的权重：{item}（可选 {', '.join(DEFAULT_WEIGHTS)}）")
+        weights[key] = int(value) if value.isdigit() else float(value)
+    return weights
+
+
+def add_match_arguments(parser):
+    """匹配相关的命令行参数（课程更新、下期课程流水线共用）"""
+    parser.add_argument("--wait", default=WAIT_PATH, help="下期课程 CSV 或所在目录（默认：等待(下期课程)）")
+    parser.add_argument("--progress", default=PROGRESS_PATH, help="本期课程 CSV 或所在目录（默认：进行(本期课程)）")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="日志与待更新课程的输出目录（默认：output）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="总分及格线（默认 85）")
+    parser.add_argument("--weight", action="append", metavar="列=分值",
+                        help="覆盖默认权重，可重复，如 --weight 名稱=60 --weight 時間=10")
+    parser.add_argument("--scorer", choices=SCORERS, default="difflib",
+                        help="名称相似度算法：difflib（默认，与旧版分数一致）/ rapidfuzz（更快，需安装 rapidfuzz）")
+    parser.add_argument("--mode", choices=MODES, default="greedy",
+                        help="greedy：每门课各取最高分（默认）/ assign：每位导师一对一最优分配（需安装 scipy），"
+                             "映射日志同时列出两种结果")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="all",
+                        help="匹配日志范围：all 全部候选对（默认）/ passed 名称得分达标的 / best 每门课只记最高分一条")
+    parser.add_argument("--top-k", type=int, default=None, metavar="K", help="匹配日志每门课只保留总分最高的 K 条")
+    parser.add_argument("--log-format", choices=("csv", "parquet"), default="csv",
+                        help="匹配日志格式（parquet 需安装 pyarrow）")
+
+
+def write_match_outputs(unmatched_df, match_log, mapping_df, output_dir=OUTPUT_PATH, stamp=None, pending_csv=True,
+                        log_format="csv"):
+    """写出待更新课程（pending_csv=False 时不写）、匹配日志（分块写出）、映射日志；返回文件名前缀（时间戳）"""
+    now = stamp or datetime.now().strftime("%Y-%m-%d_%H%M")
+    os.makedirs(output_dir, exist_ok=True)
 
     # 输出未匹配课程
-    if not unmatched_df.empty:
-        unmatched_path = os.path.join(OUTPUT_PATH, f"{now}_待更新课程.csv")
+    if unmatched_df.empty:
+        print("✅ 所有课程都已成功匹配。")
+    elif pending_csv:
+        unmatched_path = os.path.join(output_dir, f"{now}_待更新课程.csv")
         unmatched_df.to_csv(unmatched_path, index=False, encoding="utf-8-sig")
         print(f"📌 待更新课程：{len(unmatched_df)} 条 → {unmatched_path}")
     else:
-        print("✅ 所有课程都已成功匹配。")
+        print(f"📌 待更新课程：{len(unmatched_df)} 条")
 
     # 输出匹配日志
-    log_path = os.path.join(OUTPUT_PATH, f"{now}_匹配日志.csv")
-    log_df.to_csv(log_path, index=False, encoding="utf-8-sig")
-    print(f"📄 匹配日志已保存至：{log_path}")
+    log_path = os.path.join(output_dir, f"{now}_匹配日志.{log_format}")
+    rows = match_log.write(log_path)
+    print(f"📄 匹配日志（{rows} 条）已保存至：{log_path}")
 
     # 输出匹配成功映射日志
-    mapping_path = os.path.join(OUTPUT_PATH, f"{now}_映射日志.csv")
+    mapping_path = os.path.join(output_dir, f"{now}_映射日志.csv")
     mapping_df.to_csv(mapping_path, index=False, encoding="utf-8-sig")
     print(f"🔗 映射日志已保存至：{mapping_path}")
+    return now
+
+
+# =========================
+# 主执行入口
+# =========================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本期课程 → 下期课程 匹配")
+    add_match_arguments(parser)
+    args = parser.parse_args()
+
+    print("🔍 正在执行课程匹配与日志生成...")
+
+    wait_df, progress_df = load_course_tables(args.wait, args.progress)
+    unmatched_df, match_log, mapping_df = match_courses(
+        progress_df, wait_df, parse_weights(args.weight), args.threshold, args.scorer, args.mode,
+        args.log_level, args.top_k
+    )
+    write_match_outputs(unmatched_df, match_log, mapping_df, args.output, log_format=args.log_format)
@@ -25,6 +25,8 @@ course_file = os.path.join(
 receipt_file = os.path.join(
     ROOT_DIR, "1A_课程行政清单_领款单", "屯門婦聯 - 會員及課程管理系統 - 課程收據.csv"
 )
+# 批量模式的分成规则表（键,模式,数值；键为课程编号或导师姓名）
+split_rules_file = os.path.join(ROOT_DIR, "1A_课程行政清单_领款单", "分成规则.csv")
 
 template_path = os.path.join(ROOT_DIR, "0_模板文件及初始化", "行政清单-模板.docx")
 # print("template_path:", template_path)
@@ -51,8 +53,10 @@ output_dir = os.path.join(ROOT_DIR, "1A_课程行政清单_领款单", "output")
 # 如果 output_dir 文件夹不存在，就自动创建它；如果已存在，也不会报错。
 # os.makedirs(output_dir, exist_ok=True)
 
-# 历史清单文件（将自动生成或追加）
+# 历史清单文件（按需导出；旧文件在首次运行时自动导入历史记录库）
 excel_path = os.path.join(output_dir, "历史清单汇总.xlsx")
+# 历史记录库（SQLite，按教师 / 日期建索引）
+history_db_path = os.path.join(output_dir, "历史清单汇总.sqlite")
 
 # Excel汇入记录模板文件路径（支出賬）
 template_output_spending_actual_path = os.path.join(
@@ -7,13 +7,13 @@ import os
 import re
 import datetime
 import sys
+import argparse
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # 第三方库
 import pandas as pd
-from docxtpl import DocxTemplate
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
+from openpyxl import load_workbook
 
 # ============================================================
 # 路径配置（已根据用户文件结构集中整理）
@@ -28,6 +28,20 @@ sys.path.append(
 )
 
 
+# 共用 CSV 读取模块（仓库根目录 /公共模块）
+sys.path.append(
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")),
+        "公共模块",
+    )
+)
+from receipt_loader import read_export
+from money import parse_money
+from money import to_cents, split_percent, split_units, format_cents, cents_to_yuan
+from docx_cache import get_template
+from history_store import HistoryStore
+from spending_sheet import SPENDING_SHEET, FIRST_DATA_ROW, spending_row, write_rows
+
 # 🔧 引用全局配置文件
 from config_paths import (
     course_file,
@@ -36,56 +50,36 @@ from config_paths import (
     template_lingkuan_path,
     output_dir,
     excel_path,
+    history_db_path,
     template_output_spending_actual_path,
+    split_rules_file,
 )
 
+# 历史清单工作表与字段标题（新增"日期"字段）
+sheet_name = "清单数据"
+excel_fields = [
+    "教师姓名",
+    "课程_课程名称",
+    "课程_课程编号",
+    "分成",
+    "课程总收入",
+    "导师费用",
+    "中心收入",
+    "日期",
+]
 
-# ============================================================
-# 以下为业务处理逻辑
-# ============================================================
-
-try:
-    df_course = pd.read_csv(course_file, encoding="utf-8-sig")
-except Exception as e:
-    print("❌ 课程数据读取失败，请检查文件路径或编码。")
-    raise e
-
-if df_course.empty:
-    raise ValueError("❌ 课程数据为空，无法生成文档。")
-
-row_index = 1 if len(df_course) > 1 else 0
-row = df_course.iloc[row_index]
-
-# ============================================================
-# 读取收据数据（含自动容错）
-# ============================================================
-try:
-    df_receipt = pd.read_csv(receipt_file, encoding="utf-8-sig")
-except Exception as e:
-    print("❌ 收据数据读取失败，请检查文件路径或编码。")
-    raise e
+# 收据"課程名稱"形如「兒童武術班(優惠課程)|(SIC250313)」，括号内为课程编号
+COURSE_CODE_PATTERN = r"\|\(([^()]*)\)\s*$"
+TOTAL_ROW_LABEL = "【總計】"
 
-if df_receipt.empty:
-    print("⚠️ 收据数据为空，将跳过统计逻辑。")
-    df_receipt = pd.DataFrame(columns=["會員類別", "扣減", "總額"])
 
 # ============================================================
-# 一、课程名称与编号
+# 以下为业务处理逻辑
 # ============================================================
-课程名称 = str(row["名稱"]).strip()
-课程编号 = str(row["編號"]).strip()
-课程名称_cleaned = 课程名称.replace(课程编号, "")
-课程名称_cleaned = re.split(r"\|", 课程名称_cleaned)[0].strip()
 
 # ============================================================
-# 二、收费拆分与清洗
+# 一~七、课程行字段（名称、编号、收费、日期、时间、堂数、教师）
 # ============================================================
-收费原文 = str(row["收費"]).strip()
-parts = 收费原文.split("|")
-费用_会员_raw = parts[0] if len(parts) >= 1 else ""
-费用_非会员_raw = parts[1] if len(parts) >= 2 else ""
-
-
 def clean_fee(fee_string):
     fee = re.split(r"\(", fee_string)[0].strip()
     fee = re.sub(r"\.00$", "", fee)
@@ -93,44 +87,6 @@ def clean_fee(fee_string):
     return fee
 
 
-费用_会员 = clean_fee(费用_会员_raw)
-费用_非会员 = clean_fee(费用_非会员_raw)
-
-# ============================================================
-# 三、上课日期转换
-# ============================================================
-上课日期原文 = str(row["上課日期"]).strip()
-if "|" in 上课日期原文:
-    parts = 上课日期原文.split("|")
-    日期_开始 = re.sub(r"\s*\(開始\)", "", parts[0]).strip()
-    日期_结束 = re.sub(r"\s*\(結束\)", "", parts[1]).strip()
-    日期 = f"{日期_开始} 至 {日期_结束}"
-else:
-    日期 = 上课日期原文
-
-# ============================================================
-# 四、上课时间转换
-# ============================================================
-上课时间原文 = str(row["時間"]).strip()
-if "|" in 上课时间原文:
-    parts = 上课时间原文.split("|")
-    start = re.sub(r"\s*\(.*?\)", "", parts[0]).strip()
-    end = re.sub(r"\s*\(.*?\)", "", parts[1]).strip()
-    上课时间 = f"{start} - {end}"
-else:
-    上课时间 = 上课时间原文
-
-# ============================================================
-# 五、逢星期
-# ============================================================
-逢星期 = str(row["逢星期"]).strip()
-
-# ============================================================
-# 六、堂數字段
-# ============================================================
-堂數原文 = str(row["堂數"]).strip()
-
-
 def extract_minutes(text):
     try:
         小時_match = re.search(r"(\d+)\s*小時", text)
@@ -149,299 +105,346 @@ def extract_lessons(text):
         return ""
 
 
-课程时数 = extract_minutes(堂數原文)
-堂数 = extract_lessons(堂數原文)
-
-# ============================================================
-# 七、教师姓名清洗
-# ============================================================
-教師原文 = str(row["導師"]).strip()
-教师姓名 = re.split(r"\|\(", 教師原文)[0].strip() if "|(" in 教師原文 else 教師原文
+def course_fields(row):
+    # 一、课程名称与编号
+    课程名称 = str(row["名稱"]).strip()
+    课程编号 = str(row["編號"]).strip()
+    课程名称_cleaned = 课程名称.replace(课程编号, "")
+    课程名称_cleaned = re.split(r"\|", 课程名称_cleaned)[0].strip()
+
+    # 二、收费拆分与清洗
+    收费原文 = str(row["收費"]).strip()
+    parts = 收费原文.split("|")
+    费用_会员_raw = parts[0] if len(parts) >= 1 else ""
+    费用_非会员_raw = parts[1] if len(parts) >= 2 else ""
+
+    # 三、上课日期转换
+    上课日期原文 = str(row["上課日期"]).strip()
+    if "|" in 上课日期原文:
+        parts = 上课日期原文.split("|")
+        日期_开始 = re.sub(r"\s*\(開始\)", "", parts[0]).strip()
+        日期_结束 = re.sub(r"\s*\(結束\)", "", parts[1]).strip()
+        日期 = f"{日期_开始} 至 {日期_结束}"
+    else:
+        日期 = 上课日期原文
+
+    # 四、上课时间转换
+    上课时间原文 = str(row["時間"]).strip()
+    if "|" in 上课时间原文:
+        parts = 上课时间原文.split("|")
+        start = re.sub(r"\s*\(.*?\)", "", parts[0]).strip()
+        end = re.sub(r"\s*\(.*?\)", "", parts[1]).strip()
+        上课时间 = f"{start} - {end}"
+    else:
+        上课时间 = 上课时间原文
+
+    # 五、逢星期；六、堂數字段
+    堂數原文 = str(row["堂數"]).strip()
+
+    # 七、教师姓名清洗
+    教師原文 = str(row["導師"]).strip()
+    教师姓名 = re.split(r"\|\(", 教師原文)[0].strip() if "|(" in 教師原文 else 教師原文
+
+    return {
+        "课程_课程名称": 课程名称_cleaned,
+        "课程_课程编号": 课程编号,
+        "费用_会员": clean_fee(费用_会员_raw),
+        "费用_非会员": clean_fee(费用_非会员_raw),
+        "日期": 日期,
+        "时间": 上课时间,
+        "逢星期": str(row["逢星期"]).strip(),
+        "课程时数": extract_minutes(堂數原文),
+        "堂数": extract_lessons(堂數原文),
+        "教师姓名": 教师姓名,
+    }
+
+
+# ============================================================
+# 八~十、收据统计：人数、优惠人数、總額校验
+# ============================================================
+def receipt_summary(df_receipt, with_total_row=True):
+    """
+    with_total_row=True：df_receipt 为单一课程的收据导出，最后一行是【總計】，
+    统计时扣除该行，并以其總額校验明细之和。
+    with_total_row=False：批量模式下按课程拆出的明细行（不含总计行），总收入即明细之和。
+    金额均为「分」（int）。
+    """
+    总计行数 = 1 if with_total_row else 0
+
+    # 八、会员/非会员/总人数统计
+    if "會員類別" in df_receipt.columns:
+        原始行数 = len(df_receipt)
+        总人数 = 原始行数 - 总计行数 if 原始行数 > 总计行数 else 0
+        非会员人数值 = (
+            df_receipt["會員類別"].astype(str).str.contains("非會員", regex=False).sum()
+        )
+        会员人数 = 总人数 - 非会员人数值
+        非会员人数 = "N/A" if 非会员人数值 == 0 else 非会员人数值
+    else:
+        总人数 = 0
+        会员人数 = 0
+        非会员人数 = "N/A"
+
+    # 九、优惠人数统计
+    if "扣減" in df_receipt.columns:
+        扣減列 = df_receipt["扣減"].astype(str).tolist()
+        null个数 = sum(1 for x in 扣減列 if x.strip().lower() in ["", "null", "nan"])
+        优惠人数 = len(扣減列) - null个数 - 总计行数 if len(扣減列) > 总计行数 else 0
+    else:
+        优惠人数 = 0
 
-# ============================================================
-# 八、会员/非会员/总人数统计
-# ============================================================
-if "會員類別" in df_receipt.columns:
-    原始行数 = len(df_receipt)
-    总人数 = 原始行数 - 1 if 原始行数 > 1 else 0
-    非会员人数值 = (
-        df_receipt["會員類別"].astype(str).str.contains("非會員", regex=False).sum()
+    # 十、处理總額列并校验
+    # 无法解析的行（表头、空行等）解析为 NaN 后直接剔除；金额一律换算为「分」（int64）再计算
+    总额数据 = (
+        to_cents(parse_money(df_receipt["總額"]).dropna()) if "總額" in df_receipt.columns else []
     )
-    会员人数 = 总人数 - 非会员人数值
-    非会员人数 = "N/A" if 非会员人数值 == 0 else 非会员人数值
-else:
-    总人数 = 0
-    会员人数 = 0
-    非会员人数 = "N/A"
-
-# ============================================================
-# 九、优惠人数统计
-# ============================================================
-if "扣減" in df_receipt.columns:
-    扣減列 = df_receipt["扣減"].astype(str).tolist()
-    null个数 = sum(1 for x in 扣減列 if x.strip().lower() in ["", "null", "nan"])
-    优惠人数 = len(扣減列) - null个数 - 1 if len(扣減列) > 1 else 0
-else:
-    优惠人数 = 0
-
-# ============================================================
-# 十、处理總額列并校验
-# ============================================================
-总额列_raw = (
-    df_receipt["總額"].astype(str).tolist() if "總額" in df_receipt.columns else []
-)
-总额数据 = []
-
-for x in 总额列_raw:
-    x = x.strip()
-    if "總額" in x or x == "":
-        continue
-    x = x.replace("$", "").replace(",", "")
-    try:
-        num = float(x)
-        if num.is_integer():
-            num = int(num)
-        总额数据.append(num)
-    except:
-        continue
-
-if len(总额数据) < 2:
-    raise ValueError("❌ 收据中總額数据不足，无法进行校验。")
 
-每项数据 = 总额数据[:-1]
-总收入 = 总额数据[-1]
+    if len(总额数据) < 1 + 总计行数:
+        raise ValueError("❌ 收据中總額数据不足，无法进行校验。")
 
-if round(sum(每项数据), 2) != round(总收入, 2):
-    raise ValueError(
-        f"❌ 收据总额校验失败：明细总和为 {sum(每项数据)}，但总额为 {总收入}"
-    )
-
-频率统计 = Counter(每项数据)
-表达式_parts = []
-for 金额, 次数 in sorted(频率统计.items()):
-    金额_str = f"${金额}"
-    if 次数 > 1:
-        表达式_parts.append(f"{金额_str}×{次数}")
+    if with_total_row:
+        每项数据 = 总额数据[:-1]
+        总收入 = int(总额数据[-1])
+        if int(每项数据.sum()) != 总收入:
+            raise ValueError(
+                f"❌ 收据总额校验失败：明细总和为 {format_cents(每项数据.sum())}，但总额为 {format_cents(总收入)}"
+            )
     else:
-        表达式_parts.append(f"{金额_str}")
-课程总收入计算 = " + ".join(表达式_parts) + f" = ${总收入}"
-
-# ============================================================
-# 十一、命令行输入分成信息
-# ============================================================
-print("\n📌 分成模式选择：")
-print("模式 1：课程总收入 × 分成百分比")
-print("模式 2：堂数 × 每堂分成费用")
-print("模式 3：学生人数 × 每人分成费用")
-
-模式选择 = input("👉 请选择当前课程的分成模式 (输入1/2/3)：").strip()
-分成结果 = ""
-
-if 模式选择 == "1":
-    百分比值 = float(input("请输入分成百分比(0~100)：").strip())
+        每项数据 = 总额数据
+        总收入 = int(每项数据.sum())
+
+    频率统计 = Counter(每项数据.tolist())
+    表达式_parts = []
+    for 金额, 次数 in sorted(频率统计.items()):
+        金额_str = f"${format_cents(金额)}"
+        if 次数 > 1:
+            表达式_parts.append(f"{金额_str}×{次数}")
+        else:
+            表达式_parts.append(f"{金额_str}")
+    课程总收入计算 = " + ".join(表达式_parts) + f" = ${format_cents(总收入)}"
 
-    # 提取"其他收费"列的最后一项作为"其他收费"金额
+    # "其他收费"：单一课程导出取最后一项（总计行），批量模式取明细之和；无法解析按 0
     if "其他收費" in df_receipt.columns:
-        其他收费列 = df_receipt["其他收費"].dropna().astype(str).tolist()
-        try:
-            最后值 = 其他收费列[-1].replace("$", "").replace(",", "").strip()
-            其他收费值 = float(最后值) if 最后值 else 0
-        except:
-            其他收费值 = 0
+        if with_total_row:
+            其他收费列 = df_receipt["其他收費"].dropna().tolist()
+            其他收费值 = to_cents(其他收费列[-1]) if 其他收费列 else 0
+        else:
+            其他收费值 = int(to_cents(df_receipt["其他收費"]).sum())
     else:
         其他收费值 = 0
 
-    # 格式化金额（整数不带小数点）
-    def format_money(m):
-        return f"{int(m)}" if m == int(m) else f"{m:.2f}"
+    return {
+        "总人数": 总人数,
+        "会员人数": 会员人数,
+        "非会员人数": 非会员人数,
+        "优惠人数": 优惠人数,
+        "总收入": 总收入,
+        "其他收费": 其他收费值,
+        "课程总收入计算": 课程总收入计算,
+    }
+
+
+# ============================================================
+# 十一、分成信息（命令行输入 / 规则表）
+# ============================================================
+def ask_split_rule():
+    """交互模式：命令行输入分成模式与数值"""
+    print("\n📌 分成模式选择：")
+    print("模式 1：课程总收入 × 分成百分比")
+    print("模式 2：堂数 × 每堂分成费用")
+    print("模式 3：学生人数 × 每人分成费用")
+
+    模式选择 = input("👉 请选择当前课程的分成模式 (输入1/2/3)：").strip()
+    if 模式选择 == "1":
+        数值 = float(input("请输入分成百分比(0~100)：").strip())
+    elif 模式选择 == "2":
+        数值 = float(input("请输入每堂分成费用：").strip())
+    elif 模式选择 == "3":
+        数值 = float(input("请输入每人分成费用：").strip())
+    else:
+        raise ValueError("❌ 分成模式输入错误，请输入 1/2/3。")
+    return 模式选择, 数值
+
+
+def load_split_rules(path):
+    """
+    读取分成规则表（CSV：键,模式,数值）。
+    键为课程编号或导师姓名；模式 1 的数值为百分比，模式 2 为每堂费用，模式 3 为每人费用。
+    """
+    df_rules = pd.read_csv(path, dtype=str, encoding="utf-8-sig").fillna("")
+    missing = [c for c in ("键", "模式", "数值") if c not in df_rules.columns]
+    if missing:
+        raise ValueError(f"❌ 分成规则表缺少列：{missing}")
+
+    rules = {}
+    for i, r in df_rules.iterrows():
+        键, 模式 = r["键"].strip(), r["模式"].strip()
+        if not 键:
+            continue
+        if 模式 not in ("1", "2", "3"):
+            raise ValueError(f"❌ 分成规则表第 {i + 2} 行模式错误：{模式}（应为 1/2/3）")
+        rules[键] = (模式, float(r["数值"]))
+    return rules
+
+
+def compute_split(模式选择, 数值, summary, 堂数):
+    """按分成模式计算导师费用与中心收入（金额均为「分」）"""
+    总收入 = summary["总收入"]
+    总人数 = summary["总人数"]
+
+    if 模式选择 == "1":
+        百分比值 = 数值
+        其他收费值 = summary["其他收费"]
+
+        # 格式化金额（整数不带小数点）
+        总收入_fmt = format_cents(总收入)
+        其他收费_fmt = format_cents(其他收费值)
+
+        if 其他收费值 == 0:
+            # 无其他收费
+            分成金额 = split_percent(总收入, 百分比值)
+            分成金额_fmt = format_cents(分成金额)
+            导师费用计算 = f"${总收入_fmt}×{百分比值:.0f}%=${分成金额_fmt}"
+            分成结果 = f"分成模式：總收入 × {百分比值:.0f}% = ${分成金额_fmt}"
+        else:
+            # 有其他收费，先扣除再分成
+            分成金额 = split_percent(总收入 - 其他收费值, 百分比值)
+            分成金额_fmt = format_cents(分成金额)
+            导师费用计算 = (
+                f"(${总收入_fmt}-${其他收费_fmt})×{百分比值:.0f}%=${分成金额_fmt}"
+            )
+            分成结果 = f"分成模式：(${总收入_fmt}-${其他收费_fmt}) × {百分比值:.0f}% = ${分成金额_fmt}"
+
+        分成 = f"{百分比值:.0f}%"
+
+    elif 模式选择 == "2":
+        每堂费用 = to_cents(数值)
+        分成金额 = split_units(每堂费用, float(堂数))
+        每堂费用_str = format_cents(每堂费用)
+        分成金额_str = format_cents(分成金额)
+        分成结果 = f"分成模式：{堂数}堂 × ${每堂费用_str} = ${分成金额_str}"
+        导师费用计算 = f"${每堂费用_str}×{堂数}=${分成金额_str}"
+        分成 = f"${每堂费用_str}/堂"
+    elif 模式选择 == "3":
+        每人费用 = to_cents(数值)
+        分成金额 = split_units(每人费用, 总人数)
+
+        每人费用_str = format_cents(每人费用)
+        分成金额_str = format_cents(分成金额)
+
+        分成结果 = f"分成模式：{总人数}人 × ${每人费用_str} = ${分成金额_str}"
+        导师费用计算 = f"${每人费用_str}×{总人数}=${分成金额_str}"
+        分成 = f"${每人费用_str}/人"
+    else:
+        raise ValueError("❌ 分成模式输入错误，请输入 1/2/3。")
 
-    总收入_fmt = format_money(总收入)
-    其他收费_fmt = format_money(其他收费值)
+    # 以下金额均为「分」（int）
+    中心收入 = 总收入 - 分成金额
+    中心收入_str = format_cents(中心收入)
+    总收入_str = format_cents(总收入)
+    分成金额_str = format_cents(分成金额)
+    中心收入计算 = f"${总收入_str}-${分成金额_str}=${中心收入_str}"
 
-    if 其他收费值 == 0:
-        # 无其他收费
-        分成金额 = round(总收入 * 百分比值 / 100, 2)
-        分成金额_fmt = format_money(分成金额)
-        导师费用计算 = f"${总收入_fmt}×{百分比值:.0f}%=${分成金额_fmt}"
-        分成结果 = f"分成模式：總收入 × {百分比值:.0f}% = ${分成金额_fmt}"
-    else:
-        # 有其他收费，先扣除再分成
-        分成金额 = round((总收入 - 其他收费值) * 百分比值 / 100, 2)
-        分成金额_fmt = format_money(分成金额)
-        导师费用计算 = (
-            f"(${总收入_fmt}-${其他收费_fmt})×{百分比值:.0f}%=${分成金额_fmt}"
-        )
-        分成结果 = f"分成模式：(${总收入_fmt}-${其他收费_fmt}) × {百分比值:.0f}% = ${分成金额_fmt}"
-
-    分成 = f"{百分比值:.0f}%"
-
-elif 模式选择 == "2":
-    每堂费用 = float(input("请输入每堂分成费用：").strip())
-    分成金额 = round(每堂费用 * float(堂数), 2)
-    每堂费用_str = f"{int(每堂费用)}" if 每堂费用.is_integer() else f"{每堂费用:.2f}"
-    分成金额_str = f"{int(分成金额)}" if 分成金额.is_integer() else f"{分成金额:.2f}"
-    分成结果 = f"分成模式：{堂数}堂 × ${每堂费用_str} = ${分成金额_str}"
-    导师费用计算 = f"${每堂费用_str}×{堂数}=${分成金额_str}"
-    分成 = f"${每堂费用_str}/堂"
-elif 模式选择 == "3":
-    每人费用 = float(input("请输入每人分成费用：").strip())
-    分成金额 = round(每人费用 * 总人数, 2)
-
-    每人费用_str = f"{int(每人费用)}" if 每人费用.is_integer() else f"{每人费用:.2f}"
-    分成金额_str = f"{int(分成金额)}" if 分成金额.is_integer() else f"{分成金额:.2f}"
-
-    分成结果 = f"分成模式：{总人数}人 × ${每人费用_str} = ${分成金额_str}"
-    导师费用计算 = f"${每人费用_str}×{总人数}=${分成金额_str}"
-    分成 = f"${每人费用_str}/人"
-else:
-    raise ValueError("❌ 分成模式输入错误，请输入 1/2/3。")
-
-中心收入 = 总收入 - 分成金额
-中心收入_str = f"{int(中心收入)}" if 中心收入.is_integer() else f"{中心收入:.2f}"
-总收入_str = f"{int(总收入)}" if 总收入 == int(总收入) else f"{总收入:.2f}"
-分成金额_str = f"{int(分成金额)}" if 分成金额.is_integer() else f"{分成金额:.2f}"
-中心收入计算 = f"${总收入_str}-${分成金额_str}=${中心收入_str}"
+    return {
+        "分成": 分成,
+        "分成结果": 分成结果,
+        "导师费用计算": 导师费用计算,
+        "分成金额": 分成金额,
+        "中心收入": 中心收入,
+        "中心收入计算": 中心收入计算,
+    }
 
 
 # ============================================================
 # 十二、构造模板上下文
 # ============================================================
-context = {
-    "课程_课程名称": 课程名称_cleaned,
-    "课程_课程编号": 课程编号,
-    "费用_会员": 费用_会员,
-    "费用_非会员": 费用_非会员,
-    "日期": 日期,
-    "时间": 上课时间,
-    "逢星期": 逢星期,
-    "课程时数": 课程时数,
-    "堂数": 堂数,
-    "教师姓名": 教师姓名,
-    "总人数": 总人数,
-    "会员人数": 会员人数,
-    "非会员人数": 非会员人数,
-    "优惠人数": 优惠人数,
-    "课程总收入计算": 课程总收入计算,
-    "分成": 分成结果,
-    "分成": 分成,
-    "导师费用计算": 导师费用计算,
-    # '中心收入计算': f"${总收入}-${分成金额}=${总收入 - 分成金额}",
-    "中心收入计算": 中心收入计算,
-    "制表日期": datetime.datetime.now().strftime("%d/%m/%Y"),
-}
-
-# ============================================================
-# 十三、渲染 Word 模板
-# ============================================================
-try:
-    doc = DocxTemplate(template_path)
-    doc.render(context)
-except Exception as e:
-    print("❌ Word 模板渲染失败，请检查字段命名。")
-    raise e
+def build_context(fields, summary, split):
+    return {
+        "课程_课程名称": fields["课程_课程名称"],
+        "课程_课程编号": fields["课程_课程编号"],
+        "费用_会员": fields["费用_会员"],
+        "费用_非会员": fields["费用_非会员"],
+        "日期": fields["日期"],
+        "时间": fields["时间"],
+        "逢星期": fields["逢星期"],
+        "课程时数": fields["课程时数"],
+        "堂数": fields["堂数"],
+        "教师姓名": fields["教师姓名"],
+        "总人数": summary["总人数"],
+        "会员人数": summary["会员人数"],
+        "非会员人数": summary["非会员人数"],
+        "优惠人数": summary["优惠人数"],
+        "课程总收入计算": summary["课程总收入计算"],
+        "分成": split["分成结果"],
+        "分成": split["分成"],
+        "导师费用计算": split["导师费用计算"],
+        # '中心收入计算': f"${总收入}-${分成金额}=${总收入 - 分成金额}",
+        "中心收入计算": split["中心收入计算"],
+        "制表日期": datetime.datetime.now().strftime("%d/%m/%Y"),
+    }
+
+
+# ============================================================
+# 十三~十四、渲染 Word 模板并输出（批量模式在子进程中执行）
+# ============================================================
+def render_docx(task):
+    # 模板按进程缓存：每个子进程只解析一次模板，之后的课程直接复用
+    template, context, out_path = task
+    get_template(template).render(context, out_path)
+    return out_path
+
+
+def checklist_path(context):
+    return os.path.join(output_dir, f"{context['课程_课程名称']}{context['课程_课程编号']}@行政清单.docx")
+
+
+def print_course_result(output_path, summary, split):
+    print("\n✅ 文件生成成功！")
+    print(f"📄 输出文件：{output_path}")
+    print(
+        f"📊 统计信息：总人数={summary['总人数']} | 会员人数={summary['会员人数']} | "
+        f"非会员人数={summary['非会员人数']} | 优惠人数={summary['优惠人数']}"
+    )
+    print(f"🧾 总额计算表达式：{summary['课程总收入计算']}")
+    print(f"💰 分成结果：{split['分成结果']}")
 
-# ============================================================
-# 十四、输出 Word 文件
-# ============================================================
-output_filename = f"{课程名称_cleaned}{课程编号}@行政清单.docx"
-output_path = os.path.join(output_dir, output_filename)
-doc.save(output_path)
-
-print("\n✅ 文件生成成功！")
-print(f"📄 输出文件：{output_path}")
-print(
-    f"📊 统计信息：总人数={总人数} | 会员人数={会员人数} | 非会员人数={非会员人数} | 优惠人数={优惠人数}"
-)
-print(f"🧾 总额计算表达式：{课程总收入计算}")
-print(f"💰 分成结果：{分成结果}")
 
 # ============================================================
-# 十五、追加数据到"历史清单汇总.xlsx"
+# 十五、追加数据到历史记录库（历史清单汇总.xlsx 按需导出）
 # ============================================================
+def history_row(context, summary, split):
+    # 构造一行数据（同步添加"日期"字段），金额为「分」
+    return [
+        context["教师姓名"],
+        context["课程_课程名称"],
+        context["课程_课程编号"],
+        context["分成"],
+        summary["总收入"],
+        split["分成金额"],
+        split["中心收入"],
+        context["日期"],
+    ]
 
-excel_path = os.path.join(output_dir, "历史清单汇总.xlsx")
-sheet_name = "清单数据"
-
-# 字段标题（新增"日期"字段）
-excel_fields = [
-    "教师姓名",
-    "课程_课程名称",
-    "课程_课程编号",
-    "分成",
-    "课程总收入",
-    "导师费用",
-    "中心收入",
-    "日期",
-]
 
-# 提取数值并格式化（保留两位小数，无$符号）
-总收入_数值 = round(float(总收入), 2)
-分成金额_数值 = round(float(分成金额), 2)
-中心收入_数值 = round(float(中心收入), 2)
-
-# 构造一行数据（同步添加"日期"字段）
-row_data = [
-    教师姓名,
-    context["课程_课程名称"],
-    context["课程_课程编号"],
-    context["分成"],
-    f"{总收入_数值:.2f}",
-    f"{分成金额_数值:.2f}",
-    f"{中心收入_数值:.2f}",
-    context["日期"],
-]
+def open_history():
+    """打开历史记录库；库为空而旧的历史清单汇总.xlsx 存在时先一次性导入"""
+    store = HistoryStore(history_db_path)
+    if store.is_empty() and os.path.exists(excel_path):
+        n = store.import_xlsx(excel_path, sheet_name)
+        if n:
+            print(f"📥 已从 {excel_path} 导入 {n} 行历史记录")
+    return store
 
-# 判断文件是否存在，处理表格
-if os.path.exists(excel_path):
-    wb = load_workbook(excel_path)
-    if sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        if ws.max_row == 1 and ws.max_column == len(excel_fields) - 1:
-            # 如果旧文件缺少"日期"字段，追加一列标题
-            ws.cell(row=1, column=len(excel_fields)).value = "日期"
-    else:
-        ws = wb.create_sheet(sheet_name)
-        ws.append(excel_fields)  # 添加表头
-else:
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name
-    ws.append(excel_fields)  # 添加表头
 
-# 写入数据行
-ws.append(row_data)
-wb.save(excel_path)
+def export_history(path=excel_path):
+    with open_history() as store:
+        n = store.export_xlsx(path, sheet_name, excel_fields)
+    print(f"📚 已导出 {n} 行历史清单汇总：{path}")
 
-print(f"📚 已追加数据至历史清单汇总：{excel_path}")
 
 # ============================================================
 # 十六、根据历史数据生成该教师的领款单（Word 模板注入）
 # ============================================================
-
-# 读取历史清单数据
-try:
-    wb = load_workbook(excel_path)
-    ws = wb[sheet_name]
-except Exception as e:
-    print("❌ 无法读取历史清单汇总，请检查 Excel 文件格式。")
-    raise e
-
-# 提取所有教师匹配的数据行（包括本次写入的数据）
-rows = list(ws.iter_rows(min_row=2, values_only=True))
-matched_rows = [r for r in rows if r[0] == 教师姓名]
-
-if not matched_rows:
-    raise ValueError(f"❌ 历史数据中未找到教师 {教师姓名} 的记录，无法生成领款单。")
-
-# 构建"項目名字&編號"字段（多项换行）
-项目名字编号列表 = [f"{row[1]}({row[2]})" for row in matched_rows]
-项目名字编号_str = "\n".join(项目名字编号列表)
-
-# 计算"項目金額"字段（导师费用总和）
-导师费用总和 = sum([float(row[5]) for row in matched_rows])
-项目金额_str = f"${导师费用总和:.2f}"
-
-
 # 金额转换为中文大写（参考VBA逻辑）
 def convert_to_chinese_currency(num):
     digits = "零壹貳叁肆伍陸柒捌玖"
@@ -491,93 +494,73 @@ def convert_to_chinese_currency(num):
     return result
 
 
-中文大写金额 = convert_to_chinese_currency(导师费用总和)
+def lingkuan_context(教师姓名, store):
+    # 按教师索引查询全部记录（包括本次写入的数据）：[(课程名称, 课程编号, 导师费用_分), ...]
+    matched_rows = store.teacher_items(教师姓名)
 
-# 生成日期相关字段
-today = datetime.datetime.today()
-day = today.day
-month = today.month
-year = today.year
+    if not matched_rows:
+        raise ValueError(f"❌ 历史数据中未找到教师 {教师姓名} 的记录，无法生成领款单。")
 
-if day <= 15:
-    领款日期 = f"15/{month}/{year}"
-    待输入月份 = month
-    期 = "2"
-else:
-    if month == 12:
-        next_month = 1
-        next_year = year + 1
+    # 构建"項目名字&編號"字段（多项换行）
+    项目名字编号列表 = [f"{row[0]}({row[1]})" for row in matched_rows]
+    项目名字编号_str = "\n".join(项目名字编号列表)
+
+    # 计算"項目金額"字段（导师费用总和，按分精确相加）
+    导师费用总和 = sum(row[2] for row in matched_rows)
+    项目金额_str = f"${format_cents(导师费用总和, fixed=True)}"
+
+    中文大写金额 = convert_to_chinese_currency(cents_to_yuan(导师费用总和))
+
+    # 生成日期相关字段
+    today = datetime.datetime.today()
+    day = today.day
+    month = today.month
+    year = today.year
+
+    if day <= 15:
+        领款日期 = f"15/{month}/{year}"
+        待输入月份 = month
+        期 = "2"
     else:
-        next_month = month + 1
-        next_year = year
-    领款日期 = f"1/{next_month}/{next_year}"
-    待输入月份 = next_month
-    期 = "1"
-
-m1 = str(待输入月份 // 10)
-m2 = str(待输入月份 % 10)
-
-# 构建模板上下文
-context_lingkuan = {
-    "领款日期": 领款日期,
-    "m1": m1,
-    "m2": m2,
-    "期": 期,
-    "抬头": 教师姓名,
-    "项目名字编号": 项目名字编号_str,
-    "项目金额": 项目金额_str,
-    "港币圆数大写": 中文大写金额,
-}
-
-# 渲染模板文件
-# template_lingkuan_path = "领款单-模板.docx"
-output_lingkuan_path = os.path.join(output_dir, f"{教师姓名}-领款单.docx")
-
-try:
-    doc_lingkuan = DocxTemplate(template_lingkuan_path)
-    doc_lingkuan.render(context_lingkuan)
-    doc_lingkuan.save(output_lingkuan_path)
-except Exception as e:
-    print("❌ 领款单模板渲染失败，请检查模板字段是否一致。")
-    raise e
-
-print(f"📄 已生成教师领款单：{output_lingkuan_path}")
-# ============================================================
-# 十七、根据"历史清单汇总.xlsx"生成"支出賬"Excel汇入记录
-# ============================================================
+        if month == 12:
+            next_month = 1
+            next_year = year + 1
+        else:
+            next_month = month + 1
+            next_year = year
+        领款日期 = f"1/{next_month}/{next_year}"
+        待输入月份 = next_month
+        期 = "1"
 
-# 使用在文件顶部已定义的路径变量
-summary_path = excel_path
-template_output_path = template_output_spending_actual_path
-target_sheet = "支出賬"
+    m1 = str(待输入月份 // 10)
+    m2 = str(待输入月份 % 10)
 
-if os.path.exists(summary_path) and os.path.exists(template_output_path):
-    df_summary = pd.read_excel(summary_path, sheet_name="清单数据")
-    grouped = {}
+    # 构建模板上下文
+    return {
+        "领款日期": 领款日期,
+        "m1": m1,
+        "m2": m2,
+        "期": 期,
+        "抬头": 教师姓名,
+        "项目名字编号": 项目名字编号_str,
+        "项目金额": 项目金额_str,
+        "港币圆数大写": 中文大写金额,
+    }
 
-    def parse_date_range(date_str):
-        try:
-            parts = date_str.split("至")
-            start = datetime.datetime.strptime(parts[0].strip(), "%Y-%m-%d")
-            end = datetime.datetime.strptime(parts[1].strip(), "%Y-%m-%d")
-            return start, end
-        except:
-            return None, None
-
-    for _, row in df_summary.iterrows():
-        name = row["教师姓名"]
-        if name not in grouped:
-            grouped[name] = {
-                "教师姓名": name,
-                "课程名称": [],
-                "课程编号": [],
-                "导师费用": 0,
-                "日期范围": [],
-            }
-        grouped[name]["课程名称"].append(row["课程_课程名称"])
-        grouped[name]["课程编号"].append(row["课程_课程编号"])
-        grouped[name]["导师费用"] += float(row["导师费用"])
-        grouped[name]["日期范围"].append(parse_date_range(row["日期"]))
+
+def lingkuan_path(教师姓名):
+    return os.path.join(output_dir, f"{教师姓名}-领款单.docx")
+
+
+# ============================================================
+# 十七、根据历史记录生成"支出賬"Excel汇入记录
+# ============================================================
+def write_spending(store):
+    """返回是否写入；缺少模板文件时跳过"""
+    template_output_path = template_output_spending_actual_path
+
+    if not os.path.exists(template_output_path):
+        return False
 
     today = datetime.datetime.today()
     if today.day <= 15:
@@ -589,52 +572,225 @@ if os.path.exists(summary_path) and os.path.exists(template_output_path):
             f_column = f"{today.year}-{today.month + 1:02d}-01"
     i_column = today.strftime("%Y-%m-%d")
 
-    data_rows = []
-    counter = 1
-    for name, info in grouped.items():
-        date_ranges = [r for r in info["日期范围"] if r[0] and r[1]]
-        if date_ranges:
-            start = min(r[0] for r in date_ranges)
-            end = max(r[1] for r in date_ranges)
-            date_range_str = (
-                f"{start.strftime('%Y-%m-%d')} 至 {end.strftime('%Y-%m-%d')}"
-            )
-        else:
-            date_range_str = ""
-
-        data_rows.append(
-            [
-                counter,
-                "T005",
-                "山景-SK",
-                "---",
-                "---",
-                f_column,
-                "C029",
-                "導師費",
-                i_column,
-                "/".join(info["课程名称"]),
-                round(info["导师费用"], 2),
-                "否",
-                "否",
-                name,
-                "/".join(info["课程编号"]),
-                date_range_str,
-            ]
+    # 按教师分组汇总（SQL GROUP BY，教师按首次出现顺序），每位教师一行
+    data_rows = [
+        spending_row(
+            counter,
+            f_column,
+            "C029",
+            "導師費",
+            i_column,
+            课程名称,
+            cents_to_yuan(导师费用),
+            name,
+            课程编号,
+            f"{start} 至 {end}" if start and end else "",
         )
-        counter += 1
+        for counter, (name, 课程名称, 课程编号, 导师费用, start, end) in enumerate(store.spending_groups(), start=1)
+    ]
 
     wb_out = load_workbook(template_output_path)
-    ws_out = wb_out[target_sheet]
-
-    start_row = 9
-    for i, row in enumerate(data_rows):
-        for j, value in enumerate(row):
-            col_letter = get_column_letter(j + 1)
-            ws_out[f"{col_letter}{start_row + i}"] = value
-
+    ws_out = wb_out[SPENDING_SHEET]
+    write_rows(ws_out, FIRST_DATA_ROW, data_rows)
     wb_out.save(template_output_path)
     print(f"📥 已成功写入支出賬表格：{template_output_path}")
-    input("\n按 Enter 键退出...")
-else:
-    print("⚠️ 缺少历史清单或模板文件，已跳过支出賬写入。")
+    return True
+
+
+# ============================================================
+# 交互模式：处理单一课程（课程导出中的一行 + 该课程的收据导出）
+# ============================================================
+def main():
+    try:
+        df_course = read_export(course_file, kind="課程")
+    except Exception as e:
+        print("❌ 课程数据读取失败，请检查文件路径或编码。")
+        raise e
+
+    if df_course.empty:
+        raise ValueError("❌ 课程数据为空，无法生成文档。")
+
+    row_index = 1 if len(df_course) > 1 else 0
+    row = df_course.iloc[row_index]
+
+    # 读取收据数据（含自动容错）
+    try:
+        df_receipt = read_export(receipt_file, kind="課程收據", parse_money_cols=False)
+    except Exception as e:
+        print("❌ 收据数据读取失败，请检查文件路径或编码。")
+        raise e
+
+    if df_receipt.empty:
+        print("⚠️ 收据数据为空，将跳过统计逻辑。")
+        df_receipt = pd.DataFrame(columns=["會員類別", "扣減", "總額"])
+
+    fields = course_fields(row)
+    summary = receipt_summary(df_receipt)
+    模式选择, 数值 = ask_split_rule()
+    split = compute_split(模式选择, 数值, summary, fields["堂数"])
+    context = build_context(fields, summary, split)
+
+    output_path = checklist_path(context)
+    try:
+        render_docx((template_path, context, output_path))
+    except Exception as e:
+        print("❌ Word 模板渲染失败，请检查字段命名。")
+        raise e
+    print_course_result(output_path, summary, split)
+
+    with open_history() as store:
+        store.append([history_row(context, summary, split)])
+        print(f"📚 已追加数据至历史记录：{history_db_path}")
+
+        教师姓名 = fields["教师姓名"]
+        output_lingkuan_path = lingkuan_path(教师姓名)
+        try:
+            render_docx((template_lingkuan_path, lingkuan_context(教师姓名, store), output_lingkuan_path))
+        except Exception as e:
+            print("❌ 领款单模板渲染失败，请检查模板字段是否一致。")
+            raise e
+        print(f"📄 已生成教师领款单：{output_lingkuan_path}")
+
+        written = write_spending(store)
+
+    if written:
+        input("\n按 Enter 键退出...")
+    else:
+        print("⚠️ 缺少支出賬模板文件，已跳过支出賬写入。")
+
+
+# ============================================================
+# 批量模式：一次读取全部课程与收据，按规则表处理每一门课程
+# ============================================================
+def split_receipts_by_course(df_receipt):
+    """拆出【總計】行并按课程编号分组；返回 ({编号: 明细行}, 明细总额_分, 总计行總額_分或 None)"""
+    名称列 = df_receipt["課程名稱"].astype(str).str.strip()
+    is_total = 名称列 == TOTAL_ROW_LABEL
+    body = df_receipt[~is_total]
+    总计 = to_cents(df_receipt.loc[is_total, "總額"])
+    codes = body["課程名稱"].astype(str).str.extract(COURSE_CODE_PATTERN)[0].str.strip()
+    groups = {code: part for code, part in body.groupby(codes, sort=False)}
+    return groups, int(to_cents(body["總額"]).sum()), (int(总计[-1]) if len(总计) else None)
+
+
+def run_pool(tasks, workers, label):
+    """并行渲染 docx；返回成功的 (task_key, out_path) 列表，失败逐项报告"""
+    done = []
+    if not tasks:
+        return done
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_docx, task): key for key, task in tasks}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                done.append((key, future.result()))
+            except Exception as e:
+                print(f"❌ {label}渲染失败：{key}（{e}）")
+    return done
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        description="行政清单批量模式：一次读取课程与收据导出，按分成规则表为每门课程生成行政清单与领款单",
+        epilog="示例：python 生成行政清单-领款单.py --batch\n"
+               "      python 生成行政清单-领款单.py --rules 分成规则.csv --only SIC250313 SIC260007\n"
+               "      python 生成行政清单-领款单.py --export-history\n"
+               "分成规则表（CSV）列：键,模式,数值；键为课程编号或导师姓名（编号优先），\n"
+               "模式 1 数值为百分比，模式 2 为每堂费用，模式 3 为每人费用。",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--batch", action="store_true", help="使用默认路径运行批量模式")
+    parser.add_argument("--rules", default=split_rules_file, help=f"分成规则表（默认：{split_rules_file}）")
+    parser.add_argument("--only", nargs="+", metavar="课程编号", help="只处理指定课程")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认：CPU 核数）")
+    parser.add_argument("--export-history", nargs="?", const=excel_path, metavar="XLSX",
+                        help=f"只把历史记录导出为 Excel 后退出（默认：{excel_path}）")
+    args = parser.parse_args(argv)
+
+    if args.export_history:
+        export_history(args.export_history)
+        return
+
+    if not os.path.exists(args.rules):
+        print(f"❌ 找不到分成规则表：{args.rules}")
+        sys.exit(1)
+    rules = load_split_rules(args.rules)
+
+    # ===== 只读一次 CSV =====
+    df_course = read_export(course_file, kind="課程")
+    df_receipt = read_export(receipt_file, kind="課程收據", parse_money_cols=False)
+    groups, 明细总额, 导出总额 = split_receipts_by_course(df_receipt)
+    if 导出总额 is not None and 明细总额 != 导出总额:
+        print(f"⚠️ 收据明细总和 ${format_cents(明细总额)} 与【總計】${format_cents(导出总额)} 不一致，"
+              "各课程总收入按明细计算。")
+
+    # ===== 逐门课程计算（主进程，轻量）=====
+    courses, 无收据, 无规则 = [], [], []
+    only = set(args.only) if args.only else None
+    for _, row in df_course.iterrows():
+        fields = course_fields(row)
+        编号 = fields["课程_课程编号"]
+        if only is not None and 编号 not in only:
+            continue
+        part = groups.get(编号)
+        if part is None:
+            无收据.append(编号)
+            continue
+        rule = rules.get(编号) or rules.get(fields["教师姓名"])
+        if rule is None:
+            无规则.append(编号)
+            continue
+        try:
+            summary = receipt_summary(part, with_total_row=False)
+            split = compute_split(rule[0], rule[1], summary, fields["堂数"])
+        except Exception as e:
+            print(f"❌ {编号} 计算失败：{e}")
+            continue
+        context = build_context(fields, summary, split)
+        courses.append((编号, context, summary, split))
+
+    if 无收据:
+        print(f"ℹ️ {len(无收据)} 门课程没有收据，已跳过。")
+    if 无规则:
+        print(f"⚠️ {len(无规则)} 门课程在分成规则表中没有匹配（编号/导师）：{', '.join(无规则)}")
+    if not courses:
+        print("⚠️ 没有可处理的课程，未生成任何文件。")
+        return
+
+    # ===== 并行渲染行政清单 =====
+    print(f"\n🚀 共 {len(courses)} 门课程，开始并行生成行政清单 ...")
+    tasks = [(编号, (template_path, context, checklist_path(context))) for 编号, context, _, _ in courses]
+    rendered = dict(run_pool(tasks, args.workers, "行政清单"))
+    for 编号, context, summary, split in courses:
+        if 编号 in rendered:
+            print_course_result(rendered[编号], summary, split)
+
+    # ===== 历史记录：一个事务写入本批全部行 =====
+    ok = [(编号, context, summary, split) for 编号, context, summary, split in courses if 编号 in rendered]
+    if not ok:
+        print("❌ 所有行政清单均渲染失败。")
+        sys.exit(1)
+    with open_history() as store:
+        store.append([history_row(context, summary, split) for _, context, summary, split in ok])
+        print(f"\n📚 已追加 {len(ok)} 行至历史记录：{history_db_path}")
+
+        # ===== 并行渲染本批涉及教师的领款单 =====
+        teachers = list(dict.fromkeys(context["教师姓名"] for _, context, _, _ in ok))
+        tasks = [(name, (template_lingkuan_path, lingkuan_context(name, store), lingkuan_path(name))) for name in teachers]
+        for name, path in run_pool(tasks, args.workers, "领款单"):
+            print(f"📄 已生成教师领款单：{path}")
+
+        if not write_spending(store):
+            print("⚠️ 缺少支出賬模板文件，已跳过支出賬写入。")
+
+    failed = len(courses) - len(ok)
+    if failed:
+        print(f"❌ {failed} 门课程行政清单生成失败")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        batch_main(sys.argv[1:])
+    else:
+        main()
@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
+import math
 import os
 import sys
 import shutil
 import datetime
 import re
-import fitz  # PyMuPDF
-from PyPDF2 import PdfReader
-from docxtpl import DocxTemplate
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from openpyxl import load_workbook
 
 # ============================================================
@@ -21,6 +22,21 @@ ROOT_DIR = os.path.dirname(BASE_DIR)
 CONFIG_DIR = os.path.join(ROOT_DIR, "0_模板文件及初始化")
 sys.path.append(CONFIG_DIR)
 
+# 共用金额解析（仓库根目录 /公共模块）
+sys.path.append(os.path.join(os.path.dirname(ROOT_DIR), "公共模块"))
+from money import parse_money_text, to_cents, format_cents, cents_to_yuan
+from docx_cache import render_docx
+from pdf_text import PdfText, file_sha256
+from invoice_index import InvoiceIndex
+from spending_sheet import (
+    SPENDING_SHEET,
+    DATE_FORMAT,
+    EFFECTIVE_DATE_COLUMN,
+    spending_row,
+    find_append_row,
+    write_rows,
+)
+
 # 输入文件夹
 INPUT_DIR_PRINT = os.path.join(BASE_DIR, "此处放入打印费文件")
 INPUT_DIR_NET = os.path.join(BASE_DIR, "此处放入上网费文件")
@@ -29,10 +45,17 @@ INPUT_DIR_FB = os.path.join(BASE_DIR, "此处放入FaceBook宣传费文件")
 # 输出文件夹
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 
+# 发票每页文本缓存（按 PDF 内容的 SHA-256 命名，重复处理同一文件时不再重新提取）
+PAGE_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "页面文本")
+
 # 已处理归档文件夹
 ARCHIVE_DIR_ROOT = os.path.join(BASE_DIR, "已处理文件")
 today_str = datetime.datetime.now().strftime("%Y%m%d")
 ARCHIVE_DIR_TODAY = os.path.join(ARCHIVE_DIR_ROOT, today_str)
+# 发票号与已入账发票相同的 PDF 归档到当天归档目录下的这个子文件夹
+DUPLICATE_SUBDIR = "重复发票"
+# 已处理发票索引（SHA-256 → 发票号、领款单文件名），防止同一发票重复入账
+INDEX_PATH = os.path.join(ARCHIVE_DIR_ROOT, "已处理发票.sqlite")
 
 # 模板文件路径
 TEMPLATE_HP = os.path.join(CONFIG_DIR, "HP Inc Hong Kong Limited.docx")
@@ -42,6 +65,13 @@ TEMPLATE_FB = os.path.join(CONFIG_DIR, "Knight Creative Limited模板.docx")
 # Excel 记账文件路径
 EXCEL_PATH = os.path.join(ROOT_DIR, "2_Excel滙入記錄模板-支出賬文件", "屯門婦聯 - 會計及財務記賬系統-Excel滙入記錄模板-支出賬.xlsx")
 
+# 支出賬各类型的科目编号、科目名称、收款人
+SPENDING_ACCOUNTS = {
+    "PRINT": ("C021", "印刷", "HP Inc Hong Kong Limited"),
+    "NET": ("C025", "電話及互聯網費", "Information Technology Resource Centre"),
+    "FB": ("C013", "廣告及推廣", "Knight Creative Limited"),
+}
+
 # 确保输出目录存在
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -143,33 +173,40 @@ def get_date_logic():
         "run_date": today # 脚本运行日期
     }
 
-def move_file_to_archive(file_path):
-    """处理完成后将文件移动到归档目录"""
-    if not os.path.exists(ARCHIVE_DIR_TODAY):
-        os.makedirs(ARCHIVE_DIR_TODAY)
-    filename = os.path.basename(file_path)
-    shutil.move(file_path, os.path.join(ARCHIVE_DIR_TODAY, filename))
-    print(f"📦 文件已归档至: {os.path.join(ARCHIVE_DIR_TODAY, filename)}")
+def move_file_to_archive(file_path, subdir=""):
+    """处理完成后将文件移动到归档目录（subdir 为归档目录下的子文件夹），返回归档后的路径"""
+    archive_dir = os.path.join(ARCHIVE_DIR_TODAY, subdir)
+    if not os.path.exists(archive_dir):
+        os.makedirs(archive_dir)
+    archived = os.path.join(archive_dir, os.path.basename(file_path))
+    shutil.move(file_path, archived)
+    print(f"📦 文件已归档至: {archived}")
+    return archived
 
 # ============================================================
-# 📄 PDF 解析逻辑 (打印费/网费 - PyPDF2)
+# 📄 PDF 解析逻辑 (打印费/网费)
+# 逐页匹配，三个字段都找到后即停止，不再提取余下页面
 # ============================================================
 def process_print_file(pdf_path):
     """处理打印费 PDF"""
-    reader = PdfReader(pdf_path)
-    text = "".join(page.extract_text() for page in reader.pages)
+    with PdfText(pdf_path, PAGE_CACHE_DIR) as pdf:
+        found = pdf.search({
+            "invoice": r"Invoice Number\s+(\d+)",
+            "amount": r"Total Amount\s+([0-9]+\.[0-9]{2})",
+            # 格式: 29 May 2025 - 28 Jun 2025 -> 取结束日期的月份
+            "period": r"Clicks Charge Period\s+([0-9]{2} \w{3} [0-9]{4})\s*-\s*([0-9]{2} \w{3} [0-9]{4})",
+        })
 
     # 提取 Invoice Number
-    inv_match = re.search(r"Invoice Number\s+(\d+)", text)
+    inv_match = found["invoice"]
     invoice_no = inv_match.group(1) if inv_match else "Unknown"
 
     # 提取 Total Amount
-    amt_match = re.search(r"Total Amount\s+([0-9]+\.[0-9]{2})", text)
-    amount = float(amt_match.group(1)) if amt_match else 0.0
+    amt_match = found["amount"]
+    amount = to_cents(amt_match.group(1)) if amt_match else 0   # 分
 
     # 提取 Clicks Charge Period (用于项目名称)
-    # 格式: 29 May 2025 - 28 Jun 2025 -> 取结束日期的月份
-    date_match = re.search(r"Clicks Charge Period\s+([0-9]{2} \w{3} [0-9]{4})\s*-\s*([0-9]{2} \w{3} [0-9]{4})", text)
+    date_match = found["period"]
     
     month_str, year_str = "", ""
     if date_match:
@@ -195,8 +232,8 @@ def process_print_file(pdf_path):
         "m2": date_info["m2"],
         "期": date_info["period"],
         "项目名字编号": project_name,
-        "项目金额": f"${amount:.2f}",
-        "港币圆数大写": convert_to_chinese_currency(amount)
+        "项目金额": f"${format_cents(amount, fixed=True)}",
+        "港币圆数大写": convert_to_chinese_currency(cents_to_yuan(amount))
     }
 
     # Excel 数据包
@@ -205,7 +242,7 @@ def process_print_file(pdf_path):
         "effective_date": date_info["excel_effective_date"],
         "run_date": date_info["run_date"],
         "desc": excel_desc,
-        "amount": amount,
+        "amount_cents": amount,
         "invoice_no": invoice_no
     }
 
@@ -213,15 +250,18 @@ def process_print_file(pdf_path):
 
 def process_net_file(pdf_path):
     """处理上网费 PDF"""
-    reader = PdfReader(pdf_path)
-    text = "".join(page.extract_text() for page in reader.pages)
+    with PdfText(pdf_path, PAGE_CACHE_DIR) as pdf:
+        found = pdf.search({
+            "invoice": r"INVOICE NO\.\s*:\s*(\d+)",
+            "date": r"INVOICE DATE\s*:\s*(\d{2})/(\d{2})/(\d{4})",
+        })
 
     # 提取 Invoice No
-    inv_match = re.search(r"INVOICE NO\.\s*:\s*(\d+)", text)
+    inv_match = found["invoice"]
     invoice_no = inv_match.group(1) if inv_match else "Unknown"
 
     # 提取 Invoice Date
-    date_match = re.search(r"INVOICE DATE\s*:\s*(\d{2})/(\d{2})/(\d{4})", text)
+    date_match = found["date"]
     if date_match:
         month = int(date_match.group(2))
         year = int(date_match.group(3))
@@ -248,41 +288,30 @@ def process_net_file(pdf_path):
         "effective_date": date_info["excel_effective_date"],
         "run_date": date_info["run_date"],
         "desc": excel_desc,
-        "amount": 478.00, # 固定金额
+        "amount_cents": 47800, # 固定金额 $478.00
         "invoice_no": invoice_no
     }
 
     return context, excel_data, TEMPLATE_NET, f"{year}年{month}月网费领款单.docx"
 
 # ============================================================
-# 📘 PDF 解析逻辑 (Facebook - PyMuPDF/Fitz)
+# 📘 PDF 解析逻辑 (Facebook)
 # ============================================================
 def process_fb_file(pdf_path):
     """处理 Facebook PDF (精确提取目标页面的日期和金额)"""
-    doc = fitz.open(pdf_path)
-    target_page = None
     invoice_number = None
     hkd_amount = None
     target_date = None # 用于存储提取到的日期对象
 
     # 1. 🔍 定位“山景服務處”页面
-    # 只有包含该关键词的页面才会被处理，避免混淆其他分中心的日期/价格
-    for page in doc:
-        text = page.get_text()
-        if "山景服務處" in text:
-            target_page = page
-            break
-    
-    if not target_page:
-        raise ValueError("❌ 未找到 '山景服務處' 页面")
+    # 只有包含该关键词的页面才会被处理，避免混淆其他分中心的日期/价格；找到后不再读取后续页面
+    with PdfText(pdf_path, PAGE_CACHE_DIR) as pdf:
+        target_page = pdf.find_page("山景服務處")
+        if target_page is None:
+            raise ValueError("❌ 未找到 '山景服務處' 页面")
 
-    # 提取目标页面的所有文本行
-    lines = []
-    blocks = target_page.get_text("dict")["blocks"]
-    for b in blocks:
-        for line in b.get("lines", []):
-            line_text = " ".join(span["text"].strip() for span in line["spans"])
-            lines.append(line_text.strip())
+        # 提取目标页面的所有文本行
+        lines = pdf.page_lines(target_page)
 
     # 2. 💰 提取金额 (Balance Due -> HKD...)
     balance_indices = [i for i, l in enumerate(lines) if l == "Balance Due"]
@@ -296,8 +325,10 @@ def process_fb_file(pdf_path):
     if not hkd_amount:
         raise ValueError("❌ 未找到金额 (Balance Due)")
     
-    amount_clean = hkd_amount.replace("HKD", "").replace(",", "").strip()
-    amount_float = float(amount_clean)
+    if math.isnan(parse_money_text(hkd_amount)):
+        raise ValueError(f"❌ 金额无法解析：{hkd_amount}")
+    amount_cents = to_cents(hkd_amount)
+    amount_float = cents_to_yuan(amount_cents)
 
     # 3. 🔢 提取发票编号 (# INV-...)
     for line in lines:
@@ -363,7 +394,7 @@ def process_fb_file(pdf_path):
         "effective_date": date_info["excel_effective_date"],
         "run_date": date_info["run_date"],
         "desc": excel_desc,
-        "amount": amount_float,
+        "amount_cents": amount_cents,
         "invoice_no": project_id
     }
 
@@ -372,150 +403,276 @@ def process_fb_file(pdf_path):
 # 📊 Excel 写入逻辑
 # ============================================================
 def append_to_excel(data_list):
+    """一次写入全部记录；返回是否已保存（调用方据此决定是否归档 PDF）"""
     if not data_list:
-        return
+        return False
 
     if not os.path.exists(EXCEL_PATH):
         print(f"❌ Excel 文件不存在: {EXCEL_PATH}")
-        return
+        return False
 
     print(f"🔄 正在写入 Excel ({len(data_list)} 条记录)...")
     wb = load_workbook(EXCEL_PATH)
-    ws = wb["支出賬"]
+    ws = wb[SPENDING_SHEET]
 
-    # 寻找第9行开始的第一个空行
-    start_row = 9
-    current_row = start_row
-    
-    # 简单的寻找最大序号逻辑
-    max_seq = 0
-    
-    # 遍历寻找空行同时记录最大序号
-    while ws[f"A{current_row}"].value is not None:
-        val = ws[f"A{current_row}"].value
-        if isinstance(val, int):
-            if val > max_seq:
-                max_seq = val
-        current_row += 1
-    
+    # 第9行起一次读出 A 列：第一个空行 + 已有最大序号
+    current_row, max_seq = find_append_row(ws)
+
+    rows = []
     for data in data_list:
         max_seq += 1
-        r = current_row
-        
-        # 提取通用数据
-        eff_date = data["effective_date"] # datetime object
-        run_date_str = data["run_date"].strftime("%Y-%m-%d")
-        
-        # 写入通用列
-        ws[f"A{r}"] = max_seq          # 序号
-        ws[f"B{r}"] = "T005"           # 固定
-        ws[f"C{r}"] = "山景-SK"        # 固定
-        ws[f"D{r}"] = "---"
-        ws[f"E{r}"] = "---"
-        ws[f"F{r}"] = eff_date         # 生效日期 (Excel会处理datetime)
-        ws[f"F{r}"].number_format = 'yyyy-mm-dd'
-        
-        ws[f"I{r}"] = run_date_str     # 录入日期
-        ws[f"L{r}"] = "否"
-        ws[f"M{r}"] = "否"
-
-        # 写入特定列
-        d_type = data["type"]
-        
-        if d_type == "PRINT":
-            ws[f"G{r}"] = "C021"
-            ws[f"H{r}"] = "印刷"
-            ws[f"J{r}"] = data["desc"]
-            ws[f"K{r}"] = data["amount"]
-            ws[f"N{r}"] = "HP Inc Hong Kong Limited"
-            ws[f"O{r}"] = data["invoice_no"]
-            
-        elif d_type == "NET":
-            ws[f"G{r}"] = "C025"
-            ws[f"H{r}"] = "電話及互聯網費"
-            ws[f"J{r}"] = data["desc"]
-            ws[f"K{r}"] = data["amount"] # 478
-            ws[f"N{r}"] = "Information Technology Resource Centre"
-            ws[f"O{r}"] = data["invoice_no"]
-            
-        elif d_type == "FB":
-            ws[f"G{r}"] = "C013"
-            ws[f"H{r}"] = "廣告及推廣"
-            ws[f"J{r}"] = data["desc"]
-            ws[f"K{r}"] = data["amount"]
-            ws[f"N{r}"] = "Knight Creative Limited"
-            ws[f"O{r}"] = data["invoice_no"]
-
-        current_row += 1
+        account, account_name, payee = SPENDING_ACCOUNTS[data["type"]]
+        rows.append(
+            spending_row(
+                max_seq,
+                data["effective_date"],                 # 生效日期 (datetime，Excel会处理)
+                account,
+                account_name,
+                data["run_date"].strftime("%Y-%m-%d"),  # 录入日期
+                data["desc"],
+                cents_to_yuan(data["amount_cents"]),
+                payee,
+                data["invoice_no"],
+            )
+        )
+
+    write_rows(ws, current_row, rows, {EFFECTIVE_DATE_COLUMN: DATE_FORMAT})
 
     wb.save(EXCEL_PATH)
     print("✅ Excel 写入完成。")
+    return True
 
 # ============================================================
-# 🚀 主程序
+# 🧵 流水线：发现 PDF → 并行解析 → 并行渲染 → 一次写入 Excel → 归档
 # ============================================================
-def main():
-    excel_queue = []
-
-    # 1. 扫描 打印费
-    if os.path.exists(INPUT_DIR_PRINT):
-        for f in os.listdir(INPUT_DIR_PRINT):
+# 类型: (输入文件夹, 图标, 名称, 解析函数)
+INVOICE_TYPES = {
+    "PRINT": (INPUT_DIR_PRINT, "🖨️", "打印费", process_print_file),
+    "NET": (INPUT_DIR_NET, "🌐", "上网费", process_net_file),
+    "FB": (INPUT_DIR_FB, "📘", "FB 宣传费", process_fb_file),
+}
+
+
+def discover_invoices():
+    """1. 扫描三个输入文件夹，返回 [(类型, PDF 路径)]，按类型、文件名排序"""
+    tasks = []
+    for kind, (folder, _, _, _) in INVOICE_TYPES.items():
+        if not os.path.exists(folder):
+            continue
+        for f in sorted(os.listdir(folder)):
             if f.lower().endswith(".pdf"):
-                f_path = os.path.join(INPUT_DIR_PRINT, f)
-                try:
-                    print(f"🖨️ 正在处理打印费: {f}")
-                    ctx, xls_data, tpl_path, out_name = process_print_file(f_path)
-                    
-                    doc = DocxTemplate(tpl_path)
-                    doc.render(ctx)
-                    doc.save(os.path.join(OUTPUT_DIR, out_name))
-                    
-                    excel_queue.append(xls_data)
-                    move_file_to_archive(f_path)
-                except Exception as e:
-                    print(f"❌ 处理打印费 {f} 失败: {e}")
+                tasks.append((kind, os.path.join(folder, f)))
+    return tasks
 
-    # 2. 扫描 上网费
-    if os.path.exists(INPUT_DIR_NET):
-        for f in os.listdir(INPUT_DIR_NET):
-            if f.lower().endswith(".pdf"):
-                f_path = os.path.join(INPUT_DIR_NET, f)
-                try:
-                    print(f"🌐 正在处理上网费: {f}")
-                    ctx, xls_data, tpl_path, out_name = process_net_file(f_path)
-                    
-                    doc = DocxTemplate(tpl_path)
-                    doc.render(ctx)
-                    doc.save(os.path.join(OUTPUT_DIR, out_name))
-                    
-                    excel_queue.append(xls_data)
-                    move_file_to_archive(f_path)
-                except Exception as e:
-                    print(f"❌ 处理上网费 {f} 失败: {e}")
 
-    # 3. 扫描 Facebook
-    if os.path.exists(INPUT_DIR_FB):
-        for f in os.listdir(INPUT_DIR_FB):
-            if f.lower().endswith(".pdf"):
-                f_path = os.path.join(INPUT_DIR_FB, f)
-                try:
-                    print(f"📘 正在处理 FB 宣传费: {f}")
-                    ctx, xls_data, tpl_path, out_name = process_fb_file(f_path)
-                    
-                    doc = DocxTemplate(tpl_path)
-                    doc.render(ctx)
-                    doc.save(os.path.join(OUTPUT_DIR, out_name))
-                    
-                    excel_queue.append(xls_data)
-                    move_file_to_archive(f_path)
-                except Exception as e:
-                    print(f"❌ 处理 FB {f} 失败: {e}")
+def parse_invoice(kind, pdf_path):
+    """2. 子进程内解析单个 PDF：返回 (context, excel_data, 模板路径, 输出文件名)"""
+    return INVOICE_TYPES[kind][3](pdf_path)
+
+
+# 归档 PDF 不分类型存放，登记索引时按特征文字识别类型
+INVOICE_SIGNATURES = {
+    "PRINT": r"Invoice Number\s+\d+",
+    "NET": r"INVOICE NO\.\s*:",
+    "FB": r"Balance Due",
+}
+
+
+def identify_invoice(pdf_path):
+    """子进程内识别并解析一份归档 PDF：返回 (sha256, 类型, 发票号, 领款单文件名)，无法识别的部分为 None"""
+    with PdfText(pdf_path, PAGE_CACHE_DIR) as pdf:
+        sha256 = pdf.sha256
+        kind = next(
+            (k for _, text in pdf.pages() for k, pattern in INVOICE_SIGNATURES.items() if re.search(pattern, text)),
+            None,
+        )
+    if kind is None:
+        return sha256, None, None, None
+    try:
+        _, excel_data, _, out_name = parse_invoice(kind, pdf_path)
+    except Exception:
+        return sha256, kind, None, None
+    return sha256, kind, excel_data["invoice_no"], out_name
+
+
+def backfill_index(index, pool):
+    """首次使用：把 已处理文件/ 下已归档的 PDF 登记进索引"""
+    paths = [
+        os.path.join(dirpath, f)
+        for dirpath, _, files in os.walk(ARCHIVE_DIR_ROOT)
+        for f in sorted(files)
+        if f.lower().endswith(".pdf")
+    ]
+    if not paths:
+        return
+    print(f"🗂️ 首次使用发票索引，正在登记已归档的 {len(paths)} 个 PDF...")
+    identified = run_stage(pool, identify_invoice, [(path, (path,)) for path in paths], "登记")
+    n = index.add([(*identified[path], os.path.basename(path), path) for path in paths if path in identified])
+    print(f"✅ 已登记 {n} 个归档发票")
+
+
+def skip_known(tasks, index):
+    """
+    按 SHA-256 过滤已入账的发票（只读文件算哈希，不解析）；同一批中内容相同的文件只保留第一个。
+    返回 (待处理任务, {PDF 路径: sha256})
+    """
+    hashes = {path: file_sha256(path) for _, path in tasks}
+    known = index.lookup(hashes.values())
+    fresh, seen = [], {}
+    for kind, path in tasks:
+        sha256, name = hashes[path], os.path.basename(path)
+        if sha256 in known:
+            _, invoice_no, _, archived_path = known[sha256]
+            print(f"⏭️ 已处理过，跳过: {name}（发票号 {invoice_no or '未知'}，归档于 {archived_path}）")
+        elif sha256 in seen:
+            print(f"⏭️ 与 {os.path.basename(seen[sha256])} 内容相同，跳过: {name}")
+        else:
+            seen[sha256] = path
+            fresh.append((kind, path))
+    return fresh, hashes
+
+
+def archive_duplicates(index, duplicates):
+    """
+    发票号重复的 PDF 移到 已处理文件/<日期>/重复发票/，并以其 SHA-256 登记索引（领款单、归档路径指向原发票），
+    下次运行在 skip_known 的哈希一步即跳过，不再解析。
+    duplicates：{PDF 路径: (sha256, 类型, 发票号, 原发票领款单文件名, 原发票归档路径)}
+    """
+    rows = []
+    for path, (sha256, kind, invoice_no, out_name, original_path) in duplicates.items():
+        name = os.path.basename(path)
+        move_file_to_archive(path, DUPLICATE_SUBDIR)
+        rows.append((sha256, kind, invoice_no, out_name, name, original_path))
+    index.add(rows)
+    return len(rows)
+
+
+def run_stage(pool, fn, jobs, label):
+    """
+    把 jobs（[(PDF 路径, 参数元组)]）提交到进程池；返回 {PDF 路径: 结果}。
+    某个文件失败只报告该文件，不影响其余文件。
+    """
+    futures = {pool.submit(fn, *args): key for key, args in jobs}
+    results = {}
+    for future in as_completed(futures):
+        key = futures[future]
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            print(f"❌ {label} {os.path.basename(key)} 失败: {e}")
+    return results
+
+
+# ============================================================
+# 🚀 主程序
+# ============================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="扫描打印费/上网费/FaceBook 发票 PDF，生成杂费领款单并追加支出賬")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认：CPU 核数）")
+    args = parser.parse_args(argv)
+
+    os.makedirs(ARCHIVE_DIR_ROOT, exist_ok=True)
+    with InvoiceIndex(INDEX_PATH) as index, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        if index.is_empty():
+            backfill_index(index, pool)
+
+        tasks = discover_invoices()
+        if not tasks:
+            print("ℹ️ 未发现新文件，无需更新 Excel。")
+            return
+
+        counts = Counter(kind for kind, _ in tasks)
+        print("🔍 共发现 " + "，".join(f"{INVOICE_TYPES[k][2]} {counts[k]} 个" for k in INVOICE_TYPES if counts[k]))
+
+        # 1.5 已入账的发票在解析前剔除
+        tasks, hashes = skip_known(tasks, index)
+        if not tasks:
+            print("ℹ️ 发现的文件均已处理过，无需更新 Excel。")
+            return
+        kinds = {path: kind for kind, path in tasks}
+
+        # 2. 解析
+        parsed = run_stage(pool, parse_invoice, [(path, (kind, path)) for kind, path in tasks], "解析")
+        first_of = {}        # (类型, 发票号) → 本批第一份该号发票
+        known_dups = {}      # 与已入账发票同号：{PDF 路径: 索引记录}
+        batch_dups = {}      # 与本批前面的发票同号：{PDF 路径: 本批原发票路径}
+        for kind, path in tasks:
+            if path not in parsed:
+                continue
+            # 内容不同但发票号相同（如重新下载的同一张发票）也视为重复
+            invoice_no = parsed[path][1]["invoice_no"]
+            if invoice_no != "Unknown":
+                hit = index.find_invoice(kind, invoice_no)
+                if hit or (kind, invoice_no) in first_of:
+                    where = f"领款单 {hit[0]}，归档于 {hit[1]}" if hit else "本批已有同号发票"
+                    print(f"⏭️ 发票号 {invoice_no} 已处理过，跳过: {os.path.basename(path)}（{where}）")
+                    if hit:
+                        known_dups[path] = (hashes[path], kind, invoice_no, *hit)
+                    else:
+                        batch_dups[path] = first_of[(kind, invoice_no)]
+                    del parsed[path]
+                    continue
+                first_of[(kind, invoice_no)] = path
+            print(f"{INVOICE_TYPES[kind][1]} 已解析{INVOICE_TYPES[kind][2]}: {os.path.basename(path)}")
+
+        # 与已入账发票同号的 PDF 不必等 Excel 写入，直接归档、登记
+        n_dups = archive_duplicates(index, known_dups)
+
+        # 同名输出会互相覆盖（如同一月份两张发票），提前提示
+        for out_name, n in Counter(r[3] for r in parsed.values()).items():
+            if n > 1:
+                print(f"⚠️ {n} 个文件的领款单同名，将互相覆盖: {out_name}")
+
+        # 3. 渲染
+        jobs = [
+            (path, (tpl_path, ctx, os.path.join(OUTPUT_DIR, out_name)))
+            for path, (ctx, _, tpl_path, out_name) in parsed.items()
+        ]
+        rendered = run_stage(pool, render_docx, jobs, "渲染")
+
+        # 解析与渲染都成功的文件，按发现顺序
+        done = [path for _, path in tasks if path in rendered]
+
+        def summary():
+            # 未处理 = 解析 / 渲染失败，以及原发票未能入账的本批同号发票（都保留在原文件夹，下次重新处理）
+            failed = len(tasks) - len(done) - n_dups
+            return (f"，{n_dups} 个重复发票已归档至 {DUPLICATE_SUBDIR}/" if n_dups else "") + \
+                (f"，{failed} 个未处理（保留在原文件夹）" if failed else "")
+
+        # 4. 一次写入 Excel；成功保存后才登记索引并归档，失败时 PDF 留在原处，可直接重新运行
+        if not done:
+            print("⚠️ 没有新的发票需要入账，Excel 未更新" + summary() + "。")
+            return
+        try:
+            committed = append_to_excel([parsed[path][1] for path in done])
+        except Exception as e:
+            print(f"❌ 写入 Excel 失败: {e}")
+            committed = False
+
+        if committed:
+            index.add([
+                (
+                    hashes[path],
+                    kinds[path],
+                    parsed[path][1]["invoice_no"],
+                    parsed[path][3],
+                    os.path.basename(path),
+                    os.path.join(ARCHIVE_DIR_TODAY, os.path.basename(path)),
+                )
+                for path in done
+            ])
+            for path in done:
+                move_file_to_archive(path)
+            # 本批同号发票：原发票已入账时一并归档，指向原发票
+            n_dups += archive_duplicates(index, {
+                path: (hashes[path], kinds[path], parsed[original][1]["invoice_no"], parsed[original][3],
+                       os.path.join(ARCHIVE_DIR_TODAY, os.path.basename(original)))
+                for path, original in batch_dups.items() if original in rendered
+            })
+            print(f"🎉 完成：{len(done)} 个文件已处理并归档" + summary())
+        else:
+            print("⚠️ Excel 未更新，新发票均未归档；已生成的领款单在 output 中，修正后重新运行即可" + summary() + "。")
 
-    # 4. 写入 Excel
-    if excel_queue:
-        append_to_excel(excel_queue)
-    else:
-        print("ℹ️ 未发现新文件，无需更新 Excel。")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 import os
+import io
 import csv
+import argparse
+import zipfile
 from pathlib import Path
-from docx import Document
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
 
 # ============================================================
 # ⚙️ 路径配置
@@ -17,6 +21,19 @@ CSV_PATH = os.path.join(ROOT_DIR, "3_會計及財務記賬系統 - 下載文件"
 DIR_1A = os.path.join(ROOT_DIR, "1A_课程行政清单_领款单", "output")
 DIR_1B = os.path.join(ROOT_DIR, "1B_杂费领款单", "output")
 
+# 1B 文件名关键词 -> CSV '種類' 列的值
+RULES_1B = {
+    "打印费领款单": "印刷",
+    "FaceBook宣传费领款单": "廣告及推廣",
+    "网费领款单": "電話及互聯網費"
+}
+
+# Word XML
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+DOCUMENT_PART = "word/document.xml"
+ANCHOR = "電腦編號"
+
 # ============================================================
 # 🛠️ 核心功能函数
 # ============================================================
@@ -54,108 +71,144 @@ def load_csv_data(csv_path):
         print(f"❌ 读取 CSV 失败: {e}")
     return data
 
+def build_index(rows, key_col):
+    """{key_col 的值: 編號}；同一个值出现多次时取第一条（与逐行查找 break 的结果相同）"""
+    index = {}
+    for row in rows:
+        index.setdefault(row.get(key_col, '').strip(), row.get('編號', '').strip())
+    return index
+
+def _cell_text(tc):
+    """单元格文字（各段落以换行连接，同 python-docx 的 cell.text）"""
+    return "\n".join("".join(t.text or "" for t in p.iter(f"{W}t")) for p in tc.iterchildren(f"{W}p"))
+
+def _set_cell_text(tc, text):
+    """同 python-docx 的 cell.text = text：保留 tcPr，其余内容换成只含该文字的一个段落"""
+    for child in list(tc):
+        if child.tag != f"{W}tcPr":
+            tc.remove(child)
+    t = etree.SubElement(etree.SubElement(etree.SubElement(tc, f"{W}p"), f"{W}r"), f"{W}t")
+    t.text = text
+    if text != text.strip():
+        t.set(XML_SPACE, "preserve")
+
+def patch_document_xml(xml, text):
+    """
+    流式解析正文（iterparse，逐个表格行），找到第一个含「電腦編號」的单元格，
+    把同一行的下一个单元格改写为 text；返回新的 XML，找不到锚点时返回 None。
+    只看正文顶层表格，与 python-docx 的 doc.tables 一致。
+    """
+    patched = False
+    context = etree.iterparse(io.BytesIO(xml), events=("end",), tag=f"{W}tr")
+    for _, tr in context:
+        if patched:
+            continue
+        tbl = tr.getparent()
+        if tbl is None or tbl.getparent() is None or tbl.getparent().tag != f"{W}body":
+            continue
+        cells = list(tr.iterchildren(f"{W}tc"))
+        for i, tc in enumerate(cells):
+            if ANCHOR in _cell_text(tc):
+                if i + 1 < len(cells):
+                    _set_cell_text(cells[i + 1], text)
+                    patched = True
+                break
+    if not patched:
+        return None
+    return etree.tostring(context.root, encoding="UTF-8", xml_declaration=True, standalone=True)
+
 def inject_code_into_docx(file_path, code):
-    """将编号注入到 Word 文档"""
+    """将编号注入到 Word 文档；只改写 word/document.xml，其余部分原样复制。返回要打印的结果"""
+    tmp_path = file_path + ".tmp"
     try:
-        doc = Document(file_path)
-        is_injected = False
-        formatted_code = f"     {code}" # 加空格排版
-
-        for table in doc.tables:
-            for row in table.rows:
-                for i, cell in enumerate(row.cells):
-                    if "電腦編號" in cell.text:
-                        if i + 1 < len(row.cells):
-                            target_cell = row.cells[i + 1]
-                            target_cell.text = formatted_code
-                            is_injected = True
-                            print(f"   -> 写入成功：{code}")
-                            break
-                if is_injected: break
-            if is_injected: break
-
-        if is_injected:
-            doc.save(file_path)
-        else:
-            print(f"   ⚠️ 未找到 '電腦編號：' 锚点")
-
+        with zipfile.ZipFile(file_path) as zin:
+            xml = patch_document_xml(zin.read(DOCUMENT_PART), f"     {code}") # 加空格排版
+            if xml is None:
+                return f"   ⚠️ 未找到 '電腦編號：' 锚点"
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    zout.writestr(info, xml if info.filename == DOCUMENT_PART else zin.read(info.filename))
+        os.replace(tmp_path, file_path)
+        return f"   -> 写入成功：{code}"
     except Exception as e:
-        print(f"   ❌ Word 处理出错: {e}")
+        return f"   ❌ Word 处理出错: {e}"
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _inject_task(task):
+    return inject_code_into_docx(*task)
 
 # ============================================================
 # 🚀 主程序
 # ============================================================
 
-def main():
-    print("🚀 开始执行：注入编号 1.4 (修正列名为 '種類')")
-    
-    # 1. 加载数据
-    csv_rows = load_csv_data(CSV_PATH)
-    if not csv_rows:
-        return
-
-    # 2. 处理 1A 文件夹 (按人名匹配)
-    # 匹配规则：CSV '收款人' == 文件名(去除后缀)
+def collect_1a(by_payee):
+    """1A 文件夹 (按人名匹配)：CSV '收款人' == 文件名(去除后缀)"""
     print(f"\n📂 扫描 1A: {DIR_1A}")
+    tasks = []
     path_1a = Path(DIR_1A)
-    if path_1a.exists():
-        for file in path_1a.glob("*-领款单.docx"):
-            print(f"📄 处理: {file.name}")
-            target_name = file.stem.replace("-领款单", "").strip()
-            
-            found_code = None
-            for row in csv_rows:
-                # 🔍 查找收款人
-                if row.get('收款人', '').strip() == target_name:
-                    found_code = row.get('編號', '').strip()
-                    break
-            
-            if found_code:
-                inject_code_into_docx(str(file), found_code)
-            else:
-                print(f"   ⚠️ 未找到收款人: {target_name}")
-    else:
+    if not path_1a.exists():
         print(f"⚠️ 文件夹不存在: {DIR_1A}")
+        return tasks
+    for file in sorted(path_1a.glob("*-领款单.docx")):
+        target_name = file.stem.replace("-领款单", "").strip()
+        found_code = by_payee.get(target_name)
+        if found_code:
+            tasks.append((f"📄 处理: {file.name}", str(file), found_code))
+        else:
+            print(f"📄 处理: {file.name}")
+            print(f"   ⚠️ 未找到收款人: {target_name}")
+    return tasks
 
-    # 3. 处理 1B 文件夹 (按种类匹配)
-    # 匹配规则：文件名包含关键词 -> 对应 CSV '種類' 列的值
+def collect_1b(by_category):
+    """1B 文件夹 (按种类匹配)：文件名包含关键词 -> 对应 CSV '種類' 列的值"""
     print(f"\n📂 扫描 1B: {DIR_1B}")
+    tasks = []
     path_1b = Path(DIR_1B)
-    
-    rules_1b = {
-        "打印费领款单": "印刷",
-        "FaceBook宣传费领款单": "廣告及推廣",
-        "网费领款单": "電話及互聯網費"
-    }
-
-    if path_1b.exists():
-        for file in path_1b.glob("*.docx"):
-            matched_category = None
-            for keyword, category in rules_1b.items():
-                if keyword in file.name:
-                    matched_category = category
-                    break
-            
-            if matched_category:
-                print(f"📄 杂费文件: {file.name} (寻找种类: {matched_category})")
-                
-                found_code = None
-                for row in csv_rows:
-                    # 🟢 修改处：使用 '種類' 列进行匹配
-                    csv_type = row.get('種類', '').strip()
-                    
-                    if csv_type == matched_category:
-                        found_code = row.get('編號', '').strip()
-                        break # 取第一条匹配的
-                
-                if found_code:
-                    inject_code_into_docx(str(file), found_code)
-                else:
-                    print(f"   ⚠️ CSV中未找到种类: {matched_category}")
-    else:
+    if not path_1b.exists():
         print(f"⚠️ 文件夹不存在: {DIR_1B}")
+        return tasks
+    for file in sorted(path_1b.glob("*.docx")):
+        matched_category = next((c for k, c in RULES_1B.items() if k in file.name), None)
+        if not matched_category:
+            continue
+        header = f"📄 杂费文件: {file.name} (寻找种类: {matched_category})"
+        found_code = by_category.get(matched_category)
+        if found_code:
+            tasks.append((header, str(file), found_code))
+        else:
+            print(header)
+            print(f"   ⚠️ CSV中未找到种类: {matched_category}")
+    return tasks
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把支出賬 CSV 中的编号注入 1A / 1B 领款单的「電腦編號」栏")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认：CPU 核数）")
+    args = parser.parse_args(argv)
+
+    print("🚀 开始执行：注入编号 1.4 (修正列名为 '種類')")
+    
+    # 1. 加载数据，建立 收款人→編號、種類→編號 索引
+    csv_rows = load_csv_data(CSV_PATH)
+    if not csv_rows:
+        return
+    by_payee = build_index(csv_rows, '收款人')
+    by_category = build_index(csv_rows, '種類')
+
+    # 2. 匹配 1A、1B 文件
+    tasks = collect_1a(by_payee) + collect_1b(by_category)
+
+    # 3. 1A、1B 的文件一起并行写入
+    if tasks:
+        print(f"\n✍️ 正在写入 {len(tasks)} 个文件...")
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = pool.map(_inject_task, [(path, code) for _, path, code in tasks])
+            for (header, _, _), result in zip(tasks, results):
+                print(header)
+                print(result)
 
     print("\n✅ 所有任务完成。")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,9 +1,8 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
+import argparse
 from datetime import datetime
-from docx2pdf import convert
-from PyPDF2 import PdfMerger, PdfReader
 
 # ============================================================
 # ⚙️ 路径配置
@@ -22,6 +21,11 @@ PDF_OUT_ROOT = os.path.join(ROOT_DIR, "5_Word转PDF") # 总目录
 PDF_OUT_ADMIN = os.path.join(PDF_OUT_ROOT, "行政清单")
 PDF_OUT_RECEIPT = os.path.join(PDF_OUT_ROOT, "领款单")
 
+# 共用转换模块（仓库根目录 /公共模块）
+sys.path.append(os.path.join(os.path.dirname(ROOT_DIR), "公共模块"))
+from pdf_convert import convert_to_pdf, is_up_to_date, pdf_path_for
+from pdf_merge import merge_pdfs
+
 # 确保输出目录存在
 os.makedirs(PDF_OUT_ADMIN, exist_ok=True)
 os.makedirs(PDF_OUT_RECEIPT, exist_ok=True)
@@ -30,18 +34,6 @@ os.makedirs(PDF_OUT_RECEIPT, exist_ok=True)
 # 🛠️ 辅助函数
 # ============================================================
 
-def is_blank_page(pdf_path):
-    """判断 PDF 是否为空白页 (无文字)"""
-    try:
-        reader = PdfReader(pdf_path)
-        for page in reader.pages:
-            text = page.extract_text()
-            if text and text.strip():
-                return False # 有文字，不是空白
-        return True # 没文字，视为空白
-    except Exception:
-        return False # 读取出错，保守处理保留文件
-
 def get_merged_filename(base_name):
     """
     根据运行日期生成文件名
@@ -71,14 +63,15 @@ def get_merged_filename(base_name):
 # 🔄 核心处理逻辑
 # ============================================================
 
-def convert_and_sort_files():
-    """扫描 Word 文件并转换为 PDF 到对应文件夹"""
+def convert_and_sort_files(backend="auto", workers=None, force=False):
+    """扫描 Word 文件，整批转换为 PDF 到对应文件夹；PDF 已比 Word 新的文件跳过"""
     print("🚀 开始 Word 转 PDF...\n")
     
     # 定义要扫描的文件夹列表
     search_dirs = [SEARCH_DIR_1A, SEARCH_DIR_1B]
     
-    found_files = False
+    jobs = []       # [(Word 文件, 输出文件夹)]
+    up_to_date = 0
 
     for source_dir in search_dirs:
         if not os.path.exists(source_dir):
@@ -86,7 +79,7 @@ def convert_and_sort_files():
             continue
 
         print(f"📂 正在扫描: {source_dir}")
-        for filename in os.listdir(source_dir):
+        for filename in sorted(os.listdir(source_dir)):
             if filename.startswith("~") or not filename.endswith(".docx"):
                 continue # 跳过临时文件和非Word文件
             
@@ -100,20 +93,32 @@ def convert_and_sort_files():
                 target_folder = PDF_OUT_RECEIPT
             
             if target_folder:
-                found_files = True
-                pdf_filename = filename.replace(".docx", ".pdf")
-                target_path = os.path.join(target_folder, pdf_filename)
-                
-                # 执行转换
-                try:
-                    # print(f"   正在转换: {filename} ...")
-                    convert(source_file, target_path)
-                    print(f"   ✅ 已转换 -> {os.path.basename(target_folder)}/{pdf_filename}")
-                except Exception as e:
-                    print(f"   ❌ 转换失败 {filename}: {e}")
-
-    if not found_files:
+                if not force and is_up_to_date(source_file, pdf_path_for(source_file, target_folder)):
+                    up_to_date += 1
+                    continue
+                jobs.append((source_file, target_folder))
+
+    if not jobs and not up_to_date:
         print("\n⚠️ 未找到任何需要转换的 .docx 文件。")
+        return
+    if up_to_date:
+        print(f"   ⏭️ {up_to_date} 个文件的 PDF 已是最新，跳过")
+    if not jobs:
+        return
+
+    # 执行转换（整批交给转换程序）
+    print(f"   🔄 正在转换 {len(jobs)} 个文件...")
+    try:
+        results = convert_to_pdf(jobs, backend=backend, workers=workers)
+    except Exception as e:
+        print(f"   ❌ 转换失败: {e}")
+        return
+    for source_file, target_folder in jobs:
+        pdf_filename = os.path.basename(pdf_path_for(source_file, target_folder))
+        if results.get(os.path.abspath(source_file)):
+            print(f"   ✅ 已转换 -> {os.path.basename(target_folder)}/{pdf_filename}")
+        else:
+            print(f"   ❌ 转换失败 {os.path.basename(source_file)}")
 
 def merge_pdfs_in_folder(source_folder, type_name):
     """合并指定文件夹下的 PDF"""
@@ -127,36 +132,36 @@ def merge_pdfs_in_folder(source_folder, type_name):
         return
 
     print(f"\n📎 正在合并 {type_name} ({len(files)} 个文件) ...")
-    
-    merger = PdfMerger()
-    count = 0
-    
-    for filename in files:
-        path = os.path.join(source_folder, filename)
-        # 过滤空白页
-        if not is_blank_page(path):
-            merger.append(path)
-            count += 1
-        else:
-            print(f"   ⚠️ 跳过空白页: {filename}")
-
-    if count > 0:
-        # 生成输出路径 (保存在根目录 PDF_OUT_ROOT)
-        output_filename = get_merged_filename(type_name)
-        output_path = os.path.join(PDF_OUT_ROOT, output_filename)
-        
-        merger.write(output_path)
-        merger.close()
-        print(f"🎉 合并完成！文件位置: {output_path}")
+
+    # 生成输出路径 (保存在根目录 PDF_OUT_ROOT)
+    output_filename = get_merged_filename(type_name)
+    output_path = os.path.join(PDF_OUT_ROOT, output_filename)
+
+    # 每个文件只打开一次：逐页判断空白页并随即追加
+    stats = merge_pdfs([os.path.join(source_folder, f) for f in files], output_path)
+    for path, n in stats["blank"].items():
+        print(f"   ⚠️ 跳过空白页: {os.path.basename(path)}" + (f"（{n} 页）" if n > 1 else ""))
+    for path, reason in stats["errors"].items():
+        print(f"   ❌ 无法读取，未合并: {os.path.basename(path)}（{reason}）")
+
+    if stats["pages"] > 0:
+        print(f"🎉 合并完成！共 {stats['pages']} 页，文件位置: {output_path}")
     else:
         print(f"⚠️ 没有有效内容可合并。")
 
 # ============================================================
 # 🚀 主程序入口
 # ============================================================
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="行政清单 / 领款单 Word 转 PDF 并合并")
+    parser.add_argument("--backend", choices=["auto", "soffice", "word"], default="auto",
+                        help="转换程序：soffice=LibreOffice，word=Microsoft Word（docx2pdf）；默认自动选择")
+    parser.add_argument("--workers", type=int, default=None, help="soffice 并行进程数（默认：CPU 核数，最多 4）")
+    parser.add_argument("--force", action="store_true", help="忽略已是最新的 PDF，全部重新转换")
+    args = parser.parse_args(argv)
+
     # 1. 转换阶段
-    convert_and_sort_files()
+    convert_and_sort_files(args.backend, args.workers, args.force)
     
     # 2. 合并阶段
     print("\n" + "="*30)